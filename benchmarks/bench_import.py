@@ -0,0 +1,93 @@
+"""
+Import-time benchmark for the sorter entry point, with a budget.
+
+Imports `run` (what `python run.py` loads before doing any work) in a fresh
+interpreter with `python -X importtime`, `--repeat` times, and reports the median
+total plus the slowest modules. Exits with code 1 when
+
+- the median total is above `--budget-ms`, or
+- a module that must stay lazy (Pillow, psutil, filelock, send2trash, tqdm, wmi,
+  cProfile, sqlite3, the process pool) was imported: those are only loaded by the
+  code paths that need them.
+
+Import times are machine specific; pick a budget with headroom for the machine
+that runs the check.
+
+    python -m benchmarks.bench_import [--budget-ms 150] [--repeat 5] [--top 15]
+"""
+import os
+import sys
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAZY_MODULES = (
+    "PIL", "psutil", "filelock", "send2trash", "tqdm", "wmi", "pythoncom", "cProfile", "pstats",
+    "sqlite3", "concurrent.futures.process", "multiprocessing",
+)
+
+
+def is_lazy(name, lazy_modules=LAZY_MODULES):
+    """True for a module in `lazy_modules` or one of their submodules."""
+    return any(name == lazy or name.startswith(lazy + ".") for lazy in lazy_modules)
+
+
+def import_profile(module):
+    """Import `module` in a fresh interpreter; returns `{module: (self µs, cumulative µs)}` in import order."""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    if process.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{process.stderr}")
+
+    modules = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="run", help="Module to import")
+    parser.add_argument("--budget-ms", type=float, default=150.0, help="Allowed median import time")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters to measure; the median counts")
+    parser.add_argument("--top", type=int, default=15, help="Slowest modules to list")
+    args = parser.parse_args()
+
+    runs = []
+    for _ in range(max(1, args.repeat)):
+        modules = import_profile(args.module)
+        runs.append((sum(self_us for self_us, _ in modules.values()) / 1000, modules))
+    runs.sort(key=lambda run: run[0])
+    totals = [total for total, _ in runs]
+    median = statistics.median(totals)
+    modules = runs[len(runs) // 2][1]  # ✅ The breakdown shown is from the median run
+
+    print(f"import {args.module}: median {median:.1f} ms over {len(runs)} runs "
+          f"(min {totals[0]:.1f}, max {totals[-1]:.1f}), {len(modules)} modules\n")
+    print(f"{'module':<50} {'self ms':>8} {'cumul. ms':>10}")
+    for name, (self_us, cumulative_us) in sorted(modules.items(), key=lambda item: -item[1][0])[:args.top]:
+        print(f"{name:<50} {self_us / 1000:>8.1f} {cumulative_us / 1000:>10.1f}")
+
+    failures = 0
+    eager = sorted(name for name in modules if is_lazy(name))
+    if eager:
+        print(f"\n❌ Imported at startup but should be lazy: {', '.join(eager)}")
+        failures += 1
+    if median > args.budget_ms:
+        print(f"\n❌ Median import time {median:.1f} ms is over the {args.budget_ms:.0f} ms budget")
+        failures += 1
+    if not failures:
+        print(f"\n✅ Within the {args.budget_ms:.0f} ms budget, no eager heavy imports")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
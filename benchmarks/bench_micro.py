@@ -0,0 +1,154 @@
+"""
+Microbenchmarks for the metadata parsing hot path: ns/op and memory per op.
+
+Runs each function over a fixed corpus of parameter strings: the `test_input/*.txt`
+samples, synthetic ones from `make_corpus` (LoRA tags, `Hashes: {...}`, multi-line
+prompts) and a few long LoRA-heavy prompts.
+
+- time: best of `--repeat` rounds, each looping over the corpus for at least `--min-time` s
+- peak B/op: mean tracemalloc peak while one call runs (transient allocations)
+- kept B/op: mean memory still allocated after the call (what the result keeps alive)
+
+Results can be saved with `--save FILE` and compared with `--compare FILE`, so every
+parser change can be measured against the previous numbers.
+
+    python -m benchmarks.bench_micro [--only parse] [--save before.json] [--compare before.json]
+"""
+import os
+import sys
+import glob
+import json
+import time
+import random
+import argparse
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.make_corpus import LORAS, WORDS, make_parameters
+from sort_methods.a1111_parameters import parse_parameters, tokenize_parameters
+from sort_methods.metadataextractor import MetadataExtractor
+from sort_methods.planning import sanitize_folder_name
+from sort_methods.prompt_filter import PromptFilter
+
+
+def build_corpus(seed=7, synthetic=200):
+    """Parameter strings the benchmarks run over, always the same for the same seed."""
+    texts = []
+    for path in sorted(glob.glob(os.path.join(ROOT, "test_input", "**", "*.txt"), recursive=True)):
+        with open(path, "r", encoding="utf-8") as f:
+            texts.append(f.read())
+
+    rng = random.Random(seed)
+    models = ["Qasar_anireal", "sd_xl_base_1.0", "dreamshaper_8"]
+    for _ in range(synthetic):
+        texts.append(make_parameters(rng, rng.choice(models), 832, 1216))
+
+    # Long LoRA-heavy prompts over several lines
+    for i in range(10):
+        loras = ", ".join(f"<lora:{rng.choice(LORAS)}_{n}:{rng.choice([0.3, 0.5, 0.8])}>" for n in range(30))
+        prompt = ",\n".join(", ".join(rng.sample(WORDS, 12)) for _ in range(4))
+        lora_hashes = ", ".join(f"{name}_{n}: {n:012x}" for n, name in enumerate(LORAS * 6))
+        texts.append(
+            f"{prompt}, {loras}\nNegative prompt: lowres, bad hands, (worst quality:1.4)\n"
+            f"Steps: 30, Sampler: DPM++ 2M, Schedule type: Karras, CFG scale: 7, Seed: {i}, Size: 1024x1024, "
+            f'Model hash: 31e35c80fc, Model: sd_xl_base_1.0, Lora hashes: "{lora_hashes}", '
+            f'Version: v1.10.1, Hashes: {{"model": "31e35c80fc", "lora:add_detail": "7c6bad76eb"}}'
+        )
+    return texts
+
+
+def benchmarks(texts):
+    """`{name: (function, inputs)}`; every function takes one input."""
+    prompts = [tokenize_parameters(text)[0] for text in texts]
+    folder_names = [str(parse_parameters(text).get("model", "")) + suffix for text in texts for suffix in ("", ":v2?")]
+    model_only = frozenset(["model"])
+    return {
+        "PromptFilter.parse_parameters": (PromptFilter.parse_parameters, texts),
+        "parse_parameters[model]": (lambda text: parse_parameters(text, model_only), texts),
+        "tokenize_parameters": (tokenize_parameters, texts),
+        "MetadataExtractor.process_prompts": (lambda text: MetadataExtractor.process_prompts({"Parameters": text}), texts),
+        "MetadataExtractor.clean_metadata_prompt": (MetadataExtractor.clean_metadata_prompt, prompts),
+        "sanitize_folder_name": (sanitize_folder_name, folder_names),
+        "sanitize_folder_name[uncached]": (sanitize_folder_name.__wrapped__, folder_names),
+    }
+
+
+def time_per_op(function, inputs, min_time, repeat):
+    """Best ns/op over `repeat` rounds of at least `min_time` seconds each."""
+    best = None
+    for _ in range(repeat):
+        ops = 0
+        start = time.perf_counter_ns()
+        deadline = start + min_time * 1e9
+        while True:
+            for value in inputs:
+                function(value)
+            ops += len(inputs)
+            now = time.perf_counter_ns()
+            if now >= deadline:
+                break
+        per_op = (now - start) / ops
+        best = per_op if best is None else min(best, per_op)
+    return best
+
+
+def memory_per_op(function, inputs):
+    """Mean tracemalloc peak (bytes allocated while a call runs) and retained bytes per call."""
+    for value in inputs:
+        function(value)  # Warm caches and lazy imports outside the measurement
+    peak_total = kept_total = 0
+    tracemalloc.start()
+    try:
+        for value in inputs:
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            result = function(value)
+            after, peak = tracemalloc.get_traced_memory()
+            peak_total += peak - before
+            kept_total += after - before
+            del result
+    finally:
+        tracemalloc.stop()
+    return peak_total / len(inputs), kept_total / len(inputs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", help="Run only benchmarks whose name contains this text")
+    parser.add_argument("--min-time", type=float, default=0.2, help="Seconds per timing round")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing rounds; the best one counts")
+    parser.add_argument("--save", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Show the change against results saved earlier")
+    args = parser.parse_args()
+
+    texts = build_corpus()
+    previous = {}
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            previous = json.load(f)["results"]
+
+    print(f"{len(texts)} parameter strings, {sum(map(len, texts)) / len(texts):.0f} chars on average\n")
+    print(f"{'benchmark':<40} {'ns/op':>10} {'peak B/op':>10} {'kept B/op':>10}")
+    results = {}
+    for name, (function, inputs) in benchmarks(texts).items():
+        if args.only and args.only not in name:
+            continue
+        peak, kept = memory_per_op(function, inputs)
+        ns = time_per_op(function, inputs, args.min_time, args.repeat)
+        results[name] = {"ns_per_op": round(ns, 1), "peak_bytes_per_op": round(peak, 1), "kept_bytes_per_op": round(kept, 1)}
+        line = f"{name:<40} {ns:>10,.0f} {peak:>10,.0f} {kept:>10,.0f}"
+        if name in previous:
+            line += f"   ({(ns - previous[name]['ns_per_op']) / previous[name]['ns_per_op']:+.1%} time)"
+        print(line)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"python": sys.version.split()[0], "corpus_size": len(texts), "results": results}, f, indent=4)
+        print(f"\n✅ Results saved to {args.save}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,200 @@
+"""
+Benchmark: A1111 parameter parsing throughput in MB/s.
+
+Parses the `test_input/*.txt` samples repeatedly (about 50 MB of text by default) with
+
+- the full current path, `MetadataExtractor.process_prompts({"Parameters": text})`
+- the single-pass tokenizer alone (`sort_methods.a1111_parameters.parse_parameters`)
+- just its split/scan stage (`tokenize_parameters`, no value conversion)
+- the key projection used by a `metadata_keys: ["model"]` sort (`parse_parameters(text, {"model"})`)
+- the full previous path, kept here for reference: the regex parser followed by the
+  `process_prompts`/`process_steps`/`Hashes` post-processing it always ran (minus its
+  DEBUG prints). It also dropped `Steps` and split every value containing a comma into
+  a list. Compare this row with the first one; the regex parser alone is listed too,
+  but it does only part of the work.
+
+    python -m benchmarks.bench_parameters [--mb 50]
+"""
+import os
+import re
+import sys
+import glob
+import json
+import time
+import argparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sort_methods.a1111_parameters import parse_parameters, tokenize_parameters
+from sort_methods.metadataextractor import MetadataExtractor
+
+
+def legacy_parse_parameters(parameters_text):
+    """The regex parser `PromptFilter.parse_parameters` used before the tokenizer."""
+    metadata = {}
+    neg_prompt_index = parameters_text.lower().find("negative prompt:")
+    if neg_prompt_index != -1:
+        positive_prompt = parameters_text[:neg_prompt_index].strip()
+        metadata_section = parameters_text[neg_prompt_index:].strip()
+    else:
+        positive_prompt = parameters_text.strip()
+        metadata_section = ""
+    metadata["positive_prompts"] = positive_prompt
+    for key, value in re.findall(r"\n?([\w\s-]+):\s*([^\n]+)", metadata_section):
+        key = key.strip().lower().replace(" ", "_")
+        if "," in value and not value.startswith("{"):
+            metadata[key] = [v.strip() for v in value.split(",") if v.strip()]
+        else:
+            metadata[key] = value.strip()
+    hashes_match = re.search(r'Hashes:\s*\{.*?"model":\s*"([\da-fA-F]+)".*?\}', metadata_section)
+    if hashes_match:
+        metadata["hashes"] = {"model": hashes_match.group(1)}
+    return metadata
+
+
+def legacy_process_prompts(metadata):
+    """`MetadataExtractor.process_prompts` as it was before the tokenizer (DEBUG prints removed)."""
+    if "Parameters" in metadata:
+        metadata.update(legacy_parse_parameters(metadata["Parameters"]))
+        del metadata["Parameters"]
+
+    positive_prompts = metadata.get("positive_prompts", [])
+    if isinstance(positive_prompts, str):
+        positive_prompts = [p.strip() for p in positive_prompts.split(",") if p.strip()]
+    negative_prompts = metadata.get("negative_prompt", [])
+    if isinstance(negative_prompts, str):
+        negative_prompts = [p.strip() for p in negative_prompts.split(",") if p.strip()]
+
+    temp_metadata_list = []
+    steps_value = None
+    if positive_prompts and "\n" in positive_prompts[0]:
+        first_prompt, extra_data = positive_prompts[0].split("\n", 1)
+        positive_prompts[0] = first_prompt.strip()
+        temp_metadata_list = extra_data.strip().split(",")
+
+    if "steps" in [p.lower() for p in temp_metadata_list]:
+        steps_index = next((i for i, p in enumerate(temp_metadata_list) if p.lower() == "steps"), None)
+        if steps_index is not None:
+            if steps_index + 1 < len(temp_metadata_list):
+                steps_value = temp_metadata_list.pop(steps_index + 1)
+            temp_metadata_list.pop(steps_index)
+    if steps_value is not None:
+        temp_metadata_list.append("Steps")
+        temp_metadata_list.append(steps_value)
+
+    extracted_metadata_list = []
+    cleaned_prompts = []
+    for item in positive_prompts:
+        if re.match(r"^[\w\s-]+:\s*\S+", item):
+            extracted_metadata_list.append(item)
+        else:
+            cleaned_prompts.append(item)
+    positive_prompts = cleaned_prompts
+
+    metadata_fields = {}
+    full_metadata_list = extracted_metadata_list + temp_metadata_list
+    for i in range(0, len(full_metadata_list) - 1, 2):
+        key = full_metadata_list[i].strip().lower().replace(" ", "_")
+        value = full_metadata_list[i + 1].strip()
+        if value.isdigit():
+            metadata_fields[key] = int(value)
+        else:
+            try:
+                metadata_fields[key] = float(value) if "." in value else value
+            except ValueError:
+                metadata_fields[key] = value
+
+    hashes = {}
+    if "model_hash" in metadata_fields:
+        hashes["model"] = metadata_fields.pop("model_hash")
+    metadata.update(metadata_fields)
+    metadata["hashes"] = hashes
+    metadata["positive_prompts"] = positive_prompts
+    metadata["negative_prompt"] = negative_prompts
+    return metadata
+
+
+def legacy_process_steps(metadata):
+    """`MetadataExtractor.process_steps` as it was before the tokenizer."""
+    if "steps" in metadata and isinstance(metadata["steps"], list):
+        steps_dict = {}
+        for entry in metadata["steps"]:
+            match = re.match(r"([\w\s-]+):\s*(.+)", entry)
+            if match:
+                key = match.group(1).strip().lower().replace(" ", "_")
+                value = match.group(2).strip()
+                if value.isdigit():
+                    steps_dict[key] = int(value)
+                else:
+                    try:
+                        steps_dict[key] = float(value) if "." in value else value
+                    except ValueError:
+                        pass
+                steps_dict[key] = value
+            elif entry.isdigit():
+                steps_dict["steps"] = int(entry)
+        metadata.update(steps_dict)
+        del metadata["steps"]
+    return metadata
+
+
+def legacy_full_path(parameters_text):
+    """Everything the old `extract_metadata` did with a parameters text after reading it."""
+    metadata = legacy_process_steps(legacy_process_prompts({"Parameters": parameters_text}))
+    if "Hashes" in metadata:
+        try:
+            metadata["hashes"] = json.loads(metadata["Hashes"])
+        except json.JSONDecodeError:
+            pass
+        del metadata["Hashes"]
+    return metadata
+
+
+def load_samples():
+    samples = []
+    for path in sorted(glob.glob(os.path.join(ROOT, "test_input", "**", "*.txt"), recursive=True)):
+        with open(path, "r", encoding="utf-8") as f:
+            samples.append(f.read())
+    return samples
+
+
+def bench(label, parse, texts, total_bytes):
+    start = time.perf_counter()
+    for text in texts:
+        parse(text)
+    elapsed = time.perf_counter() - start
+    mb = total_bytes / 1e6
+    print(f"{label:<24} {elapsed:7.2f} s   {mb / elapsed:8.1f} MB/s   {elapsed * 1e6 / len(texts):7.1f} µs/text")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mb", type=float, default=50, help="Megabytes of parameter text to parse")
+    args = parser.parse_args()
+
+    samples = load_samples()
+    if not samples:
+        print("❌ No test_input/*.txt samples found")
+        return 1
+    sample_bytes = sum(len(text.encode("utf-8")) for text in samples)
+    repeats = max(1, int(args.mb * 1e6 / sample_bytes))
+    texts = samples * repeats
+    total_bytes = sample_bytes * repeats
+
+    print(f"{len(texts):,} texts, {total_bytes / 1e6:.1f} MB")
+    print("Full path (read text → metadata dict):")
+    bench("  current", lambda text: MetadataExtractor.process_prompts({"Parameters": text}), texts, total_bytes)
+    bench("  legacy", legacy_full_path, texts, total_bytes)
+    print("Parts:")
+    bench("  tokenizer + typing", parse_parameters, texts, total_bytes)
+    bench("  tokenizer only", tokenize_parameters, texts, total_bytes)
+    model_only = frozenset(["model"])
+    bench("  projection {model}", lambda text: parse_parameters(text, model_only), texts, total_bytes)
+    bench("  legacy regex only", legacy_parse_parameters, texts, total_bytes)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+"""
+Microbenchmark: per-image destination planning cost.
+
+Compares the compiled routing program (`plan_destination`) with the old per-image
+loop that re-read the config and re-parsed the resolution thresholds every time.
+
+    python -m benchmarks.bench_planning [-n 200000] [--config custom_sorter_config.yaml]
+"""
+import os
+import re
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sort_methods.planning import ImageRecord, compile_sort_config, plan_destination
+from sort_methods.sort_by_orientation import get_orientation_folder
+
+DEFAULT_CONFIG = {
+    "sort_methods": ["metadata", "orientation", "resolution"],
+    "metadata_keys": ["model"],
+    "use_output_folder": True,
+    "resolution_folders": {
+        "superlow": "0x0",
+        "lores": "640x960",
+        "medres": "960x1440",
+        "hires": "1080x1920",
+        "superhigh": "99999x99999",
+    },
+}
+MODELS = ["Qasar_anireal", "FusionX-Realistic_v3_float16", "sd_xl_base_1.0", "juggernaut:XL", "dreamshaper_8"]
+INVALID_CHARS = r'<>:"/\|?*'
+SIZES = [(512, 512), (512, 768), (768, 512), (640, 960), (1024, 1024), (1080, 1920), (2048, 1152)]
+
+
+def legacy_plan(image_path, metadata_values, width, height, config, output_folder):
+    """The planning code as it was before the routing program (kept here only for comparison)."""
+    sorting_criteria = []
+    for method in config.get("sort_methods", []):
+        if method == "metadata":
+            for key in config.get("metadata_keys", []):
+                if key in metadata_values:
+                    value = re.sub(f"[{re.escape(INVALID_CHARS)}]", "_", str(metadata_values[key])).strip("_")
+                    sorting_criteria.append(value)
+        elif method == "orientation":
+            sorting_criteria.append(get_orientation_folder(width, height))
+        elif method == "resolution":
+            folder = "other"
+            for name, dimensions in config.get("resolution_folders", {}).items():
+                w, h = map(int, dimensions.split("x"))
+                if width * height <= w * h:
+                    folder = name
+                    break
+            sorting_criteria.append(folder)
+    if config.get("use_output_folder", False):
+        sorted_folder = os.path.join(output_folder, *sorting_criteria)
+    else:
+        sorted_folder = os.path.join(os.path.dirname(image_path), *sorting_criteria)
+
+    # Safety checks, as they were
+    sorted_base = os.path.basename(sorted_folder).lower()
+    subfolders = os.path.relpath(os.path.dirname(image_path), "input").lower().split(os.sep)
+    if config.get("only_process_unsorted", True) and len(subfolders) == 1 and subfolders[0] == sorted_base:
+        return None
+    if os.path.commonpath([os.path.abspath(image_path), os.path.abspath(sorted_folder)]) == os.path.abspath(sorted_folder):
+        return None
+    return sorted_folder
+
+
+def make_records(n, seed=1234):
+    rng = random.Random(seed)
+    records = []
+    for i in range(n):
+        width, height = rng.choice(SIZES)
+        records.append(ImageRecord(f"input/{i:07d}.png", {"model": rng.choice(MODELS), "steps": "30"}, width, height))
+    return records
+
+
+def bench(label, func, records):
+    start = time.perf_counter()
+    for record in records:
+        func(record)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<20} {elapsed * 1e9 / len(records):10.0f} ns/image   ({len(records) / elapsed:,.0f} images/s)")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, default=200000, help="Number of synthetic records")
+    parser.add_argument("--config", help="Take sort_methods/metadata_keys/resolution_folders from a YAML config")
+    args = parser.parse_args()
+
+    config = dict(DEFAULT_CONFIG)
+    if args.config:
+        import yaml
+
+        with open(args.config, "r") as f:
+            config.update(yaml.safe_load(f) or {})
+
+    output_folder = "output"
+    records = make_records(args.n)
+    sort_config = compile_sort_config(config, "input", output_folder)
+
+    # ✅ Same answers first, then timings
+    for record in records[:1000]:
+        expected = legacy_plan(record.path, record.metadata, record.width, record.height, config, output_folder)
+        assert plan_destination(record, sort_config) == expected, record
+
+    legacy = bench("legacy loop", lambda r: legacy_plan(r.path, r.metadata, r.width, r.height, config, output_folder),
+                   records)
+    compiled = bench("compiled program", lambda r: plan_destination(r, sort_config), records)
+    print(f"speedup: {legacy / compiled:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
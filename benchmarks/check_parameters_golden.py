@@ -0,0 +1,87 @@
+"""
+Golden-output check for the A1111 parameter parser.
+
+Parses every `test_input/*.txt` file plus a few hand-written edge cases and compares
+the result with `benchmarks/golden/a1111_parameters.json`. Exits non-zero and prints
+the differing keys on a mismatch. After an intended change to the parser output,
+review the diff and regenerate the corpus with `--update`.
+
+    python -m benchmarks.check_parameters_golden [--update]
+"""
+import os
+import sys
+import glob
+import json
+import argparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sort_methods.a1111_parameters import parse_parameters
+
+GOLDEN_FILE = os.path.join(ROOT, "benchmarks", "golden", "a1111_parameters.json")
+
+# Inputs the sample images don't cover
+EDGE_CASES = {
+    "edge:quoted-and-json": (
+        "masterpiece, 1girl\n"
+        "second prompt line\n"
+        "Negative prompt: bad hands,\n"
+        "ugly\n"
+        'Steps: 20, Sampler: Euler a, CFG scale: 7.5, Seed: -1, Lora hashes: "add_detail: 7c6bad76eb54, x: 1", '
+        'Hashes: {"model": "abc", "lora:x": "def"}, Denoising strength: 0.40, Flag: True'
+    ),
+    "edge:no-negative": "a cat, sitting\nSteps: 4, Sampler: LCM, CFG scale: 1, Seed: 7, Size: 512x512",
+    "edge:negative-only": "Negative prompt: blurry\nSteps: 1, Sampler: DDIM, Seed: 3",
+    "edge:prompt-only": "just a prompt, with: a colon",
+    "edge:escaped-quote": 'x\nSteps: 2, Sampler: DDIM, Seed: 1, Note: "say \\"hi\\", ok"',
+}
+
+
+def load_inputs():
+    inputs = {}
+    for path in sorted(glob.glob(os.path.join(ROOT, "test_input", "**", "*.txt"), recursive=True)):
+        with open(path, "r", encoding="utf-8") as f:
+            inputs[os.path.relpath(path, ROOT).replace(os.sep, "/")] = f.read()
+    inputs.update(EDGE_CASES)
+    return inputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--update", action="store_true", help="rewrite the golden file from the current parser")
+    args = parser.parse_args()
+
+    actual = {name: parse_parameters(text) for name, text in load_inputs().items()}
+
+    if args.update:
+        with open(GOLDEN_FILE, "w", encoding="utf-8") as f:
+            json.dump(actual, f, indent=2, ensure_ascii=False, sort_keys=True)
+            f.write("\n")
+        print(f"✅ Wrote {len(actual)} cases to {GOLDEN_FILE}")
+        return 0
+
+    with open(GOLDEN_FILE, "r", encoding="utf-8") as f:
+        expected = json.load(f)
+
+    failures = 0
+    for name in sorted(set(expected) | set(actual)):
+        if name not in actual:
+            print(f"❌ {name}: input missing")
+        elif name not in expected:
+            print(f"❌ {name}: no golden output (run with --update)")
+        elif expected[name] != actual[name]:
+            keys = sorted(k for k in set(expected[name]) | set(actual[name])
+                          if expected[name].get(k) != actual[name].get(k))
+            for key in keys:
+                print(f"❌ {name}: {key}: expected {expected[name].get(key)!r}, got {actual[name].get(key)!r}")
+        else:
+            continue
+        failures += 1
+
+    print(f"{len(actual) - failures}/{len(actual)} cases match")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
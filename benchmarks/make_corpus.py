@@ -0,0 +1,242 @@
+"""
+Deterministic synthetic corpus of A1111-style images for benchmarking.
+
+Writes PNGs with a `parameters` text chunk, JPEGs and WebPs with the parameters in
+the EXIF UserComment (like A1111 saves them), and `.txt` sidecars for a share of
+the images. The same arguments always produce byte-identical files.
+
+PNG pixel data is a blank image compressed once per resolution, so files are small
+and generation is fast; JPEG/WebP bodies are encoded once per resolution with Pillow.
+
+    python -m benchmarks.make_corpus OUT [--scale 1k|10k|100k | -n COUNT] [--seed 1]
+        [--models a,b,c] [--resolutions 512x512,832x1216] [--depth 2] [--fanout 4]
+        [--formats png=0.8,jpg=0.1,webp=0.1] [--sidecars 0.3]
+"""
+import io
+import os
+import sys
+import json
+import zlib
+import struct
+import random
+import argparse
+
+SCALES = {"1k": 1000, "10k": 10000, "100k": 100000}
+DEFAULT_MODELS = ["Qasar_anireal", "FusionX-Realistic_v3_float16", "sd_xl_base_1.0", "dreamshaper_8", "juggernautXL_v9"]
+DEFAULT_RESOLUTIONS = ["512x512", "512x768", "768x512", "640x960", "832x1216", "1024x1024", "1080x1920", "1920x1080"]
+DEFAULT_FORMATS = "png=0.8,jpg=0.1,webp=0.1"
+SAMPLERS = ["DPM++ 2M", "Euler a", "DDIM", "UniPC", "DPM++ SDE"]
+SCHEDULES = ["Karras", "Exponential", "Automatic"]
+WORDS = [
+    "masterpiece", "best quality", "1girl", "solo", "portrait", "landscape", "sunset", "beach", "city street",
+    "night", "neon lights", "forest", "mountains", "river", "castle", "dragon", "cat", "dog", "red dress",
+    "blue sky", "clouds", "rain", "snow", "cinematic lighting", "depth of field", "bokeh", "highly detailed",
+    "(intricate:1.2)", "[sketch]", "8k", "photorealistic", "anime style", "watercolor", "oil painting",
+]
+NEGATIVE_WORDS = ["lowres", "bad hands", "blurry", "watermark", "text", "jpeg artifacts", "extra fingers", "ugly"]
+LORAS = ["add_detail", "epi_noiseoffset", "more_details", "film_grain", "lcm_lora"]
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def parse_weights(text):
+    weights = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        weights[name.strip().lower()] = float(weight or 1)
+    return weights
+
+
+def make_parameters(rng, model, width, height):
+    """One A1111 `parameters` text: prompt (sometimes multi-line, with LoRAs), negative prompt, settings line."""
+    prompt = ", ".join(rng.sample(WORDS, rng.randint(4, 20)))
+    loras = rng.sample(LORAS, rng.randint(0, 3))
+    if loras:
+        prompt += ", " + ", ".join(f"<lora:{name}:{rng.choice([0.4, 0.6, 0.8, 1])}>" for name in loras)
+    if rng.random() < 0.2:
+        prompt += "\n" + ", ".join(rng.sample(WORDS, 3))
+    lines = [prompt]
+    if rng.random() < 0.85:
+        lines.append("Negative prompt: " + ", ".join(rng.sample(NEGATIVE_WORDS, rng.randint(2, 6))))
+
+    model_hash = f"{zlib.crc32(model.encode()):08x}"[:10]
+    settings = [
+        ("Steps", rng.choice([20, 25, 30, 40])),
+        ("Sampler", rng.choice(SAMPLERS)),
+        ("Schedule type", rng.choice(SCHEDULES)),
+        ("CFG scale", rng.choice([5, 6.5, 7, 7.5, 9])),
+        ("Seed", rng.randrange(10 ** 10)),
+        ("Size", f"{width}x{height}"),
+        ("Model hash", model_hash),
+        ("Model", model),
+    ]
+    if rng.random() < 0.3:
+        settings += [("Denoising strength", 0.4), ("Hires upscale", 2), ("Hires upscaler", "Latent")]
+    if loras:
+        lora_hashes = ", ".join(f"{name}: {zlib.crc32(name.encode()):08x}" for name in loras)
+        settings.append(("Lora hashes", f'"{lora_hashes}"'))
+    settings.append(("Version", "v1.10.1"))
+    hashes = {"model": model_hash}
+    hashes.update({f"lora:{name}": f"{zlib.crc32(name.encode()):08x}" for name in loras})
+    settings.append(("Hashes", json.dumps(hashes)))
+    lines.append(", ".join(f"{key}: {value}" for key, value in settings))
+    return "\n".join(lines)
+
+
+def _png_chunk(chunk_type, data):
+    return struct.pack(">I", len(data)) + chunk_type + data + struct.pack(">I", zlib.crc32(chunk_type + data))
+
+
+def _exif_user_comment(text):
+    """Little-endian TIFF block with IFD0 → Exif IFD → UserComment (UNICODE, UTF-16BE like piexif)."""
+    comment = b"UNICODE\x00" + text.encode("utf-16-be")
+    ifd0 = struct.pack("<H", 1) + struct.pack("<HHII", 0x8769, 4, 1, 26) + struct.pack("<I", 0)
+    exif_ifd = struct.pack("<H", 1) + struct.pack("<HHII", 0x9286, 7, len(comment), 44) + struct.pack("<I", 0)
+    return b"II*\x00" + struct.pack("<I", 8) + ifd0 + exif_ifd + comment
+
+
+class ImageWriter:
+    """Builds image bytes; the pixel data of every format and size is encoded once and reused."""
+
+    def __init__(self):
+        self.png_idat = {}
+        self.jpeg_bodies = {}
+        self.webp_bodies = {}
+
+    def png(self, width, height, parameters):
+        idat = self.png_idat.get((width, height))
+        if idat is None:
+            row = b"\x00" + b"\x00" * (width * 3)
+            idat = self.png_idat[(width, height)] = _png_chunk(b"IDAT", zlib.compress(row * height, 9))
+        ihdr = _png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+        text = _png_chunk(b"tEXt", b"parameters\x00" + parameters.encode("latin-1", errors="replace"))
+        return PNG_SIGNATURE + ihdr + text + idat + _png_chunk(b"IEND", b"")
+
+    @staticmethod
+    def _encode(width, height, fmt, **options):
+        from PIL import Image
+
+        buffer = io.BytesIO()
+        Image.new("RGB", (width, height), (128, 128, 128)).save(buffer, fmt, **options)
+        return buffer.getvalue()
+
+    def jpeg(self, width, height, parameters):
+        body = self.jpeg_bodies.get((width, height))
+        if body is None:
+            body = self.jpeg_bodies[(width, height)] = self._encode(width, height, "JPEG", quality=50)[2:]
+        app1 = b"Exif\x00\x00" + _exif_user_comment(parameters)
+        return b"\xff\xd8" + b"\xff\xe1" + struct.pack(">H", len(app1) + 2) + app1 + body
+
+    def webp(self, width, height, parameters):
+        chunks = self.webp_bodies.get((width, height))
+        if chunks is None:
+            data = self._encode(width, height, "WEBP", quality=50)
+            chunks, position = [], 12
+            while position + 8 <= len(data):
+                chunk_type, length = struct.unpack("<4sI", data[position:position + 8])
+                end = position + 8 + length + (length & 1)
+                if chunk_type in (b"VP8 ", b"VP8L"):
+                    chunks.append(data[position:end])
+                position = end
+            chunks = self.webp_bodies[(width, height)] = b"".join(chunks)
+
+        vp8x = struct.pack("<4sI", b"VP8X", 10) + bytes([0x08, 0, 0, 0])
+        vp8x += (width - 1).to_bytes(3, "little") + (height - 1).to_bytes(3, "little")
+        exif = _exif_user_comment(parameters)
+        exif_chunk = struct.pack("<4sI", b"EXIF", len(exif)) + exif + (b"\x00" if len(exif) & 1 else b"")
+        payload = b"WEBP" + vp8x + chunks + exif_chunk
+        return b"RIFF" + struct.pack("<I", len(payload)) + payload
+
+
+def folder_for(index, depth, fanout):
+    parts = []
+    for level in range(depth):
+        parts.append(f"d{level + 1}_{(index // (fanout ** level)) % fanout}")
+    return os.path.join(*parts) if parts else ""
+
+
+def generate(out_dir, count, seed=1, models=None, resolutions=None, depth=2, fanout=4, formats=DEFAULT_FORMATS,
+             sidecars=0.3):
+    """Write the corpus into `out_dir` and return its manifest (also saved as `corpus.json`)."""
+    models = models or DEFAULT_MODELS
+    sizes = [tuple(int(v) for v in r.lower().split("x")) for r in (resolutions or DEFAULT_RESOLUTIONS)]
+    weights = parse_weights(formats)
+    kinds, kind_weights = list(weights), list(weights.values())
+    rng = random.Random(seed)
+    writer = ImageWriter()
+    totals = {"png": 0, "jpg": 0, "webp": 0, "txt": 0, "bytes": 0}
+
+    for index in range(count):
+        kind = rng.choices(kinds, kind_weights)[0]
+        model = rng.choice(models)
+        width, height = rng.choice(sizes)
+        parameters = make_parameters(rng, model, width, height)
+        has_sidecar = rng.random() < sidecars
+
+        folder = os.path.join(out_dir, folder_for(index, depth, fanout))
+        os.makedirs(folder, exist_ok=True)
+        stem = os.path.join(folder, f"{index:06d}-{rng.randrange(10 ** 10)}")
+        if kind == "jpg":
+            data = writer.jpeg(width, height, parameters)
+        elif kind == "webp":
+            data = writer.webp(width, height, parameters)
+        else:
+            kind, data = "png", writer.png(width, height, parameters)
+        with open(f"{stem}.{kind}", "wb") as f:
+            f.write(data)
+        totals[kind] += 1
+        totals["bytes"] += len(data)
+        if has_sidecar:
+            with open(f"{stem}.txt", "w", encoding="utf-8", newline="\n") as f:
+                f.write(parameters)
+            totals["txt"] += 1
+
+    manifest = {
+        "count": count, "seed": seed, "models": models, "resolutions": resolutions or DEFAULT_RESOLUTIONS,
+        "depth": depth, "fanout": fanout, "formats": formats, "sidecars": sidecars, "totals": totals,
+    }
+    with open(os.path.join(out_dir, "corpus.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=4)
+    return manifest
+
+
+def add_corpus_arguments(parser):
+    parser.add_argument("--scale", choices=sorted(SCALES), default="1k", help="Corpus size (ignored with -n)")
+    parser.add_argument("-n", "--count", type=int, help="Exact number of images")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--models", help="Comma-separated model names")
+    parser.add_argument("--resolutions", help="Comma-separated WIDTHxHEIGHT list")
+    parser.add_argument("--depth", type=int, default=2, help="Folder nesting levels")
+    parser.add_argument("--fanout", type=int, default=4, help="Subfolders per level")
+    parser.add_argument("--formats", default=DEFAULT_FORMATS, help="Format weights, e.g. png=0.8,jpg=0.1,webp=0.1")
+    parser.add_argument("--sidecars", type=float, default=0.3, help="Share of images with a .txt sidecar")
+
+
+def corpus_options(args):
+    return {
+        "count": args.count or SCALES[args.scale],
+        "seed": args.seed,
+        "models": args.models.split(",") if args.models else None,
+        "resolutions": args.resolutions.split(",") if args.resolutions else None,
+        "depth": args.depth,
+        "fanout": args.fanout,
+        "formats": args.formats,
+        "sidecars": args.sidecars,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("out", help="Folder to write the corpus into")
+    add_corpus_arguments(parser)
+    args = parser.parse_args()
+
+    manifest = generate(args.out, **corpus_options(args))
+    totals = manifest["totals"]
+    print(f"✅ {manifest['count']:,} images ({totals['png']} png, {totals['jpg']} jpg, {totals['webp']} webp), "
+          f"{totals['txt']} sidecars, {totals['bytes'] / 1e6:.1f} MB in {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,228 @@
+"""
+End-to-end benchmark: sort a synthetic corpus with `CustomSorter.sort_images_and_texts`.
+
+For every target folder (tmpfs and/or disk) the corpus from `make_corpus` is generated
+once, copied to a fresh input folder for each repeat and sorted in a separate process
+with `metrics: true`. Reports files/sec and the per-stage timings of the median run.
+
+With `--baseline`, results are compared against the stored baseline for the same target
+and corpus size. The run fails (exit code 1) when files/sec dropped by more than
+`--threshold`; stage slowdowns are shown and only fail the run with `--strict-stages`.
+Baselines are machine specific: record one with `--update-baseline` on the machine
+that runs the comparison.
+
+    python -m benchmarks.run_e2e [--scale 1k|10k|100k] [--targets tmpfs,disk] [--repeat 3]
+        [--baseline benchmarks/e2e_baseline.json] [--threshold 0.15] [--update-baseline]
+"""
+import os
+import sys
+import json
+import shutil
+import argparse
+import subprocess
+
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.make_corpus import add_corpus_arguments, corpus_options, generate
+
+DEFAULT_BASELINE = os.path.join(ROOT, "benchmarks", "e2e_baseline.json")
+RESULT_MARKER = "BENCH_RESULT "
+CHILD_SCRIPT = f"""
+import sys, time, json
+from scripts.cs import CustomSorter
+sorter = CustomSorter(sys.argv[1])
+start = time.perf_counter()
+sorter.sort_images_and_texts()
+print({RESULT_MARKER!r} + json.dumps({{"seconds": time.perf_counter() - start}}), flush=True)
+"""
+
+
+def target_dirs(args):
+    targets = {}
+    for name in args.targets.split(","):
+        name = name.strip()
+        if name == "tmpfs":
+            if os.path.isdir(args.tmpfs_dir):
+                targets[name] = args.tmpfs_dir
+            else:
+                print(f"⚠️ {args.tmpfs_dir} not found, skipping the tmpfs target")
+        elif name == "disk":
+            targets[name] = args.disk_dir
+        elif name:
+            print(f"⚠️ Unknown target '{name}' ignored.")
+    return targets
+
+
+def ensure_corpus(folder, options):
+    """Generate the corpus into `folder` unless an identical one is already there."""
+    manifest_path = os.path.join(folder, "corpus.json")
+    if os.path.exists(manifest_path):
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if all(manifest.get(key) == value for key, value in options.items() if value is not None):
+            return manifest
+        shutil.rmtree(folder)
+    print(f"📦 Generating {options['count']:,} images in {folder} ...")
+    return generate(folder, **options)
+
+
+def write_config(work, base_config, sort_methods):
+    config = dict(base_config)
+    config.update({
+        "input_folders": [os.path.join(work, "input")],
+        "output_folder": os.path.join(work, "output"),
+        "use_output_folder": True,
+        "include_subfolders": True,
+        "sort_methods": sort_methods,
+        "metadata_keys": ["model"],
+        "sort_template": "",
+        "metrics": True,
+        "metrics_json_path": os.path.join(work, "metrics.json"),
+        "metrics_prometheus_path": "",
+        "metadata_cache_path": os.path.join(work, "metadata_cache.sqlite"),
+        "move_journal_path": os.path.join(work, "move_journal.sqlite"),
+        "cleanup_mode": "delete",
+        "save_metadata_json": False,
+    })
+    config_path = os.path.join(work, "config.yaml")
+    with open(config_path, "w", encoding="utf-8") as f:
+        yaml.safe_dump(config, f, sort_keys=False)  # ✅ resolution_folders are matched in config order
+    return config_path
+
+
+def run_once(corpus, work, base_config, sort_methods):
+    """Sort a fresh copy of `corpus` in a child process; returns the run's result dict."""
+    shutil.rmtree(work, ignore_errors=True)
+    shutil.copytree(corpus, os.path.join(work, "input"), ignore=shutil.ignore_patterns("corpus.json"))
+    config_path = write_config(work, base_config, sort_methods)
+
+    env = dict(os.environ)
+    env["PYTHONPATH"] = ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    log_path = os.path.join(work, "run.log")
+    with open(log_path, "w", encoding="utf-8") as log:
+        process = subprocess.run(
+            [sys.executable, "-c", CHILD_SCRIPT, config_path], cwd=work, env=env, stdout=log, stderr=subprocess.STDOUT
+        )
+    with open(log_path, "r", encoding="utf-8", errors="replace") as f:
+        lines = [line for line in f if line.startswith(RESULT_MARKER)]
+    if process.returncode != 0 or not lines:
+        raise RuntimeError(f"Sort run failed (exit code {process.returncode}), see {log_path}")
+
+    seconds = json.loads(lines[-1][len(RESULT_MARKER):])["seconds"]
+    with open(os.path.join(work, "metrics.json"), "r", encoding="utf-8") as f:
+        metrics = json.load(f)
+    files = metrics["counters"].get("run_discovered", 0)
+    return {
+        "files": files,
+        "seconds": round(seconds, 4),
+        "files_per_sec": round(files / seconds, 1) if seconds else 0.0,
+        "bytes_moved": metrics["counters"].get("bytes_moved", 0),
+        "stages": {
+            stage: {key: values[key] for key in ("count", "total", "mean", "p95")}
+            for stage, values in metrics["stages"].items()
+        },
+    }
+
+
+def print_result(name, result):
+    print(f"\n▶ {name}: {result['files']:,} files in {result['seconds']:.2f} s = {result['files_per_sec']:,.1f} files/s, "
+          f"{result['bytes_moved'] / 1e6:.1f} MB moved")
+    print(f"  {'stage':<24} {'count':>8} {'total s':>9} {'mean µs':>10} {'p95 µs':>10}")
+    for stage, values in sorted(result["stages"].items(), key=lambda item: -item[1]["total"]):
+        print(f"  {stage:<24} {values['count']:>8} {values['total']:>9.3f} "
+              f"{values['mean'] * 1e6:>10.1f} {values['p95'] * 1e6:>10.1f}")
+
+
+def compare(name, result, baseline, threshold, strict_stages):
+    """Print the changes against `baseline`; returns the number of regressions that fail the run."""
+    failures = 0
+    old_rate, new_rate = baseline["files_per_sec"], result["files_per_sec"]
+    change = (new_rate - old_rate) / old_rate if old_rate else 0.0
+    regressed = change < -threshold
+    print(f"  {'❌' if regressed else '✅'} files/s {old_rate:,.1f} → {new_rate:,.1f} ({change:+.1%})")
+    failures += regressed
+
+    for stage, values in sorted(result["stages"].items()):
+        old = baseline.get("stages", {}).get(stage)
+        if not old or not old["mean"]:
+            continue
+        stage_change = (values["mean"] - old["mean"]) / old["mean"]
+        if stage_change > threshold:
+            print(f"  {'❌' if strict_stages else '⚠️'} {stage}: mean {old['mean'] * 1e6:.1f} → "
+                  f"{values['mean'] * 1e6:.1f} µs ({stage_change:+.1%})")
+            failures += strict_stages
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_corpus_arguments(parser)
+    parser.add_argument("--targets", default="tmpfs,disk", help="Comma-separated: tmpfs, disk")
+    parser.add_argument("--tmpfs-dir", default="/dev/shm")
+    parser.add_argument("--disk-dir", default=os.path.join(ROOT, ".bench"))
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per target; the median run is reported")
+    parser.add_argument("--sort-methods", default="metadata,resolution", help="Comma-separated sort_methods")
+    parser.add_argument("--config", default=os.path.join(ROOT, "custom_sorter_config.yaml"),
+                        help="Base config; paths, metrics and cleanup are overridden")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--threshold", type=float, default=0.15, help="Allowed slowdown, e.g. 0.15 = 15%%")
+    parser.add_argument("--update-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--strict-stages", action="store_true", help="Also fail on per-stage slowdowns")
+    parser.add_argument("--keep", action="store_true", help="Keep the generated corpora and work folders")
+    args = parser.parse_args()
+
+    options = corpus_options(args)
+    with open(args.config, "r", encoding="utf-8") as f:
+        base_config = yaml.safe_load(f) or {}
+    sort_methods = [m.strip() for m in args.sort_methods.split(",") if m.strip()]
+
+    results = {}
+    for target, folder in target_dirs(args).items():
+        bench_root = os.path.join(folder, "custom_sorter_bench")
+        corpus = os.path.join(bench_root, f"corpus-{options['count']}-{options['seed']}")
+        ensure_corpus(corpus, options)
+        runs = [run_once(corpus, os.path.join(bench_root, "work"), base_config, sort_methods)
+                for _ in range(max(1, args.repeat))]
+        runs.sort(key=lambda run: run["files_per_sec"])
+        name = f"{target}/{options['count']}"
+        results[name] = runs[len(runs) // 2]
+        results[name]["files_per_sec_runs"] = [run["files_per_sec"] for run in runs]
+        print_result(name, results[name])
+        if not args.keep:
+            shutil.rmtree(bench_root, ignore_errors=True)
+
+    if not results:
+        print("❌ No target to run")
+        return 1
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    if args.update_baseline:
+        baseline.update(results)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=4, sort_keys=True)
+        print(f"\n✅ Baseline for {', '.join(results)} saved to {args.baseline}")
+        return 0
+
+    failures = 0
+    for name, result in results.items():
+        if name not in baseline:
+            print(f"\nℹ️ No baseline for {name} (record one with --update-baseline)")
+            continue
+        print(f"\n📈 {name} vs. baseline (threshold {args.threshold:.0%}):")
+        failures += compare(name, result, baseline[name], args.threshold, args.strict_stages)
+
+    if failures:
+        print(f"\n❌ {failures} regression(s) above {args.threshold:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
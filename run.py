@@ -1,10 +1,33 @@
+import argparse
 from scripts.cs import CustomSorter
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sort AI images by their metadata.")
+    parser.add_argument("command", nargs="?", default="sort", choices=["sort", "plan", "apply"],
+                        help="sort: plan and move in one go (default); plan: only write the move plan; "
+                             "apply: execute a saved plan")
+    parser.add_argument("--config", default="custom_sorter_config.yaml", help="Configuration file")
+    parser.add_argument("--plan-file", default="sort_plan.json", help="Plan file written by plan and read by apply")
+    parser.add_argument("--profile", choices=["cprofile", "sampling"], help="Profile this run (overrides `profile`)")
+    parser.add_argument("--profile-dir", help="Folder for the profile output (overrides `profile_dir`)")
+    parser.add_argument("--profile-tracemalloc", action="store_true", help="Also write a memory growth diff")
+    args = parser.parse_args()
+
     # Initialize the sorter with the test configuration
-    sorter = CustomSorter("custom_sorter_config.yaml")
+    sorter = CustomSorter(args.config)
+    if args.profile:
+        sorter.config["profile"] = args.profile
+    if args.profile_dir:
+        sorter.config["profile_dir"] = args.profile_dir
+    if args.profile_tracemalloc:
+        sorter.config["profile_tracemalloc"] = True
 
-    # Run the sorting process
-    sorter.sort_images_and_texts()
+    if args.command == "plan":
+        sorter.plan(args.plan_file)
+    elif args.command == "apply":
+        sorter.apply(args.plan_file)
+    else:
+        # Run the sorting process
+        sorter.sort_images_and_texts()
 
-    print("Sorting process completed for test folder")
+        print("Sorting process completed for test folder")
@@ -5,19 +5,24 @@ from scripts.cs_queue import QueueManager
 from scripts.post_processing_manager import PostProcessingManager
 from sort_methods.multi_sort import ImageSorter
 from sort_methods.metadataextractor import MetadataExtractor
+from scripts.metadata_stage import MetadataStage
+from scripts.cs_pipeline import SortPipeline
+from sort_methods.exiftool_pool import shutdown_pool
+from sort_methods.file_mover import shutdown_move_scheduler
+from sort_methods.move_engine import configure_move_engine, close_move_engine
+from sort_methods.move_journal import MoveJournal
+from sort_methods.duplicates import configure_digest_store, close_digest_store
+from sort_methods.trash import DeletionService
+from sort_methods.metrics import configure_metrics, get_metrics, export_metrics, timed
+from sort_methods.profiling import profiled_run
+from scripts.cs_plan import MovePlan, apply_plan
 import os
 import shutil
-import yaml
 import re
-from PIL import Image
-from filelock import FileLock, Timeout
-import psutil
 import time
 import atexit
-from send2trash import send2trash
-from tqdm import tqdm
-import concurrent.futures
 import logging
+# ✅ yaml, tqdm, filelock and psutil are imported where they are used, so startup stays fast
 
 
 class CustomSorter:
@@ -26,6 +31,7 @@ class CustomSorter:
         logging.basicConfig(filename="execution_time.log", level=logging.INFO, format="%(asctime)s - %(message)s")
 
         self.config = self.load_config(config_path)
+        configure_metrics(self.config.get("metrics", False))  # ✅ Off by default: timers are shared no-ops
         self.input_folders = self.config.get("input_folders", ["input"])
         self.output_folder = self.config.get("output_folder", "output")
         self.use_output_folder = self.config.get("use_output_folder", True)  # Default to True
@@ -35,6 +41,16 @@ class CustomSorter:
         self.dynamic_thresholds = self.config.get("dynamic_thresholds", False) #default to false to allow for customization        
         self.imagesorter = ImageSorter(self.input_folders[0], self.output_folder, config=self.config) 
         self.metadata_extractor = MetadataExtractor(config=self.config)  
+        self.metadata_stage = MetadataStage(self.config, self.metadata_extractor)
+        self.journal = MoveJournal.from_config(self.config)
+        # ✅ Collision digests live next to the cached metadata
+        if self.config.get("metadata_cache", True):
+            configure_digest_store(self.config.get("metadata_cache_path", "metadata_cache.sqlite"))
+        configure_move_engine(
+            fsync=self.config.get("move_fsync", "off"),
+            fsync_batch_size=self.config.get("move_fsync_batch_size", 64),
+            journal=self.journal,  # ✅ The engine records each move as started with the names it claimed
+        )
         self.metadata_key = self.config.get("metadata_key", "model").lower()
         # ✅ Ensure `sort_methods` is always a list of lowercase values
         self.sort_methods = [m.lower() for m in self.config.get("sort_methods", ["metadata"])]
@@ -106,6 +122,9 @@ class CustomSorter:
         
     def load_log(self):
         """Load the YAML log file with locking."""
+        import yaml
+        from filelock import FileLock, Timeout
+
         try:
             with FileLock(self.lock_file, timeout=self.LOCK_TIMEOUT):
                 if os.path.exists(self.log_file):
@@ -121,139 +140,152 @@ class CustomSorter:
         return {}
    
      
+    @profiled_run("sort")
     def sort_images_and_texts(self):
-        """Sort images and texts while keeping metadata in memory, with a progress bar."""
+        """Sort images and texts by streaming them through the scan → extract → plan → move pipeline."""
+        from tqdm import tqdm
+
         start_time = time.time()
-        metadata_dict = {}
-
-        # ✅ Count total image files for progress bar
-        total_files = 0
-        for input_folder in self.input_folders:
-            if self.config.get("include_subfolders", False):
-                walker = os.walk(input_folder)
-            else:
-                walker = [(input_folder, [], os.listdir(input_folder))]
-
-            for root, _, files in walker:
-                image_files = [f for f in files if f.lower().endswith((".png", ".jpg", ".jpeg", ".webp"))]
-
-                if self.config.get("only_process_unsorted", True):
-                    rel_path = os.path.relpath(root, input_folder)
-                    if rel_path != ".":
-                        continue  # Skip nested folders in unsorted-only mode
-
-                total_files += len(image_files)
-
-
-        sort_start_time = time.time()
-        with tqdm(total=total_files, desc="Processing Files", unit="file") as pbar:
-            for input_folder in self.input_folders:
-                if self.config.get("include_subfolders", False):
-                    walker = os.walk(input_folder)  # 🔁 Recursive
-                else:
-                    walker = [(input_folder, [], os.listdir(input_folder))]  # 🔁 Just the top level
-                
-
-                for root, _, files in walker:  
-                    if self.config.get("only_process_unsorted", True):
-                        if any(f.endswith(".flag") for f in os.listdir(root)):
-                            if self.config.get("_debug", False):
-                                print(f"⏭️ Skipping flagged folder: {root}")
-                            continue
-                        #rel_path = os.path.relpath(root, input_folder)
-                        #if rel_path != ".":
-                        #    continue  # ⏭️ Skip files already inside a subfolder                    
-                
-                    with concurrent.futures.ThreadPoolExecutor() as executor:
-                        futures_sorting = []
-                        #futures_analysis = []
-
-                        for file in files:
-                            if not file.lower().endswith((".png", ".jpg", ".jpeg", ".webp")):
-                                continue
-
-                            file_path = os.path.join(root, file)
-                            metadata = self.metadata_extractor.extract_metadata(file_path)
-                    
-                            if not metadata:
-                                continue
-                             
-                            future_sort = executor.submit(
-                                self.imagesorter.process_single_image,
-                                file_path,
-                                self.config,
-                                metadata,
-                                pbar
-                            )
-
-                            futures_sorting.append(future_sort)
-
-                        # ✅ Real-time sorting progress
-                        for future in concurrent.futures.as_completed(futures_sorting):
-                            try:
-                                future.result()
-                            except Exception as e:
-                                print(f"❌ Error during sorting: {e}")
-                            
-
-                        sort_end_time = time.time()
-                        sort_duration = sort_end_time - sort_start_time
-                        print(f"⏳ Sorting completed in {sort_duration:.2f} seconds.")
-                        logging.info(f"Sorting completed in {sort_duration:.2f} seconds.")
-
-                        # ✅ Determine where files were sorted to
-                        sorted_folder = self.imagesorter.get_sorted_folder()
-
-                        # analysis_start_time is still needed
-                        analysis_start_time = time.time()
-
-                        # 🔧 NOTE: Analysis futures are currently stubbed
-                        # for file in files:
-                        #     file_path = os.path.join(root, file)
-                        #     futures_analysis.append(executor.submit(self.ia.analyze_image, file_path))
-
-                        # ✅ Real-time analysis progress (currently no actual jobs)
-                        '''
-                        for future in concurrent.futures.as_completed(futures_analysis):
-                            try:
-                                future.result()
-                            except Exception as e:
-                                print(f"❌ Error during analysis: {e}")
-                            pbar.update(1)
-
-                        #analysis_end_time = time.time()
-                        #analysis_duration = analysis_end_time - analysis_start_time
-                        #print(f"⏳ Analysis completed in {analysis_duration:.2f} seconds.")
-                        #logging.info(f"Analysis completed in {analysis_duration:.2f} seconds.")
-                        total_time = sort_duration + analysis_duration
-                        '''
-                        total_time = sort_duration
-                        print(f"✅ Total processing time: {total_time:.2f} seconds.")
-                        logging.info(f"Total processing time: {total_time:.2f} seconds.")
-
-        #print("✅ Sorting & Analysis completed in parallel!")
+
+        # ✅ The total grows as folders are scanned, so moving starts without a pre-count
+        with tqdm(total=0, desc="Processing Files", unit="file") as pbar:
+            pipeline = SortPipeline(
+                self.config,
+                self.input_folders,
+                self.metadata_stage,
+                self.imagesorter,
+                self.output_folder,
+                pbar=pbar,
+                journal=self.journal,
+            )
+            counts = pipeline.run()
+
+        sort_duration = time.time() - start_time
+        print(f"⏳ Sorting completed in {sort_duration:.2f} seconds.")
+        logging.info(f"Sorting completed in {sort_duration:.2f} seconds.")
+        if counts["errors"]:
+            print(f"⚠️ {counts['errors']} files could not be sorted. See the messages above.")
+
+        self.metadata_stage.shutdown()  # ✅ Stop the metadata worker processes
+        shutdown_pool()  # ✅ Stop the long-lived ExifTool workers before post-processing
+        shutdown_move_scheduler()  # ✅ Wait for the per-device move queues to drain
+        close_move_engine()  # ✅ Sync and unlink any sources still waiting on a batched fsync
+        close_digest_store()
+        if self.journal:
+            self.journal.flush()
+        self.metadata_extractor.close()  # ✅ Commit the persistent metadata cache
 
         end_time = time.time()
         elapsed_time = end_time - start_time        
 
+        with timed("post_process"):
+            self.post_process()
+
+        print(f"\n✅ Processed {counts['discovered']} files in {elapsed_time:.2f} seconds.\n")
+        self.record_metrics("sort", sort_duration, counts)
+
+    @profiled_run("plan")
+    def plan(self, plan_path="sort_plan.json"):
+        """Compute the full sort plan without moving anything and save it to `plan_path` for review."""
+        from tqdm import tqdm
+
+        start_time = time.time()
+        plan = MovePlan(source={"input_folders": self.input_folders, "output_folder": self.output_folder})
+
+        with tqdm(total=0, desc="Planning Files", unit="file") as pbar:
+            pipeline = SortPipeline(
+                self.config,
+                self.input_folders,
+                self.metadata_stage,
+                self.imagesorter,
+                self.output_folder,
+                pbar=pbar,
+                plan_sink=plan,
+            )
+            pipeline.run()
+
+        self.metadata_stage.shutdown()
+        shutdown_pool()
+        self.metadata_extractor.close()
+
+        # ✅ Collisions are resolved now, so the plan can be applied later without surprises
+        for collision in plan.detect_collisions():
+            print(f"⚠️ Collision: {collision['source']} ➝ {collision['destination']} ({collision['reason']})")
+        plan.save(plan_path)
+        print(f"\n📝 Plan saved to {plan_path}: {plan.summary()} in {time.time() - start_time:.2f} seconds.\n")
+        self.record_metrics("plan", time.time() - start_time, {"planned": plan.file_count()})
+        return plan
+
+    @profiled_run("apply")
+    def apply(self, plan_path="sort_plan.json"):
+        """Execute a plan saved by `plan` with bulk folder creation and one flag write per folder."""
+        from tqdm import tqdm
+
+        start_time = time.time()
+        try:
+            plan = MovePlan.load(plan_path)
+        except (OSError, ValueError) as e:
+            print(f"❌ Could not load plan {plan_path}: {e}")
+            return None
+        print(f"📝 Applying plan from {plan.created}: {plan.summary()}")
+
+        with tqdm(total=plan.file_count(), desc="Moving Files", unit="file") as pbar:
+            counts = apply_plan(
+                plan, self.imagesorter, threads=self.config.get("file_move_threads", "auto"),
+                journal=self.journal, pbar=pbar,
+            )
+
+        shutdown_move_scheduler()
+        close_move_engine()
+        close_digest_store()
+        if self.journal:
+            self.journal.flush()
+        if counts["errors"] or counts["skipped"]:
+            print(f"⚠️ {counts['errors']} files failed and {counts['skipped']} were skipped. See the messages above.")
+
+        with timed("post_process"):
+            self.post_process()
+
+        print(f"\n✅ Moved {counts['moved']} files in {time.time() - start_time:.2f} seconds.\n")
+        self.record_metrics("apply", time.time() - start_time, counts)
+        return counts
+
+    def record_metrics(self, stage, duration, counts):
+        """Add a run's duration and file counts to the metrics and export them (no-op when `metrics` is off)."""
+        metrics = get_metrics()
+        if metrics is None:
+            return
+        metrics.observe(stage, duration)
+        for outcome, amount in counts.items():
+            metrics.count(f"run_{outcome}", amount)
+        export_metrics(self.config)
+
+    def post_process(self):
+        """Clean up the input folders after a run and clear the finished journal entries."""
         try:
-            post_processor = PostProcessingManager(self.input_folders, self.output_folder)
+            # ✅ Only the files and folders this run touched are revisited
+            with self.imagesorter.moves_lock:
+                moves, self.imagesorter.moves = self.imagesorter.moves, []
+                duplicates, self.imagesorter.duplicates = self.imagesorter.duplicates, []
+            # ✅ Sources whose identical copy is already sorted are kept unless asked otherwise
+            if not self.config.get("delete_duplicate_sources", False):
+                duplicates = None
+            post_processor = PostProcessingManager(
+                self.input_folders, self.output_folder, moves=moves, deleter=DeletionService.from_config(self.config),
+                duplicates=duplicates,
+            )
             post_processor.compare_and_clean()
         except PermissionError as e:
             print(f"PermissionError during post-processing: {e}")
-            self.terminate_locking_process(file_path)
+            self.terminate_locking_process(e.filename)
             time.sleep(2)
             try:
                 post_processor.compare_and_clean()
             except Exception as retry_error:
                 print(f"Failed post-processing even after retry: {retry_error}")
 
-        print(f"\n✅ Processed {total_files} files in {elapsed_time:.2f} seconds.\n")
-
-           
-           
-
-            
+        if self.journal:
+            self.journal.compact()  # ✅ Run finished: only unfinished moves are kept for the next run
 
     @classmethod
     def terminate_locking_process(self, file_path):
@@ -261,6 +293,8 @@ class CustomSorter:
         Identify and terminate the process locking a specific file.
         :param file_path: The file path to check for locks.
         """
+        import psutil
+
         for proc in psutil.process_iter(['pid', 'name']):
             try:
                 for open_file in proc.open_files():
@@ -276,6 +310,8 @@ class CustomSorter:
             
     @staticmethod
     def load_config(config_path):
+        import yaml
+
         try:
             with open(config_path, "r") as file:
                 return yaml.safe_load(file)
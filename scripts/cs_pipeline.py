@@ -0,0 +1,260 @@
+import os
+import queue
+import threading
+from sort_methods.dir_index import walk_indexes, group_by_stem, IMAGE_EXTENSIONS
+
+_DONE = object()  # End-of-stream marker passed between stages
+
+
+class SortPipeline:
+    """
+    Streams files through four stages connected by bounded queues:
+
+        scan → extract → plan → move
+
+    The scanner walks the input folders lazily and hands out batches of image paths,
+    metadata is extracted on the `MetadataStage` process pool, destinations are planned
+    by `ImageSorter.plan_image` and files are moved by `ImageSorter.move_planned`.
+    Every stage has its own worker count and the bounded queues apply backpressure,
+    so memory stays flat and files start moving as soon as the first batch is scanned.
+
+    With a `MoveJournal`, planned moves are committed to the journal in batches before
+    they are queued (the `MoveEngine` marks each one started with the destination it
+    claimed), and moves left unfinished by an interrupted run are queued straight to
+    the move stage.
+    With a `plan_sink` (e.g. a `MovePlan`), planned moves are handed to its `add` method
+    instead and nothing is moved.
+    """
+
+    def __init__(self, config, input_folders, metadata_stage, imagesorter, output_folder, pbar=None, journal=None,
+                 plan_sink=None):
+        self.config = config
+        self.input_folders = input_folders
+        self.metadata_stage = metadata_stage
+        self.imagesorter = imagesorter
+        self.output_folder = output_folder
+        self.pbar = pbar
+        self.journal = journal
+        self.plan_sink = plan_sink
+        self.debug = config.get("_debug", False)
+
+        queue_size = max(1, int(config.get("pipeline_queue_size", 256)))
+        self.batch_size = max(1, int(config.get("metadata_chunk_size", 64)))
+        self.plan_workers = max(1, int(config.get("plan_workers", 2)))
+        self.move_workers = max(1, int(config.get("move_workers", 4)))
+
+        self.scan_queue = queue.Queue(maxsize=queue_size)  # Batches of (image path, cached stat result)
+        self.plan_queue = queue.Queue(maxsize=queue_size)  # (image_path, metadata)
+        self.move_queue = queue.Queue(maxsize=queue_size)  # (sorted_folder, associated_files, image count)
+
+        self.counts = {"discovered": 0, "moved": 0, "skipped": 0, "errors": 0, "resumed": 0, "planned": 0}
+        self.lock = threading.Lock()
+        self.indexes = {}  # folder -> [DirectoryIndex, images not yet planned]
+        self.plan_workers_left = self.plan_workers
+
+    def run(self):
+        """Run every stage to completion and return the per-outcome counts."""
+        # ✅ Reconcile the journal first so unfinished moves skip scanning and extraction
+        self.resumed = self.journal.recover() if self.journal else {}
+        self.resumed_files = set()
+
+        threads = [threading.Thread(target=self.scan, name="cs-scan", daemon=True)]
+        threads.append(threading.Thread(target=self.extract, name="cs-extract", daemon=True))
+        threads += [
+            threading.Thread(target=self.plan, name=f"cs-plan-{i}", daemon=True) for i in range(self.plan_workers)
+        ]
+        threads += [
+            threading.Thread(target=self.move, name=f"cs-move-{i}", daemon=True) for i in range(self.move_workers)
+        ]
+
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return dict(self.counts)
+
+    def _count(self, outcome, amount=1):
+        with self.lock:
+            self.counts[outcome] += amount
+        if self.pbar is not None and outcome not in ("discovered", "resumed"):
+            self.pbar.update(amount)
+
+    def _discovered(self, amount):
+        self._count("discovered", amount)
+        if self.pbar is not None:
+            self.pbar.total += amount  # ✅ Totals are discovered lazily
+            self.pbar.refresh()
+
+    def queue_resumed_moves(self):
+        """Queue the moves an interrupted run left unfinished, grouped by destination folder."""
+        for sorted_folder, files in self.resumed.items():
+            self.resumed_files.update(files)
+            for group in group_by_stem(files):
+                # Keep the scanner from planning these files a second time
+                self.imagesorter.claim(os.path.splitext(group[0])[0])
+                images = sum(1 for f in group if f.lower().endswith(IMAGE_EXTENSIONS)) or 1
+                self._discovered(images)
+                self._count("resumed", images)
+                self.move_queue.put((sorted_folder, group, images))
+        if self.resumed:
+            print(f"🔁 Resuming {self.counts['resumed']} unfinished moves from the previous run.")
+
+    def iter_folders(self):
+        """Yield a `DirectoryIndex` for every folder that should be sorted."""
+        include_subfolders = self.config.get("include_subfolders", False)
+        only_unsorted = self.config.get("only_process_unsorted", True)
+
+        for input_folder in self.input_folders:
+            # 🔁 Each folder is listed once with os.scandir; recursive only if include_subfolders
+            for index in walk_indexes(input_folder, recursive=include_subfolders):
+                if only_unsorted and index.has_flag:
+                    if self.debug:
+                        print(f"⏭️ Skipping flagged folder: {index.path}")
+                    continue
+                yield index
+
+    def _index_for(self, file_path):
+        with self.lock:
+            entry = self.indexes.get(os.path.dirname(file_path))
+        return entry[0] if entry else None
+
+    def _release_index(self, file_path):
+        """Forget a folder's index once every image in it has been planned."""
+        folder = os.path.dirname(file_path)
+        with self.lock:
+            entry = self.indexes.get(folder)
+            if entry is not None:
+                entry[1] -= 1
+                if entry[1] <= 0:
+                    del self.indexes[folder]
+
+    def scan(self):
+        """Stage 1: walk the input folders and queue image paths in batches."""
+        try:
+            self.queue_resumed_moves()
+            for index in self.iter_folders():
+                # ✅ The listing's stat results travel with the paths, so extraction doesn't stat again
+                image_paths = index.images_with_stats()
+                if self.resumed_files:
+                    image_paths = [item for item in image_paths if item[0] not in self.resumed_files]
+                if not image_paths:
+                    continue
+                with self.lock:
+                    self.indexes[index.path] = [index, len(image_paths)]
+                for i in range(0, len(image_paths), self.batch_size):
+                    batch = image_paths[i:i + self.batch_size]
+                    self._discovered(len(batch))
+                    self.scan_queue.put(batch)
+        except Exception as e:
+            print(f"❌ Error while scanning input folders: {e}")
+        finally:
+            self.scan_queue.put(_DONE)
+
+    def _scanned_batches(self):
+        while True:
+            batch = self.scan_queue.get()
+            if batch is _DONE:
+                return
+            yield batch
+
+    def extract(self):
+        """Stage 2: extract metadata on the process pool, in scan order."""
+        try:
+            for file_path, metadata, error in self.metadata_stage.extract_batches(self._scanned_batches()):
+                if error:
+                    print(f"❌ Error extracting metadata from {file_path}: {error}")
+                    self._count("errors")
+                    self._release_index(file_path)
+                elif not metadata:
+                    self._count("skipped")
+                    self._release_index(file_path)
+                else:
+                    self.plan_queue.put((file_path, metadata))
+        except Exception as e:
+            print(f"❌ Error during metadata extraction: {e}")
+            # ✅ Unblock the scanner and count what could not be extracted, so no file goes missing
+            for batch in self._scanned_batches():
+                self._count("errors", len(batch))
+                for file_path, _ in batch:
+                    self._release_index(file_path)
+        finally:
+            for _ in range(self.plan_workers):
+                self.plan_queue.put(_DONE)
+
+    def _queue_moves(self, ready):
+        """Commit the journal's planned rows for `ready`, then hand the moves to the move stage."""
+        if self.journal:
+            self.journal.flush()  # ✅ Write-ahead: the plan is durable before any of it moves
+        for item in ready:
+            self.move_queue.put(item)
+        ready.clear()
+
+    def plan(self):
+        """Stage 3: compute the destination folder and sidecar files of each image."""
+        ready = []  # Planned moves waiting for their journal batch to be committed
+        batch_size = self.journal.batch_size if self.journal else 1
+        try:
+            while True:
+                # ✅ Don't sit on a partial batch while waiting for more work
+                if ready and (len(ready) >= batch_size or self.plan_queue.empty()):
+                    self._queue_moves(ready)
+                item = self.plan_queue.get()
+                if item is _DONE:
+                    break
+                file_path, metadata = item
+                try:
+                    plan = self.imagesorter.plan_image(
+                        file_path, self.config, {"metadata": metadata}, self.output_folder,
+                        index=self._index_for(file_path),
+                    )
+                except Exception as e:
+                    print(f"❌ Error during sorting: {e}")
+                    self._count("errors")
+                    continue
+                finally:
+                    self._release_index(file_path)
+                if plan is None:
+                    self._count("skipped")
+                else:
+                    sorted_folder, associated_files = plan
+                    if self.plan_sink is not None:
+                        self.plan_sink.add(sorted_folder, associated_files)
+                        self._count("planned")
+                        continue
+                    if self.journal:
+                        self.journal.planned(associated_files, sorted_folder)
+                    ready.append((sorted_folder, associated_files, 1))
+        finally:
+            if ready:
+                self._queue_moves(ready)
+            with self.lock:
+                self.plan_workers_left -= 1
+                last = self.plan_workers_left == 0
+            if last:
+                for _ in range(self.move_workers):
+                    self.move_queue.put(_DONE)
+
+    def move(self):
+        """Stage 4: move the planned files, write folder flags and log the moves."""
+        while True:
+            item = self.move_queue.get()
+            if item is _DONE:
+                break
+            sorted_folder, associated_files, images = item
+            try:
+                moved, skipped, destinations = self.imagesorter.move_planned(sorted_folder, associated_files)
+            except Exception as e:
+                print(f"❌ Error during sorting: {e}")
+                self._count("errors", images)
+                continue
+
+            if self.journal:
+                if moved:
+                    self.journal.completed(moved, sorted_folder, [destinations[src] for src in moved])
+                if skipped:
+                    self.journal.skipped(skipped, sorted_folder, [destinations[src] for src in skipped])
+                failed = set(associated_files).difference(moved, skipped)
+                if failed:
+                    self.journal.failed(failed, sorted_folder)
+            # ✅ A group is moved or skipped as a whole; neither means the move failed
+            self._count("moved" if moved else "skipped" if skipped else "errors", images)
@@ -0,0 +1,177 @@
+import os
+import json
+import threading
+import concurrent.futures
+from datetime import datetime
+from sort_methods.move_engine import get_move_engine, MOVED, SKIPPED_IDENTICAL
+from sort_methods.file_mover import get_move_scheduler
+from sort_methods.dir_index import group_by_stem
+
+PLAN_VERSION = 2  # Version 1 listed files without their groups
+
+
+class MovePlan:
+    """
+    A complete sort plan: every destination folder with the images that will move into it.
+
+    Sidecars are already resolved (each image is a group: the image and its `.txt`/`.json`
+    files) and collisions are detected up front:
+
+    - two sources that would land on the same destination path
+    - a destination file that already exists on disk
+
+    An image and its sidecars are checked as one group: if any of them collides, the
+    whole group is listed in `collisions` and left out when the plan is applied, so
+    an image never gets separated from its `.txt`/`.json`.
+    """
+
+    def __init__(self, destinations=None, collisions=None, created=None, source=None):
+        self.destinations = destinations if destinations is not None else {}  # folder -> [[image, sidecar, ...], ...]
+        self.collisions = collisions if collisions is not None else []  # {"source", "destination", "reason"}
+        self.created = created or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.source = source or {}  # Input/output folders the plan was made for
+        self.lock = threading.Lock()
+
+    def add(self, sorted_folder, associated_files):
+        """Add one planned image (the image and its sidecars) to the plan."""
+        with self.lock:
+            self.destinations.setdefault(sorted_folder, []).append(list(associated_files))
+
+    def detect_collisions(self):
+        """Move colliding groups out of `destinations` and into `collisions`."""
+        claimed = {}  # destination path -> source
+        collisions = []
+        for folder, groups in self.destinations.items():
+            kept = []
+            for group in groups:
+                targets = [(src, os.path.join(folder, os.path.basename(src))) for src in group]
+                reasons = {}
+                for src, destination in targets:
+                    key = os.path.normcase(os.path.abspath(destination))
+                    if key in claimed:
+                        reasons[src] = f"same destination as {claimed[key]}"
+                    elif os.path.exists(destination):
+                        reasons[src] = "destination exists"
+                if reasons:
+                    # ✅ Leave the whole group behind, not just the file that collides
+                    first = next(iter(reasons))
+                    for src, destination in targets:
+                        collisions.append({"source": src, "destination": destination,
+                                           "reason": reasons.get(src, f"moves with {first}")})
+                    continue
+                for src, destination in targets:
+                    claimed[os.path.normcase(os.path.abspath(destination))] = src
+                kept.append(group)
+            self.destinations[folder] = kept
+
+        self.destinations = {folder: groups for folder, groups in self.destinations.items() if groups}
+        self.collisions.extend(collisions)
+        return collisions
+
+    def file_count(self):
+        return sum(len(group) for groups in self.destinations.values() for group in groups)
+
+    def save(self, path):
+        """Write the plan as JSON, one destination folder per key and one list per image group."""
+        data = {
+            "version": PLAN_VERSION,
+            "created": self.created,
+            "source": self.source,
+            "destinations": {
+                folder: sorted(sorted(group) for group in groups) for folder, groups in sorted(self.destinations.items())
+            },
+            "collisions": self.collisions,
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=1, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        version = data.get("version")
+        if version not in (1, PLAN_VERSION):
+            raise ValueError(f"Unsupported plan version {version} in {path}")
+        destinations = data.get("destinations", {})
+        if version == 1:
+            # ✅ Flat file lists: rebuild the groups the way the scanner finds sidecars
+            destinations = {folder: group_by_stem(files) for folder, files in destinations.items()}
+        return cls(destinations, data.get("collisions", []), data.get("created"), data.get("source"))
+
+    def summary(self):
+        return (f"{self.file_count()} files into {len(self.destinations)} folders"
+                f" ({len(self.collisions)} collisions left out)")
+
+
+def apply_plan(plan, imagesorter, threads="auto", journal=None, pbar=None):
+    """
+    Execute a `MovePlan` in bulk.
+
+    All destination folders are created first, image groups are submitted ordered by
+    source folder (so each source directory is read in one sweep), and each destination
+    gets exactly one flag write and one log pass once its files are moved. A group with a
+    source that is gone, or a destination that appeared since planning, is skipped as a
+    whole, never overwritten. With a journal, the `MoveEngine` marks each group started
+    with the names it claimed, so an interrupted apply is resumed by the next run.
+
+    Returns the file counts `{"moved", "skipped", "errors"}`.
+    """
+    counts = {"moved": 0, "skipped": 0, "errors": 0}
+    engine = get_move_engine()
+
+    # ✅ Batched mkdir: one pass over the destinations before any file moves
+    for folder in plan.destinations:
+        engine.ensure_dir(folder)
+
+    moves = []
+    for folder, groups in plan.destinations.items():
+        for group in groups:
+            changed = [src for src in group
+                       if not os.path.exists(src) or os.path.exists(os.path.join(folder, os.path.basename(src)))]
+            if changed:
+                print(f"⚠️ Skipping {', '.join(group)}: {changed[0]} changed since the plan was made")
+                counts["skipped"] += len(group)
+                if pbar is not None:
+                    pbar.update(len(group))
+                continue
+            moves.append((os.path.dirname(group[0]), group, folder))
+    moves.sort()
+
+    if journal:
+        for _, group, folder in moves:
+            journal.planned(group, folder)
+        journal.flush()
+
+    scheduler = get_move_scheduler(threads)
+    futures = {scheduler.submit_group(group, folder): (group, folder) for _, group, folder in moves}
+    moved = {}  # destination folder -> [src, ...]
+    skipped = {}  # destination folder -> [src, ...] left in place, identical copies are there
+    destinations = {}  # src -> where it went, or the identical copy it matched
+    for future in concurrent.futures.as_completed(futures):
+        group, folder = futures[future]
+        try:
+            status, paths = future.result()
+        except Exception as e:
+            print(f"❌ Failed to move {', '.join(group)}: {e}")
+            status, paths = None, []
+        destinations.update(zip(group, paths))
+        if status == MOVED:
+            moved.setdefault(folder, []).extend(group)
+            counts["moved"] += len(group)
+        elif status == SKIPPED_IDENTICAL:
+            skipped.setdefault(folder, []).extend(group)
+            counts["skipped"] += len(group)
+        else:
+            counts["errors"] += len(group)
+            if journal:
+                journal.failed(group, folder)
+        if pbar is not None:
+            pbar.update(len(group))
+
+    # ✅ One flag write and one journal/log batch per destination
+    for folder in moved.keys() | skipped.keys():
+        imagesorter.finish_folder(folder, moved.get(folder, []), skipped.get(folder, []), destinations)
+        if journal:
+            journal.completed(moved.get(folder, []), folder, [destinations[src] for src in moved.get(folder, [])])
+            journal.skipped(skipped.get(folder, []), folder, [destinations[src] for src in skipped.get(folder, [])])
+    return counts
@@ -1,8 +1,8 @@
 import shutil
 import time
-from filelock import FileLock, Timeout
+import hashlib
 import os
-from send2trash import send2trash
+from sort_methods.duplicates import resolve_collision, get_digest_store
 
 class QueueManager:
     def __init__(self, lock_file="file_operations_log.lock", log_file="file_operations_log.yaml", timeout=5):
@@ -28,18 +28,15 @@ class QueueManager:
                 continue
 
             try:
-                # Hash-checking logic
+                # Staged comparison: size, then head/tail hash, then a (cached) full hash
                 if os.path.exists(dst):
-                    source_hash = self.calculate_file_hash(src)
-                    destination_hash = self.calculate_file_hash(dst)
-                    if source_hash == destination_hash:
+                    resolved = resolve_collision(src, dst, get_digest_store())
+                    if resolved is None:
                         print(f"File {src} already exists in destination and is identical. Skipping.")
                         self.queue.remove(item)
                         continue
-                    else:
-                        print(f"File {src} is different from {dst}. Renaming.")
-                        base, ext = os.path.splitext(dst)
-                        dst = f"{base}_new{ext}"
+                    print(f"File {src} is different from {dst}. Renaming to {resolved}.")
+                    dst = resolved
 
                 # Move or copy the file
                 shutil.move(src, dst)
@@ -56,6 +53,8 @@ class QueueManager:
         """Cleanup the lock file after processing."""
         if os.path.exists(self.lock_file):
             try:
+                from send2trash import send2trash
+
                 send2trash(self.lock_file)
                 print(f"Cleaned up lock file: {self.lock_file}")
             except Exception as e:
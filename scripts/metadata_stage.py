@@ -0,0 +1,168 @@
+import os
+import collections
+import concurrent.futures
+from sort_methods.metadataextractor import MetadataExtractor
+from sort_methods.exiftool_pool import configure_pool
+from sort_methods.metrics import configure_metrics, get_metrics
+from sort_methods.profiling import start_worker_profiler
+
+# Per-process extractor, created by _init_worker in each pool process
+_worker_extractor = None
+
+
+def _init_worker(config):
+    global _worker_extractor
+    configure_metrics(config.get("metrics", False))  # ✅ Fresh counters, not the ones inherited from the parent
+    _worker_extractor = MetadataExtractor(config=config)
+    configure_pool(1)  # ✅ Each worker process is single threaded, one ExifTool is enough
+    start_worker_profiler(config)  # ✅ Only when the parent run is being profiled
+
+
+def _worker_context():
+    """
+    Start workers from a fork server where there is one (Linux, macOS).
+
+    The pool is created lazily, once the scanner, mover and ExifTool threads are running;
+    forking that process could copy a lock some other thread was holding. The fork server
+    is a clean single-threaded process, and Windows spawns workers anyway.
+    """
+    import multiprocessing
+
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return None  # ✅ The platform default (spawn)
+
+
+def _extract_chunk(file_paths):
+    """Extract metadata for a chunk of files (see `extract_paths`) in a worker process; returns `(results, metrics or None)`."""
+    results = extract_paths(_worker_extractor, file_paths)
+    cache = _worker_extractor.cache
+    if cache is not None:
+        cache.flush()  # ✅ Pool processes exit without running atexit handlers
+    metrics = get_metrics()
+    return results, metrics.drain() if metrics is not None else None
+
+
+def extract_paths(extractor, file_paths):
+    """
+    Return a compact `(file_path, metadata, error)` tuple per file.
+
+    `file_paths` may also hold `(file_path, stat_result)` pairs (from a `DirectoryIndex`),
+    so the metadata cache can identify the file without another stat() call.
+    `metadata` is the inner metadata dict (None when nothing was found) and `error`
+    is the exception message if extraction failed.
+    """
+    results = []
+    for item in file_paths:
+        file_path, st = item if isinstance(item, tuple) else (item, None)
+        try:
+            extracted = extractor.extract_metadata(file_path, st)
+            results.append((file_path, extracted.get("metadata") if extracted else None, None))
+        except Exception as e:
+            results.append((file_path, None, str(e)))
+    return results
+
+
+def resolve_worker_count(workers="auto"):
+    """Translate the `metadata_workers` config value into a process count."""
+    if workers in (None, "auto"):
+        return os.cpu_count() or 1
+    try:
+        return max(1, int(workers))
+    except (ValueError, TypeError):
+        print(f"⚠️ Invalid metadata_workers value: '{workers}'. Extracting metadata on the main process.")
+        return 1
+
+
+class MetadataStage:
+    """
+    Runs metadata extraction on a process pool so prompt parsing can use every core.
+
+    Files are submitted in chunks and results are yielded in input order as soon as
+    they are ready. Small batches, or `metadata_workers: 1`, run inline on the
+    calling process instead.
+    """
+
+    def __init__(self, config, extractor):
+        self.config = config
+        self.extractor = extractor  # ✅ Used for inline extraction
+        self.workers = resolve_worker_count(config.get("metadata_workers", "auto"))
+        self.chunk_size = max(1, int(config.get("metadata_chunk_size", 64)))
+        self.executor = None
+
+    def _get_executor(self):
+        if self.executor is None:
+            self.executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=_worker_context(),
+                initializer=_init_worker,
+                initargs=(self.config,),
+            )
+        return self.executor
+
+    def extract(self, file_paths):
+        """Yield `(file_path, metadata, error)` for every path, preserving order."""
+        file_paths = list(file_paths)
+        if self.workers <= 1 or len(file_paths) <= self.chunk_size:
+            yield from extract_paths(self.extractor, file_paths)
+            return
+
+        chunks = [file_paths[i:i + self.chunk_size] for i in range(0, len(file_paths), self.chunk_size)]
+        yield from self.extract_batches(chunks)
+
+    def extract_batches(self, batches):
+        """
+        Yield `(file_path, metadata, error)` for each batch of paths, preserving order.
+
+        `batches` is consumed lazily and at most `2 * workers` batches are in flight,
+        so a slow consumer (or an endless scanner) keeps memory flat.
+        """
+        if self.workers <= 1:
+            for batch in batches:
+                yield from extract_paths(self.extractor, batch)
+            return
+
+        max_in_flight = self.workers * 2
+        pending = collections.deque()
+        for batch in batches:
+            future = self._submit(batch) if self.workers > 1 else None
+            pending.append((batch, future))
+            while pending and (len(pending) > max_in_flight or pending[0][1] is None or pending[0][1].done()):
+                yield from self._collect(*pending.popleft())
+        while pending:
+            yield from self._collect(*pending.popleft())
+
+    def _submit(self, batch):
+        """Submit `batch` to the pool; None (extract it inline) if the pool can't take it."""
+        try:
+            return self._get_executor().submit(_extract_chunk, batch)
+        except Exception as e:
+            self._pool_failed(e)
+            return None
+
+    def _pool_failed(self, error):
+        if self.workers > 1:
+            print(f"❌ Metadata worker pool crashed ({error}). Extracting the remaining files on the main process.")
+            self.shutdown()
+            self.workers = 1
+
+    def _collect(self, batch, future):
+        if future is not None:
+            try:
+                results, worker_metrics = future.result()
+                metrics = get_metrics()
+                if worker_metrics is not None and metrics is not None:
+                    metrics.merge(worker_metrics)  # ✅ Fold the worker's timings into the run's
+                return results
+            except (concurrent.futures.BrokenExecutor, concurrent.futures.CancelledError) as e:
+                self._pool_failed(e)
+            except Exception as e:
+                # ✅ One bad batch (e.g. an unpicklable result) is redone inline; the pool keeps running
+                print(f"⚠️ Metadata worker failed on a batch of {len(batch)} files ({e}). Extracting it on the main process.")
+        return extract_paths(self.extractor, batch)
+
+    def shutdown(self):
+        """Stop the worker processes."""
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
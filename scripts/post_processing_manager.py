@@ -1,24 +1,37 @@
 import os
-import time
-from send2trash import send2trash
+from sort_methods.duplicates import files_identical, get_digest_store
+from sort_methods.trash import DeletionService
 
 class PostProcessingManager:
-    def __init__(self, input_folders, output_folder):
+    def __init__(self, input_folders, output_folder, moves=None, deleter=None, duplicates=None):
         """
         Initialize the post-processing manager with input and output folder paths.
         :param input_folders: List of input folder paths
         :param output_folder: Path to the output folder
+        :param moves: (source file, destination folder) pairs recorded during the run.
+                      When given, only those files and their source folders are looked at.
+        :param deleter: `DeletionService` used to remove duplicates (trash with retries by default)
+        :param duplicates: (source file, identical copy) pairs of files that were not moved because
+                           the copy was already sorted. Only these sources are ever deleted.
         """
         self.input_folders = input_folders
         self.output_folder = output_folder
+        self.moves = moves
+        self.duplicates = duplicates or []
+        self.deleter = deleter or DeletionService()
 
     def compare_and_clean(self):
         """
         Compare files in output folders with input folders and delete duplicates from input folders.
         """
+        if self.moves is not None:
+            self.clean_recorded_moves()
+            return
+
         # Get a list of all files in the output folder
         output_files = self._get_all_files(self.output_folder)
 
+        duplicates = []
         for input_folder in self.input_folders:
             # Get all files in the current input folder
             input_files = self._get_all_files(input_folder)
@@ -27,11 +40,68 @@ class PostProcessingManager:
                 # Compare file names only (ignoring directory structure)
                 if os.path.basename(input_file) in output_files:
                     print(f"File {input_file} exists in output. Deleting from input...")
-                    try:                        
-                        delete_file_with_retry(input_file)  
-                    except Exception as e:
-                        print(f"Error deleting file {input_file}: {e}")
+                    duplicates.append(input_file)
+        self.delete_files(duplicates)
         self.cleanup_empty_folders()
+
+    def delete_files(self, file_paths):
+        """Remove files in one batch and wait for any retries to finish."""
+        if not file_paths:
+            return
+        try:
+            self.deleter.remove(file_paths)
+        except Exception as e:
+            print(f"Error deleting files: {e}")
+        self.deleter.wait()
+
+    def clean_recorded_moves(self):
+        """
+        Post-process using the run's recorded moves instead of walking the input and output trees.
+
+        Sources in `duplicates` (left in place because an identical copy was already sorted)
+        are deleted after checking again that they still match the copy that was matched,
+        which may be a `_new` name. Then
+        only the source folders touched by the run (and their now-empty parents) are
+        removed if empty.
+        """
+        store = get_digest_store()
+        touched = {os.path.dirname(os.path.abspath(src)) for src, _ in self.moves}
+        duplicates = []
+        for src, copy in self.duplicates:
+            touched.add(os.path.dirname(os.path.abspath(src)))
+            if not os.path.exists(src):
+                continue
+            try:
+                identical = os.path.exists(copy) and files_identical(src, copy, store)
+            except OSError:
+                identical = False
+            if identical:
+                print(f"File {src} exists in output. Deleting from input...")
+                duplicates.append(src)
+        self.delete_files(duplicates)
+        self.remove_empty_folders(touched)
+
+    def remove_empty_folders(self, folders):
+        """
+        Remove `folders` and their parents while they are empty, stopping at the input folders.
+
+        `os.rmdir` refuses non-empty folders, so nothing is listed.
+        """
+        roots = {os.path.abspath(folder) for folder in self.input_folders}
+        removed = set()
+        # ✅ Deepest first, so emptied parents can go as well
+        for folder in sorted(folders, key=lambda f: f.count(os.sep), reverse=True):
+            while folder not in roots and folder not in removed and any(
+                folder.startswith(root + os.sep) for root in roots
+            ):
+                try:
+                    os.rmdir(folder)
+                except OSError:
+                    break  # Not empty (or locked): its parents aren't empty either
+                removed.add(folder)
+                print(f"Removed empty folder: {folder}")
+                folder = os.path.dirname(folder)
+        return removed
         
     def cleanup_empty_folders(self):
         """
@@ -61,7 +131,7 @@ class PostProcessingManager:
                 file_set.add(os.path.join(root, file))
         return file_set
         
-    @classmethod
+    @staticmethod
     def delete_file_with_retry(file_path, retries=3, delay=2):
         """
         Attempt to delete a file with retries if it is locked or temporarily unavailable.
@@ -69,18 +139,6 @@ class PostProcessingManager:
         :param retries: Number of retry attempts
         :param delay: Delay in seconds between retries
         """
-        for attempt in range(retries):
-            try:
-                send2trash(file_path)
-                print(f"Sent to trash: {file_path}")
-                return
-            except PermissionError as e:
-                print(f"PermissionError: {e}. Retrying in {delay} seconds (Attempt {attempt + 1}/{retries})...")
-                time.sleep(delay)
-            except FileNotFoundError:
-                print(f"File not found: {file_path}. Skipping deletion.")
-                return
-            except Exception as e:
-                print(f"Error deleting file {file_path}: {e}. Retrying...")
-                time.sleep(delay)
-        print(f"Failed to delete {file_path} after {retries} retries.")
+        deleter = DeletionService(retries=retries, retry_delay=delay)
+        deleter.remove([file_path])
+        deleter.wait()
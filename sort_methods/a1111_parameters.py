@@ -0,0 +1,147 @@
+import re
+import json
+from functools import lru_cache
+
+NEGATIVE_MARKER = "Negative prompt:"
+
+# One `Key: value` pair of the A1111 settings line. A value is a quoted string (may contain
+# commas, backslash-escaped like JSON), a flat JSON object or array such as `Hashes: {...}`,
+# or anything up to the next comma.
+_PARAM = re.compile(
+    r'\s*(\w[\w \-/]*):\s*'
+    r'("(?:\\.|[^\\"])*"'
+    r'|\{(?:[^{}"]|"(?:\\.|[^\\"])*")*\}'
+    r'|\[(?:[^\[\]"]|"(?:\\.|[^\\"])*")*\]'
+    r'|[^,]*)'
+    r'\s*(?:,|$)'
+)
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?\Z")
+_NUMBER_START = frozenset("-0123456789")
+MIN_FIELDS = 3  # Like A1111: a last line with fewer `Key: value` pairs is still prompt text
+PROMPT_KEYS = frozenset(("positive_prompts", "negative_prompt"))
+
+
+@lru_cache(maxsize=1024)
+def normalize_key(key):
+    """`"CFG scale"` → `"cfg_scale"`, the key format used throughout the metadata (memoized: keys repeat)."""
+    return key.strip().lower().replace(" ", "_")
+
+
+def convert_value(value):
+    """Turn a raw settings value into an int, float, dict/list (JSON) or unquoted string."""
+    if value.isdigit():
+        return int(value)  # ✅ Most values (steps, seed, size parts…) take this fast path
+    if not value:
+        return value
+    first = value[0]
+    if first in _NUMBER_START:
+        if _NUMBER.match(value):
+            return float(value) if "." in value else int(value)
+        return value
+    if first == '"':
+        try:
+            return json.loads(value)
+        except ValueError:
+            return value.strip('"')
+    if first in "{[":
+        try:
+            return json.loads(value)
+        except ValueError:
+            return value
+    return value
+
+
+def split_prompt(prompt):
+    """Split a prompt into its comma-separated parts, dropping empty ones."""
+    return [part for part in map(str.strip, prompt.split(",")) if part]
+
+
+def tokenize_parameters(text):
+    """
+    Split A1111 parameter text into `(positive prompt, negative prompt, [(key, raw value), ...])`.
+
+    Raw values may carry trailing whitespace.
+
+    The settings are the last line when it holds at least three `Key: value` pairs,
+    the negative prompt starts at a line beginning with `Negative prompt:`, and
+    everything before that is the positive prompt. The settings line is scanned once
+    with a precompiled pattern.
+    """
+    text = text.strip()
+    head, _, last_line = text.rpartition("\n")
+
+    fields = _PARAM.findall(last_line)
+    if len(fields) < MIN_FIELDS:
+        head, fields = text, []
+
+    if head.startswith(NEGATIVE_MARKER):
+        positive, negative = "", head[len(NEGATIVE_MARKER):]
+    else:
+        index = head.find("\n" + NEGATIVE_MARKER)
+        if index == -1:
+            positive, negative = head, ""
+        else:
+            positive, negative = head[:index], head[index + 1 + len(NEGATIVE_MARKER):]
+    return positive.strip(), negative.strip(), fields
+
+
+def parse_parameters(text, keys=None):
+    """
+    Parse A1111 parameter text into the metadata dict used for sorting.
+
+    Returns `positive_prompts` and `negative_prompt` as lists of prompt parts, every
+    setting under its normalized key with numbers converted, and `hashes` as a dict
+    (from `Hashes: {...}`, or `Model hash` when there is no `Hashes` field).
+    With `keys`, only those entries are returned; see `project_parameters`.
+    """
+    if keys is not None:
+        return project_parameters(text, keys)
+
+    positive, negative, fields = tokenize_parameters(text)
+    metadata = {
+        "positive_prompts": split_prompt(positive),
+        "negative_prompt": split_prompt(negative),
+    }
+    for key, value in fields:
+        metadata[normalize_key(key)] = convert_value(value.rstrip())
+
+    hashes = metadata.get("hashes")
+    if not isinstance(hashes, dict):
+        hashes = {"model": metadata["model_hash"]} if "model_hash" in metadata else {}
+    metadata["hashes"] = hashes
+    return metadata
+
+
+def project_parameters(text, keys):
+    """
+    Parse only the entries named in `keys` (normalized keys, e.g. `{"model"}`).
+
+    Unless a prompt key is requested the prompts are never split: only the settings
+    line is scanned, and the scan stops as soon as every requested key was found.
+    Values are converted for the requested keys only.
+    """
+    if not PROMPT_KEYS.isdisjoint(keys):
+        metadata = parse_parameters(text)
+        return {key: value for key, value in metadata.items() if key in keys}
+
+    wanted = set(keys)
+    if "hashes" in wanted:
+        wanted.add("model_hash")  # ✅ Fallback for images without a `Hashes` field
+    metadata = {}
+    seen = 0
+    for match in _PARAM.finditer(text.strip().rpartition("\n")[2]):
+        seen += 1
+        key = normalize_key(match.group(1))
+        if key in wanted:
+            metadata[key] = convert_value(match.group(2).rstrip())
+            wanted.discard(key)
+        if not wanted and seen >= MIN_FIELDS:
+            break  # ✅ Everything the sort needs was found
+    if seen < MIN_FIELDS:
+        metadata = {}  # Not a settings line: the text is all prompt
+
+    if "hashes" in keys and not isinstance(metadata.get("hashes"), dict):
+        metadata["hashes"] = {"model": metadata["model_hash"]} if "model_hash" in metadata else {}
+    if "model_hash" not in keys:
+        metadata.pop("model_hash", None)
+    return metadata
@@ -0,0 +1,92 @@
+import os
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp")
+
+
+class DirectoryIndex:
+    """
+    A single `os.scandir` listing of one folder, grouped by file stem.
+
+    Sidecar lookup (`image.png` → `image.txt`, `image.json`) becomes a dict hit instead
+    of a `glob` per image, and names containing glob characters such as `[` just work.
+    `DirEntry.stat()` results are cached by the entries themselves and handed to metadata
+    extraction with each image, so the cache lookup doesn't stat the file again.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.by_stem = {}  # stem -> [DirEntry, ...]
+        self.entries = {}  # name -> DirEntry
+        self.subdirs = []  # DirEntry of each sub folder
+        self.has_flag = False  # ✅ A `.flag` file marks the folder as already sorted
+
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    continue
+                if is_dir:
+                    self.subdirs.append(entry)
+                    continue
+
+                name = entry.name
+                self.entries[name] = entry
+                if name.endswith(".flag"):
+                    self.has_flag = True
+                stem = os.path.splitext(name)[0]
+                self.by_stem.setdefault(stem, []).append(entry)
+
+    def images(self):
+        """Return the full paths of the image files in this folder."""
+        return [entry.path for name, entry in self.entries.items() if name.lower().endswith(IMAGE_EXTENSIONS)]
+
+    def siblings(self, file_path):
+        """Return the paths of every file sharing `file_path`'s stem (including the file itself)."""
+        stem = os.path.splitext(os.path.basename(file_path))[0]
+        return [entry.path for entry in self.by_stem.get(stem, [])]
+
+    def stat(self, file_path):
+        """Return the cached stat result of a file in this folder, or None if it isn't indexed (or has no identity)."""
+        entry = self.entries.get(os.path.basename(file_path))
+        if entry is None:
+            return None
+        try:
+            st = entry.stat()
+        except OSError:
+            return None
+        # On Windows the listing leaves st_ino/st_dev at 0, which can't identify a file for the caches
+        return st if st.st_ino else None
+
+    def images_with_stats(self):
+        """Return `(path, stat result or None)` for the image files in this folder."""
+        return [(path, self.stat(path)) for path in self.images()]
+
+
+def group_by_stem(paths):
+    """Group file paths the way `DirectoryIndex.siblings` does: same folder, same stem."""
+    groups = {}
+    for path in paths:
+        groups.setdefault(os.path.splitext(path)[0], []).append(path)
+    return list(groups.values())
+
+
+def walk_indexes(top, recursive=True):
+    """
+    Yield a `DirectoryIndex` for `top` and (optionally) every folder below it, top-down.
+
+    Each folder is listed exactly once. Sub folders are taken from the parent's
+    listing, so folders created while sorting are not descended into.
+    """
+    try:
+        index = DirectoryIndex(top)
+    except OSError as e:
+        print(f"⚠️ Could not read folder {top}: {e}")
+        return
+    yield index
+
+    if recursive:
+        for entry in index.subdirs:
+            if entry.is_symlink():
+                continue
+            yield from walk_indexes(entry.path, recursive=True)
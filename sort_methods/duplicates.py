@@ -0,0 +1,190 @@
+import os
+import time
+import atexit
+import hashlib
+import threading
+from sort_methods.file_identity import file_identity, content_fingerprint, FINGERPRINT_BLOCK
+
+HASH_CHUNK = 1024 * 1024  # Bytes read per step of a full hash
+
+
+class DigestStore:
+    """
+    Full-content SHA-256 digests shared across runs, keyed by (device, inode, size, mtime_ns).
+
+    Lives in the metadata cache database. A sorted file keeps its identity, so the next
+    time something collides with it only the newcomer has to be hashed.
+    """
+
+    def __init__(self, db_path="metadata_cache.sqlite"):
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        import sqlite3
+
+        self.conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS digests (
+                    device INTEGER NOT NULL,
+                    inode INTEGER NOT NULL,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    digest TEXT NOT NULL,
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (device, inode, size, mtime_ns)
+                )
+                """
+            )
+
+    def get(self, identity):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT digest FROM digests WHERE device = ? AND inode = ? AND size = ? AND mtime_ns = ?", identity
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(self, identity, digest):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO digests (device, inode, size, mtime_ns, digest, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                identity + (digest, time.time()),
+            )
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+_store = None
+_store_path = None
+_store_lock = threading.Lock()
+
+
+def configure_digest_store(db_path):
+    """Set the database used for cached digests; `None` keeps digests in memory only."""
+    global _store_path
+    _store_path = db_path
+
+
+def get_digest_store():
+    """Return the run-wide digest store, opening it on first use (None if disabled)."""
+    global _store
+    with _store_lock:
+        if _store is None and _store_path:
+            import sqlite3  # ✅ Imported when the store is opened, not at startup
+
+            try:
+                _store = DigestStore(_store_path)
+            except sqlite3.Error as e:
+                print(f"⚠️ Could not open digest store: {e}. Duplicates will be hashed every run.")
+                configure_digest_store(None)
+        return _store
+
+
+def close_digest_store():
+    """Close the digest store (registered with atexit)."""
+    global _store
+    with _store_lock:
+        store, _store = _store, None
+    if store is not None:
+        store.close()
+
+
+atexit.register(close_digest_store)
+
+
+def full_digest(file_path, st=None, store=None):
+    """SHA-256 of the whole file, served from `store` when the file is unchanged since it was hashed."""
+    identity = file_identity(file_path, st)
+    if store is not None:
+        digest = store.get(identity)
+        if digest:
+            return digest
+
+    sha256 = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        while chunk := f.read(HASH_CHUNK):
+            sha256.update(chunk)
+    digest = sha256.hexdigest()
+    if store is not None:
+        store.put(identity, digest)
+    return digest
+
+
+def files_identical(first, second, store=None):
+    """
+    Compare two files in stages, stopping at the first stage that tells them apart:
+
+    1. size
+    2. a hash of the first and last 64 KB (which is the whole file for small files)
+    3. a full SHA-256, cached in `store` across runs
+    """
+    st_first, st_second = os.stat(first), os.stat(second)
+    if st_first.st_size != st_second.st_size:
+        return False
+    if (st_first.st_dev, st_first.st_ino) == (st_second.st_dev, st_second.st_ino):
+        return True
+
+    size = st_first.st_size
+    if store is not None:
+        # ✅ Both digests already known: no reads at all
+        cached_first = store.get(file_identity(first, st_first))
+        cached_second = store.get(file_identity(second, st_second))
+        if cached_first and cached_second:
+            return cached_first == cached_second
+
+    if content_fingerprint(first, size) != content_fingerprint(second, size):
+        return False
+    if size <= FINGERPRINT_BLOCK * 2:
+        return True  # The fingerprint already covered every byte
+    return full_digest(first, st_first, store) == full_digest(second, st_second, store)
+
+
+def collision_name(path, n):
+    """`path` with the `n`th collision suffix: `name.ext`, `name_new.ext`, `name_new2.ext`, ..."""
+    if n == 0:
+        return path
+    base, ext = os.path.splitext(path)
+    return f"{base}_new{ext}" if n == 1 else f"{base}_new{n}{ext}"
+
+
+def _identical(src, candidate, store):
+    try:
+        return files_identical(src, candidate, store)
+    except OSError:
+        return False  # A folder or a dangling link by that name is never a copy of `src`
+
+
+def resolve_group(sources, destinations, store=None):
+    """
+    Pick where an image and its sidecar files go when their destinations may already exist.
+
+    Every file gets the same suffix (see `collision_name`), so a group is never split.
+    Returns `(paths, identical)`: the first suffix under which all names are free, or one
+    under which every file already has an identical copy (`identical=True`, nothing needs
+    to move). A suffix where only some names are taken, or a copy differs, is passed over.
+    """
+    n = 0
+    while True:
+        candidates = [collision_name(destination, n) for destination in destinations]
+        taken = [os.path.lexists(candidate) for candidate in candidates]
+        if not any(taken):
+            return candidates, False
+        if all(taken) and all(_identical(src, candidate, store) for src, candidate in zip(sources, candidates)):
+            return candidates, True
+        n += 1
+
+
+def resolve_collision(src, destination, store=None):
+    """
+    Pick where `src` should go when `destination` may already exist.
+
+    Returns `destination` if it is free, None if an identical copy of `src` is already
+    there (or at one of its `_new` names), or the first free `name_new{n}.ext` otherwise.
+    """
+    (candidate,), identical = resolve_group([src], [destination], store)
+    return None if identical else candidate
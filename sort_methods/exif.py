@@ -1,22 +1,14 @@
 import os
-#from sort_methods.find_exiftool import find_exiftool 
-from sort_methods.find_exiftool import find_exiftool
-import json
-import subprocess
+from sort_methods.exiftool_pool import get_pool
 
 def extract_exiftool_metadata(image_path):
     """Runs ExifTool on an image and extracts metadata dynamically."""
-    exiftool_path = find_exiftool()
-    if not exiftool_path:
+    pool = get_pool()  # ✅ Long-lived `-stay_open` workers instead of one process per image
+    if pool is None:
         return {"Error": "ExifTool not found. Please install and add it to PATH."}
     
     try:
-        result = subprocess.run(
-            [exiftool_path, "-json", image_path], 
-            capture_output=True, text=True
-        )
-        metadata = json.loads(result.stdout)
-        return metadata[0] if metadata else {}
+        return pool.extract(image_path)
     
     except Exception as e:
         return {"Error": str(e)}
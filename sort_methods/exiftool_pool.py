@@ -0,0 +1,232 @@
+import os
+import json
+import queue
+import atexit
+import logging
+import threading
+import subprocess
+from sort_methods.find_exiftool import find_exiftool
+
+
+class ExifToolError(Exception):
+    """Raised when an ExifTool worker dies, hangs or returns an unreadable response."""
+
+
+class ExifToolWorker:
+    """
+    A single long-lived `exiftool -stay_open True -@ -` process.
+
+    Arguments are written to stdin one per line and each request is terminated with
+    `-execute{n}`. ExifTool answers with the command output followed by `{ready{n}}`,
+    which is used as the response sentinel.
+    """
+
+    def __init__(self, exiftool_path, timeout=30):
+        self.exiftool_path = exiftool_path
+        self.timeout = timeout
+        self.process = None
+        self.request_id = 0
+
+    def start(self):
+        """Start the ExifTool process (no-op if it is already running)."""
+        if self.is_alive():
+            return
+        creationflags = subprocess.CREATE_NO_WINDOW if os.name == "nt" else 0
+        self.process = subprocess.Popen(
+            [self.exiftool_path, "-stay_open", "True", "-@", "-"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            encoding="utf-8",
+            errors="replace",
+            creationflags=creationflags,
+        )
+        self.request_id = 0
+
+    def is_alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def execute(self, *args):
+        """Send one request and return everything ExifTool printed before the sentinel."""
+        if not self.is_alive():
+            self.start()
+
+        self.request_id += 1
+        sentinel = f"{{ready{self.request_id}}}"
+        command = "\n".join(list(args) + [f"-execute{self.request_id}"]) + "\n"
+
+        # ✅ Kill the process if it hangs; the read loop below then sees EOF
+        watchdog = threading.Timer(self.timeout, self._kill)
+        watchdog.start()
+        try:
+            self.process.stdin.write(command)
+            self.process.stdin.flush()
+
+            output = []
+            while True:
+                line = self.process.stdout.readline()
+                if not line:
+                    raise ExifToolError("ExifTool exited while processing a request.")
+                if line.rstrip("\r\n") == sentinel:
+                    break
+                output.append(line)
+        except (OSError, ValueError) as e:
+            self._kill()
+            raise ExifToolError(f"ExifTool pipe failure: {e}") from e
+        except ExifToolError:
+            self._kill()
+            raise
+        finally:
+            watchdog.cancel()
+
+        return "".join(output)
+
+    def close(self, timeout=5):
+        """Ask ExifTool to exit cleanly, killing it if it does not."""
+        if self.process is None:
+            return
+        try:
+            if self.process.poll() is None:
+                self.process.stdin.write("-stay_open\nFalse\n")
+                self.process.stdin.flush()
+                self.process.wait(timeout=timeout)
+        except Exception:
+            self._kill()
+        finally:
+            for stream in (self.process.stdin, self.process.stdout):
+                try:
+                    stream.close()
+                except Exception:
+                    pass
+            self.process = None
+
+    def _kill(self):
+        process = self.process
+        if process is not None and process.poll() is None:
+            try:
+                process.kill()
+                process.wait(timeout=5)
+            except Exception:
+                pass
+
+
+class ExifToolPool:
+    """
+    A small pool of ExifTool workers shared by every thread in the process.
+
+    Workers are started lazily, so a run that never needs ExifTool never spawns one.
+    A worker that crashes or hangs is restarted and the request retried once.
+    """
+
+    def __init__(self, exiftool_path, size=2, timeout=30):
+        self.exiftool_path = exiftool_path
+        self.size = max(1, int(size))
+        self.timeout = timeout
+        self.idle = queue.LifoQueue()
+        self.workers = []
+        self.lock = threading.Lock()
+        self.closed = False
+
+    def _acquire(self):
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self.lock:
+            if self.closed:
+                raise ExifToolError("ExifTool pool has been shut down.")
+            if len(self.workers) < self.size:
+                worker = ExifToolWorker(self.exiftool_path, timeout=self.timeout)
+                self.workers.append(worker)
+                return worker
+        return self.idle.get()
+
+    def _release(self, worker):
+        if self.closed:
+            worker.close()
+        else:
+            self.idle.put(worker)
+
+    def execute(self, *args, retries=1):
+        """Run one ExifTool request on a free worker, restarting crashed workers."""
+        worker = self._acquire()
+        try:
+            for attempt in range(retries + 1):
+                try:
+                    return worker.execute(*args)
+                except ExifToolError as e:
+                    logging.warning(f"ExifTool worker failed ({e}); restarting (attempt {attempt + 1}/{retries + 1}).")
+                    worker.close()
+                    if attempt >= retries:
+                        raise
+        finally:
+            self._release(worker)
+
+    def extract(self, image_path):
+        """Return the ExifTool JSON record for one image."""
+        output = self.execute("-json", "-charset", "filename=utf8", image_path)
+        if not output.strip():
+            return {"Error": f"ExifTool returned no metadata for {image_path}"}
+        metadata = json.loads(output)
+        return metadata[0] if metadata else {}
+
+    def close(self):
+        """Shut down every worker."""
+        with self.lock:
+            self.closed = True
+            workers = list(self.workers)
+            self.workers.clear()
+        for worker in workers:
+            worker.close()
+
+
+_pool = None
+_pool_pid = None
+_pool_size = None
+_pool_lock = threading.Lock()
+
+
+def resolve_pool_size(workers="auto"):
+    """Translate the `exiftool_workers` config value into a worker count."""
+    if workers in (None, "auto"):
+        return max(1, min(4, os.cpu_count() or 1))
+    try:
+        return max(1, int(workers))
+    except (ValueError, TypeError):
+        print(f"⚠️ Invalid exiftool_workers value: '{workers}'. Falling back to 2 workers.")
+        return 2
+
+
+def configure_pool(workers="auto"):
+    """Set the size of the shared pool; takes effect the next time the pool is created."""
+    global _pool_size
+    _pool_size = resolve_pool_size(workers)
+
+
+def get_pool():
+    """Return the process-wide ExifTool pool, or None if ExifTool is not installed."""
+    global _pool, _pool_pid
+    with _pool_lock:
+        # ✅ A forked child must not share its parent's pipes
+        if _pool is not None and _pool_pid == os.getpid():
+            return _pool
+        exiftool_path = find_exiftool()
+        if not exiftool_path:
+            return None
+        _pool = ExifToolPool(exiftool_path, size=_pool_size or resolve_pool_size())
+        _pool_pid = os.getpid()
+        return _pool
+
+
+def shutdown_pool():
+    """Close the shared pool (registered with atexit)."""
+    global _pool, _pool_pid
+    with _pool_lock:
+        pool, _pool = _pool, None
+        owned = _pool_pid == os.getpid()
+        _pool_pid = None
+    if pool is not None and owned:
+        pool.close()
+
+
+atexit.register(shutdown_pool)
@@ -0,0 +1,37 @@
+import os
+import hashlib
+
+FINGERPRINT_BLOCK = 65536  # Bytes hashed from each end of the file
+
+
+def file_identity(file_path, st=None):
+    """
+    Return the (device, inode, size, mtime_ns) tuple identifying a file on disk.
+
+    Pass an existing `os.stat_result` (e.g. from `DirEntry.stat()`) to avoid a second stat() call.
+    """
+    if st is None:
+        st = os.stat(file_path)
+    return (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+def content_fingerprint(file_path, size=None, block_size=FINGERPRINT_BLOCK):
+    """
+    Hash the file size plus its first and last `block_size` bytes.
+
+    Cheap enough to compute on a cache miss, and survives moves, copies and
+    renames that change the inode or mtime.
+    """
+    if size is None:
+        size = os.path.getsize(file_path)
+
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(size).encode())
+    with open(file_path, "rb") as f:
+        digest.update(f.read(block_size))
+        if size > block_size * 2:
+            f.seek(-block_size, os.SEEK_END)
+            digest.update(f.read(block_size))
+        elif size > block_size:
+            digest.update(f.read())
+    return digest.hexdigest()
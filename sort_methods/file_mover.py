@@ -1,93 +1,281 @@
 import os
-import shutil
-import psutil
-import wmi
+import atexit
+import threading
+import concurrent.futures
+from sort_methods.move_engine import get_move_engine, MOVED, SKIPPED_IDENTICAL
+from sort_methods.metrics import get_metrics
 
+SSD_THREADS = 8
+HDD_THREADS = 3
+
+_device_types = {}  # st_dev -> True (SSD) / False (HDD) / None (unknown)
+_physical_devices = {}  # st_dev -> physical disk key
+_device_lock = threading.Lock()
+
+
+def device_of(path):
+    """Return the st_dev of `path`, or of its nearest existing parent folder."""
+    path = os.path.abspath(path)
+    while True:
+        try:
+            return os.stat(path).st_dev
+        except OSError:
+            parent = os.path.dirname(path)
+            if parent == path:
+                return None
+            path = parent
+
+
+def _linux_block_device(device):
+    """Return the sysfs folder of the physical disk behind a st_dev (partitions map to their disk)."""
+    try:
+        block = os.path.realpath(f"/sys/dev/block/{os.major(device)}:{os.minor(device)}")
+    except OSError:
+        return None
+
+    # Partitions (sda1, nvme0n1p1) have no queue/ folder of their own; their disk does
+    for candidate in (block, os.path.dirname(block)):
+        if os.path.isdir(os.path.join(candidate, "queue")):
+            return candidate
+    return None
+
+
+def _linux_is_rotational(device):
+    """Read `queue/rotational` for the block device behind a st_dev."""
+    block = _linux_block_device(device)
+    if block is None:
+        return None
+    try:
+        with open(os.path.join(block, "queue", "rotational")) as f:
+            return f.read().strip() == "1"
+    except OSError:
+        return None
+
+
+def physical_device(path):
+    """
+    Return a key identifying the physical disk holding `path`.
+
+    On Linux, partitions of the same disk share a key; elsewhere the st_dev is used.
+    """
+    device = device_of(path)
+    if device is None or os.name == "nt" or not os.path.isdir("/sys/dev/block"):
+        return device
+    with _device_lock:
+        if device in _physical_devices:
+            return _physical_devices[device]
+    key = _linux_block_device(device) or device
+    with _device_lock:
+        _physical_devices[device] = key
+    return key
+
+
+def _windows_is_ssd(path):
+    import psutil
+    import pythoncom
+    import wmi
+
+    partition = next(p for p in psutil.disk_partitions(all=False) if path.startswith(p.mountpoint))
+    device = partition.device
+
+    pythoncom.CoInitialize()  # ✅ FIX: Required in threads
+
+    c = wmi.WMI()
+    for disk in c.Win32_DiskDrive():
+        if device in disk.DeviceID:
+            return 'ssd' in disk.MediaType.lower()
+    return None
 
 
 def is_ssd(path):
     """
     Attempts to determine if the given path is on an SSD.
     Returns True if SSD, False if HDD, or None if unknown.
+
+    The answer is detected once per device and cached for the rest of the run.
     """
-    try:
-        partition = next(p for p in psutil.disk_partitions(all=False) if path.startswith(p.mountpoint))
-        usage = psutil.disk_usage(partition.mountpoint)
-        device = partition.device
+    device = device_of(path)
+    with _device_lock:
+        if device in _device_types:
+            return _device_types[device]
 
-        # Windows only: use WMI to check for MediaType = 'SSD'
+    result = None
+    try:
         if os.name == "nt":
-            import pythoncom
-            import wmi
+            # Windows only: use WMI to check for MediaType = 'SSD'
+            result = _windows_is_ssd(os.path.abspath(path))
+        elif device is not None and os.path.isdir("/sys/dev/block"):
+            rotational = _linux_is_rotational(device)
+            result = None if rotational is None else not rotational
+    except Exception as e:
+        print(f"⚠️ Could not determine disk type: {e}")
+
+    with _device_lock:
+        _device_types[device] = result
+    return result
 
-            pythoncom.CoInitialize()  # ✅ FIX: Required in threads
 
-            c = wmi.WMI()
-            for disk in c.Win32_DiskDrive():
-                if device in disk.DeviceID:
-                    return 'ssd' in disk.MediaType.lower()
+def move_group(file_paths, target_folder):
+    """
+    Move an image and its sidecar files to the target folder as one group.
 
+    Returns `(status, paths)`: `(MOVED, destinations)`, `(SKIPPED_IDENTICAL, identical copies)`
+    when the sources were left in place, or `(None, [])` when the move failed and nothing moved.
+    """
+    metrics = get_metrics()
+    try:
+        if metrics is None:
+            # ✅ Rename on the same filesystem, zero-copy otherwise; folders are created once per run
+            return get_move_engine().move_group(file_paths, target_folder)
+        size = sum(os.path.getsize(file_path) for file_path in file_paths)
+        with metrics.time("move"):
+            status, paths = get_move_engine().move_group(file_paths, target_folder)
+        if status == SKIPPED_IDENTICAL:
+            metrics.count("files_skipped_identical", len(file_paths))
+        else:
+            metrics.count("files_moved", len(file_paths))
+            metrics.count("bytes_moved", size)
+        return status, paths
     except Exception as e:
-        print(f"⚠️ Could not determine disk type: {e}")
-    return None
+        print(f"Error moving {', '.join(file_paths)} → {target_folder}: {e}")
+        if metrics is not None:
+            metrics.count("move_errors")
+        return None, []
 
 
 def move_file(file_path, target_folder):
     """
     Move a single file (image or text) to the target folder.
+
+    Returns `MOVED`, `SKIPPED_IDENTICAL` (an identical file is already there and the
+    source was left in place) or None when the move failed.
     """
-    try:
-        if not os.path.exists(target_folder):
-            os.makedirs(target_folder, exist_ok=True)
+    return move_group([file_path], target_folder)[0]
 
-        file_name = os.path.basename(file_path)
-        destination = os.path.join(target_folder, file_name)
-        shutil.move(file_path, destination)
-        return True
-    except Exception as e:
-        print(f"Error moving {file_path} → {target_folder}: {e}")
-        return False
 
-def move_files(file_paths, target_folder, threads='auto', verbose=False, pbar=None):
+class MoveScheduler:
+    """
+    One long-lived move scheduler per run, with a separate worker queue per device.
+
+    Moves are routed by the destination's device and each device gets its own thread
+    limit (8 for SSDs, 3 for HDDs when `threads` is "auto"), so moves to an HDD never
+    throttle moves to an SSD.
+    """
+
+    def __init__(self, threads="auto"):
+        self.threads = threads
+        self.devices = {}  # physical disk -> ThreadPoolExecutor
+        self.lock = threading.Lock()
+
+    def threads_for(self, target_folder):
+        """Number of concurrent moves allowed on the device holding `target_folder`."""
+        threads = self.threads
+        if threads == 'auto':
+            threads = SSD_THREADS if is_ssd(target_folder) else HDD_THREADS
+        else:
+            try:
+                threads = int(threads)
+            except (ValueError, TypeError):
+                print(f"⚠️ Invalid thread count: '{threads}'. Falling back to safe default (4 threads).")
+                threads = 4
+
+        # ✅ Enforce system-safe limits
+        max_threads = (os.cpu_count() or 1) * 2
+        return max(1, min(threads, max_threads))
+
+    def _executor_for(self, target_folder):
+        device = physical_device(target_folder)
+        with self.lock:
+            executor = self.devices.get(device)
+        if executor is not None:
+            return executor
+
+        threads = self.threads_for(target_folder)
+        with self.lock:
+            executor = self.devices.get(device)
+            if executor is None:
+                executor = concurrent.futures.ThreadPoolExecutor(max_workers=threads, thread_name_prefix="cs-move")
+                self.devices[device] = executor
+        return executor
+
+    def submit(self, file_path, target_folder):
+        """Queue one move on the destination device's workers; returns a Future of `move_file`'s result."""
+        return self._executor_for(target_folder).submit(move_file, file_path, target_folder)
+
+    def submit_group(self, file_paths, target_folder):
+        """Queue the move of an image and its sidecars; returns a Future of `move_group`'s result."""
+        return self._executor_for(target_folder).submit(move_group, list(file_paths), target_folder)
+
+    def shutdown(self):
+        with self.lock:
+            executors = list(self.devices.values())
+            self.devices.clear()
+        for executor in executors:
+            executor.shutdown(wait=True)
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_move_scheduler(threads="auto"):
+    """Return the run-wide move scheduler, creating it on first use."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = MoveScheduler(threads)
+        return _scheduler
+
+
+def shutdown_move_scheduler():
+    """Wait for queued moves and stop the scheduler (registered with atexit)."""
+    global _scheduler
+    with _scheduler_lock:
+        scheduler, _scheduler = _scheduler, None
+    if scheduler is not None:
+        scheduler.shutdown()
+
+
+atexit.register(shutdown_move_scheduler)
+
+
+def move_files(file_paths, target_folder, threads='auto', verbose=False, pbar=None, skipped=None, destinations=None):
     """
-    Move multiple files to the target folder using threads.
+    Move an image and its sidecar files to the target folder as one group on the shared move scheduler.
 
-    :param file_paths: List of full paths to files
+    :param file_paths: List of full paths to the files of one image (the image and its sidecars)
     :param target_folder: Destination folder
-    :param threads: Number of worker threads. Use "auto" to auto-detect based on drive type (8 for SSD, 3 for HDD).
+    :param threads: Number of worker threads per device. Use "auto" to auto-detect based on drive type (8 for SSD, 3 for HDD).
                     You can also set a specific integer. If an invalid value is given, a safe default is used.
+                    Only used when the scheduler is first created.
     :param verbose: Whether to print progress info
     :param pbar: Optional tqdm progress bar instance to update as files are moved
+    :param skipped: Optional list that receives the sources left in place because identical
+                    copies of the whole group are already in the target folder
+    :param destinations: Optional dict that receives, per moved or skipped source, the path it
+                         was moved to or the identical copy it matched
+    :return: The source paths that were moved: all of them, or none
     """
-    import concurrent.futures
-    import multiprocessing
-
-    if not os.path.exists(target_folder):
-        os.makedirs(target_folder, exist_ok=True)
-
-    # Determine threads
-    if threads == 'auto':
-        threads = 8 if is_ssd(target_folder) else 3
-    else:
-        try:
-            threads = int(threads)
-        except (ValueError, TypeError):
-            print(f"⚠️ Invalid thread count: '{threads}'. Falling back to safe default (4 threads).")
-            threads = 4
+    get_move_engine().ensure_dir(target_folder)
 
-    # ✅ Enforce system-safe limits
-    max_threads = multiprocessing.cpu_count() * 2
-    threads = max(1, min(threads, max_threads))
-
-    def safe_move(src):
-        try:
-            move_file(src, target_folder)
-            if verbose:
-                print(f"✅ Moved: {src}")
-            if pbar:
-                pbar.update(1)
-        except Exception as e:
-            print(f"❌ Failed to move {src}: {e}")
-
-    with concurrent.futures.ThreadPoolExecutor(max_workers=threads) as executor:
-        executor.map(safe_move, file_paths)
+    # ✅ Wait for this image's files so callers can flag the folder afterwards
+    future = get_move_scheduler(threads).submit_group(file_paths, target_folder)
+    try:
+        status, paths = future.result()
+    except Exception as e:
+        print(f"❌ Failed to move {', '.join(file_paths)}: {e}")
+        return []
+    if destinations is not None:
+        destinations.update(zip(file_paths, paths))
+    if status == SKIPPED_IDENTICAL:
+        if skipped is not None:
+            skipped.extend(file_paths)
+        return []
+    if status != MOVED:
+        return []
+    if verbose:
+        for src in file_paths:
+            print(f"✅ Moved: {src}")
+    if pbar:
+        pbar.update(len(file_paths))
+    return list(file_paths)
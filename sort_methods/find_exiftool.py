@@ -1,8 +1,9 @@
 import shutil
-import subprocess
 import logging
+from functools import lru_cache
 
 # Check if ExifTool is available
+@lru_cache(maxsize=None)
 def find_exiftool():
     exiftool_path = shutil.which("exiftool")
     if exiftool_path:
@@ -12,5 +13,8 @@ def find_exiftool():
         logging.warning("ExifTool is not installed or not in PATH.")
         return None
 
-# Get ExifTool path
-exiftool_path = find_exiftool()
+# ✅ `exiftool_path` is looked up on first access instead of at import time
+def __getattr__(name):
+    if name == "exiftool_path":
+        return find_exiftool()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,7 +1,181 @@
 import os
-import yaml
+import json
+import time
+import atexit
+import threading
+from collections import OrderedDict
+
+HISTORY_FILE = "file_history.yaml"  # Legacy whole-file YAML history, imported once
+HISTORY_DB = "file_history.sqlite"
+
+
+class HistoryStore:
+    """
+    Append-only move history in SQLite (WAL mode).
+
+    Moves are buffered and committed in batches, lookups by original path, new path
+    or basename hit an index, and recently used entries are served from memory.
+    An existing `file_history.yaml` is imported the first time the store is opened.
+    """
+
+    def __init__(self, db_path=HISTORY_DB, legacy_path=HISTORY_FILE, batch_size=500, cache_size=4096):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self.pending = []
+        self.cache = OrderedDict()  # file name -> latest entry
+        self.lock = threading.Lock()
+
+        import sqlite3  # ✅ Imported when a store is opened, not at startup
+
+        self.conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS moves (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    file_name TEXT NOT NULL,
+                    original_path TEXT NOT NULL,
+                    new_path TEXT NOT NULL,
+                    metadata TEXT NOT NULL,
+                    moved_at REAL NOT NULL
+                )
+                """
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_moves_file_name ON moves (file_name)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_moves_original_path ON moves (original_path)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_moves_new_path ON moves (new_path)")
+
+        if legacy_path and os.path.exists(legacy_path):
+            self._import_legacy(legacy_path)
+
+    def _import_legacy(self, legacy_path):
+        """Copy entries from the old YAML history into an empty store."""
+        if self.conn.execute("SELECT 1 FROM moves LIMIT 1").fetchone():
+            return
+        import yaml
+
+        with open(legacy_path, "r") as f:
+            history = yaml.safe_load(f) or {}
+        for entry in history.values():
+            if isinstance(entry, dict) and "original_path" in entry:
+                self.log_move(entry["original_path"], entry.get("new_path", ""), entry.get("metadata"))
+        self.flush()
+        print(f"✅ Imported {len(history)} entries from {legacy_path} into {self.db_path}")
+
+    def log_move(self, original_path, new_path, metadata=None):
+        """Record one move; committed with the next batch."""
+        file_name = os.path.basename(original_path)
+        entry = {
+            "original_path": original_path,
+            "new_path": new_path,
+            "metadata": metadata if metadata else {},
+        }
+        with self.lock:
+            self.pending.append(
+                (file_name, original_path, new_path, json.dumps(entry["metadata"], default=str), time.time())
+            )
+            self._remember(file_name, entry)
+            if len(self.pending) >= self.batch_size:
+                self._flush_locked()
+
+    def _remember(self, file_name, entry):
+        self.cache[file_name] = entry
+        self.cache.move_to_end(file_name)
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    def flush(self):
+        """Commit buffered moves."""
+        with self.lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if not self.pending:
+            return
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO moves (file_name, original_path, new_path, metadata, moved_at) VALUES (?, ?, ?, ?, ?)",
+                self.pending,
+            )
+        self.pending.clear()
+
+    def _latest(self, column, value):
+        with self.lock:
+            self._flush_locked()
+            row = self.conn.execute(
+                f"SELECT original_path, new_path, metadata FROM moves WHERE {column} = ? ORDER BY id DESC LIMIT 1",
+                (value,),
+            ).fetchone()
+        if row is None:
+            return None
+        return {"original_path": row[0], "new_path": row[1], "metadata": json.loads(row[2])}
+
+    def by_basename(self, file_name):
+        """Latest history entry for a file name, or None."""
+        with self.lock:
+            entry = self.cache.get(file_name)
+            if entry is not None:
+                self.cache.move_to_end(file_name)
+                return entry
+        entry = self._latest("file_name", file_name)
+        if entry is not None:
+            with self.lock:
+                self._remember(file_name, entry)
+        return entry
+
+    def by_original_path(self, original_path):
+        """Latest history entry for a file's original location, or None."""
+        return self._latest("original_path", original_path)
+
+    def by_new_path(self, new_path):
+        """Latest history entry for a file's sorted location, or None."""
+        return self._latest("new_path", new_path)
+
+    def load_all(self):
+        """Return the whole history as `{file_name: entry}` (latest entry per name)."""
+        with self.lock:
+            self._flush_locked()
+            rows = self.conn.execute(
+                "SELECT file_name, original_path, new_path, metadata FROM moves ORDER BY id"
+            ).fetchall()
+        return {
+            file_name: {"original_path": original, "new_path": new, "metadata": json.loads(metadata)}
+            for file_name, original, new, metadata in rows
+        }
+
+    def close(self):
+        with self.lock:
+            self._flush_locked()
+            self.conn.close()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_history_store():
+    """Return the process-wide history store, opening it on first use."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = HistoryStore()
+        return _store
+
+
+def close_history_store():
+    """Commit and close the history store (registered with atexit)."""
+    global _store
+    with _store_lock:
+        store, _store = _store, None
+    if store is not None:
+        store.close()
+
+
+atexit.register(close_history_store)
 
-HISTORY_FILE = "file_history.yaml"
 
 def log_file_move(original_path, new_path, metadata=None):
     """
@@ -11,27 +185,13 @@ def log_file_move(original_path, new_path, metadata=None):
     :param new_path: The new location after sorting.
     :param metadata: Extracted metadata, if applicable.
     """
-    history = load_history()
-    
-    history_entry = {
-        "original_path": original_path,
-        "new_path": new_path,
-        "metadata": metadata if metadata else {},
-    }
-
-    # Store history using filename as key
-    file_name = os.path.basename(original_path)
-    history[file_name] = history_entry
-
-    # Save to YAML file
-    with open(HISTORY_FILE, "w") as f:
-        yaml.safe_dump(history, f)
+    get_history_store().log_move(original_path, new_path, metadata)
 
 def load_history():
     """
     Load the history file.
+
+    Returns `{file_name: {"original_path", "new_path", "metadata"}}`. Prefer the
+    `get_history_store().by_*` lookups, which don't load the whole history.
     """
-    if os.path.exists(HISTORY_FILE):
-        with open(HISTORY_FILE, "r") as f:
-            return yaml.safe_load(f) or {}
-    return {}
+    return get_history_store().load_all()
@@ -0,0 +1,294 @@
+import os
+import zlib
+import struct
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# Text chunk keywords that ExifTool reports as `Parameters`
+PARAMETER_KEYWORDS = {"parameters"}
+
+EXIF_USER_COMMENT = 0x9286
+EXIF_SUB_IFD = 0x8769
+
+
+def read_image_metadata(image_path):
+    """
+    Read A1111 generation parameters and dimensions straight from the file header.
+
+    Returns a dict shaped like ExifTool's JSON record (`SourceFile`, `ImageWidth`,
+    `ImageHeight` and, when present, `Parameters`), or None if the format is not
+    supported or the header could not be parsed.
+    """
+    try:
+        with open(image_path, "rb") as f:
+            head = f.read(12)
+            f.seek(0)
+            if head.startswith(PNG_SIGNATURE):
+                result = read_png_header(f)
+            elif head[:2] == b"\xff\xd8":
+                result = read_jpeg_header(f)
+            elif head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+                result = read_webp_header(f)
+            else:
+                return None
+    except (OSError, struct.error, ValueError, zlib.error):
+        return None
+
+    if result is None:
+        return None
+    result["SourceFile"] = image_path
+    return result
+
+
+def probe_dimensions(image_path):
+    """
+    Return (width, height) from the PNG IHDR, JPEG SOFn or WebP VP8/VP8L/VP8X header.
+
+    Only the first few bytes are read (JPEG segments before the frame header are
+    skipped with seek). Returns None for unsupported or damaged files.
+    """
+    try:
+        with open(image_path, "rb") as f:
+            head = f.read(30)
+            if head.startswith(PNG_SIGNATURE) and head[12:16] == b"IHDR":
+                return struct.unpack(">II", head[16:24])
+            if head[:2] == b"\xff\xd8":
+                f.seek(0)
+                result = read_jpeg_header(f, read_parameters=False)
+            elif head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+                f.seek(0)
+                result = read_webp_header(f, read_parameters=False)
+            else:
+                return None
+    except (OSError, struct.error, ValueError):
+        return None
+
+    if not result:
+        return None
+    return result["ImageWidth"], result["ImageHeight"]
+
+
+def get_image_size(image_path):
+    """Return (width, height) using the header probe, falling back to Pillow; (0, 0) on failure."""
+    size = probe_dimensions(image_path)
+    if size:
+        return size
+
+    try:
+        from PIL import Image  # ✅ Only imported for formats the probe can't read
+
+        with Image.open(image_path) as img:
+            return img.size
+    except Exception as e:
+        print(f"Error getting image dimensions for {image_path}: {e}")
+        return (0, 0)
+
+
+def read_png_header(f):
+    """Walk the PNG chunk list up to the first IDAT, collecting IHDR and text chunks."""
+    if f.read(8) != PNG_SIGNATURE:
+        return None
+
+    result = {}
+    while True:
+        header = f.read(8)
+        if len(header) < 8:
+            break
+        length, chunk_type = struct.unpack(">I4s", header)
+
+        if chunk_type == b"IHDR":
+            data = f.read(length)
+            result["ImageWidth"], result["ImageHeight"] = struct.unpack(">II", data[:8])
+        elif chunk_type in (b"IDAT", b"IEND"):
+            break  # ✅ Text chunks written by A1111 always come before the image data
+        elif chunk_type in (b"tEXt", b"iTXt", b"zTXt"):
+            data = f.read(length)
+            keyword, text = _decode_png_text(chunk_type, data)
+            if keyword and keyword.lower() in PARAMETER_KEYWORDS and "Parameters" not in result:
+                result["Parameters"] = text
+        else:
+            f.seek(length, os.SEEK_CUR)
+            f.seek(4, os.SEEK_CUR)  # CRC
+            continue
+        f.seek(4, os.SEEK_CUR)  # CRC
+
+    return result if "ImageWidth" in result else None
+
+
+def _decode_png_text(chunk_type, data):
+    keyword, _, rest = data.partition(b"\x00")
+    keyword = keyword.decode("latin-1")
+
+    if chunk_type == b"tEXt":
+        return keyword, rest.decode("latin-1")
+
+    if chunk_type == b"zTXt":
+        return keyword, zlib.decompress(rest[1:]).decode("latin-1")
+
+    # iTXt: compression flag, compression method, language tag, translated keyword, text
+    compressed = rest[:1] == b"\x01"
+    rest = rest[2:]
+    _, _, rest = rest.partition(b"\x00")  # language tag
+    _, _, text = rest.partition(b"\x00")  # translated keyword
+    if compressed:
+        text = zlib.decompress(text)
+    return keyword, text.decode("utf-8", errors="replace")
+
+
+def read_jpeg_header(f, read_parameters=True):
+    """Scan JPEG segments up to SOS for the SOFn frame size and the EXIF UserComment."""
+    if f.read(2) != b"\xff\xd8":
+        return None
+
+    result = {}
+    while True:
+        byte = f.read(1)
+        if not byte:
+            break
+        if byte != b"\xff":
+            continue
+        marker = f.read(1)
+        while marker == b"\xff":  # fill bytes
+            marker = f.read(1)
+        if not marker:
+            break
+        marker = marker[0]
+
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            continue  # standalone markers without a length
+        if marker in (0xD9, 0xDA):
+            break  # EOI / SOS: nothing useful follows
+
+        length = struct.unpack(">H", f.read(2))[0]
+        if length < 2:
+            break
+
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            data = f.read(length - 2)
+            result["ImageHeight"], result["ImageWidth"] = struct.unpack(">HH", data[1:5])
+            if not read_parameters:
+                break
+        elif marker == 0xE1 and read_parameters and "Parameters" not in result:
+            data = f.read(length - 2)
+            if data.startswith(b"Exif\x00\x00"):
+                comment = read_exif_user_comment(data[6:])
+                if comment:
+                    result["Parameters"] = comment
+        else:
+            f.seek(length - 2, os.SEEK_CUR)
+
+        if "ImageWidth" in result and "Parameters" in result:
+            break
+
+    return result if "ImageWidth" in result else None
+
+
+def read_webp_header(f, read_parameters=True):
+    """Read the VP8/VP8L/VP8X size and the EXIF chunk of a WebP file."""
+    riff = f.read(12)
+    if riff[:4] != b"RIFF" or riff[8:12] != b"WEBP":
+        return None
+
+    result = {}
+    while True:
+        header = f.read(8)
+        if len(header) < 8:
+            break
+        chunk_type, length = struct.unpack("<4sI", header)
+        padded = length + (length & 1)
+
+        if chunk_type == b"VP8X":
+            data = f.read(padded)
+            result["ImageWidth"] = 1 + int.from_bytes(data[4:7], "little")
+            result["ImageHeight"] = 1 + int.from_bytes(data[7:10], "little")
+            has_exif = bool(data[0] & 0x08)
+            if not has_exif or not read_parameters:
+                break
+        elif chunk_type == b"VP8 " and "ImageWidth" not in result:
+            data = f.read(10)
+            if data[3:6] != b"\x9d\x01\x2a":
+                return None
+            width, height = struct.unpack("<HH", data[6:10])
+            result["ImageWidth"], result["ImageHeight"] = width & 0x3FFF, height & 0x3FFF
+            if not read_parameters:
+                break
+            f.seek(padded - 10, os.SEEK_CUR)
+        elif chunk_type == b"VP8L" and "ImageWidth" not in result:
+            data = f.read(5)
+            if data[0] != 0x2F:
+                return None
+            bits = int.from_bytes(data[1:5], "little")
+            result["ImageWidth"] = (bits & 0x3FFF) + 1
+            result["ImageHeight"] = ((bits >> 14) & 0x3FFF) + 1
+            if not read_parameters:
+                break
+            f.seek(padded - 5, os.SEEK_CUR)
+        elif chunk_type == b"EXIF":
+            data = f.read(padded)[:length]
+            if data.startswith(b"Exif\x00\x00"):
+                data = data[6:]
+            comment = read_exif_user_comment(data)
+            if comment:
+                result["Parameters"] = comment
+            break
+        else:
+            f.seek(padded, os.SEEK_CUR)
+
+    return result if "ImageWidth" in result else None
+
+
+def read_exif_user_comment(tiff):
+    """Return the decoded EXIF UserComment from a TIFF-structured EXIF block, if any."""
+    if tiff[:2] == b"II":
+        order = "<"
+    elif tiff[:2] == b"MM":
+        order = ">"
+    else:
+        return None
+
+    ifd0 = struct.unpack(order + "I", tiff[4:8])[0]
+    sub_ifd = _find_ifd_entry(tiff, order, ifd0, EXIF_SUB_IFD)
+    if sub_ifd is None:
+        return None
+    sub_offset = struct.unpack(order + "I", sub_ifd[8:12])[0]
+    entry = _find_ifd_entry(tiff, order, sub_offset, EXIF_USER_COMMENT)
+    if entry is None:
+        return None
+
+    count = struct.unpack(order + "I", entry[4:8])[0]
+    if count <= 4:
+        raw = entry[8:8 + count]
+    else:
+        offset = struct.unpack(order + "I", entry[8:12])[0]
+        raw = tiff[offset:offset + count]
+    return _decode_user_comment(raw, order)
+
+
+def _find_ifd_entry(tiff, order, offset, tag):
+    if offset + 2 > len(tiff):
+        return None
+    count = struct.unpack(order + "H", tiff[offset:offset + 2])[0]
+    for i in range(count):
+        start = offset + 2 + i * 12
+        entry = tiff[start:start + 12]
+        if len(entry) < 12:
+            return None
+        if struct.unpack(order + "H", entry[:2])[0] == tag:
+            return entry
+    return None
+
+
+def _decode_user_comment(raw, order):
+    charset, text = raw[:8], raw[8:]
+    if charset.startswith(b"UNICODE"):
+        if text[:2] in (b"\xff\xfe", b"\xfe\xff"):
+            decoded = text.decode("utf-16")
+        else:
+            # Writers disagree on the byte order, so prefer the one where ASCII text has its zero bytes
+            big_endian = text[0::2].count(0) > text[1::2].count(0) if text else order == ">"
+            decoded = text.decode("utf-16-be" if big_endian else "utf-16-le", errors="replace")
+    elif charset.startswith(b"ASCII"):
+        decoded = text.decode("latin-1")
+    else:
+        decoded = text.decode("utf-8", errors="replace")
+    return decoded.rstrip("\x00").strip() or None
@@ -0,0 +1,231 @@
+import os
+import json
+import time
+import threading
+from sort_methods.file_identity import file_identity, content_fingerprint
+
+# Bump when the shape of the stored metadata changes so stale entries are dropped
+CACHE_VERSION = 4
+# Fingerprints computed by missed lookups, kept for the put() that usually follows
+MISS_FINGERPRINTS = 1024
+
+
+class MetadataCache:
+    """
+    On-disk cache of processed image metadata, shared across runs.
+
+    Entries are keyed by (device, inode, size, mtime_ns), so an unchanged file costs
+    one stat() to look up. On a miss the content fingerprint is checked as well,
+    which lets files that were moved or copied since the last run still hit; when
+    that misses too, the fingerprint is kept for the `put()` that follows.
+
+    Each entry records the key projection it was parsed with (see
+    `planning.required_metadata_keys`): an entry only serves lookups whose keys it
+    covers, and a full parse covers everything.
+
+    `settings` identifies how the metadata was extracted (see
+    `MetadataExtractor.extraction_settings`). It is part of the key, so entries made
+    with other settings are never served and coexist until they are evicted.
+    """
+
+    def __init__(self, db_path="metadata_cache.sqlite", max_age_days=90, max_size_mb=512, batch_size=500, settings=""):
+        self.db_path = db_path
+        self.settings = settings
+        self.max_age_days = max_age_days
+        self.max_size_mb = max_size_mb
+        self.batch_size = batch_size
+        self.lock = threading.Lock()
+        self.pending = []  # Rows waiting to be committed
+        self.touched = set()  # Identities hit this run (last_used is refreshed on flush)
+        self.miss_fingerprints = {}  # identity -> fingerprint from a missed get(), reused by put()
+
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+        import sqlite3
+
+        self.conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+
+    @classmethod
+    def from_config(cls, config, settings=""):
+        """Build a cache from the `metadata_cache*` config options, or return None if disabled."""
+        if not config.get("metadata_cache", True):
+            return None
+        import sqlite3  # ✅ Imported when the cache is opened, not at startup
+
+        try:
+            return cls(
+                db_path=config.get("metadata_cache_path", "metadata_cache.sqlite"),
+                max_age_days=config.get("metadata_cache_max_age_days", 90),
+                max_size_mb=config.get("metadata_cache_max_size_mb", 512),
+                settings=settings,
+            )
+        except sqlite3.Error as e:
+            print(f"⚠️ Could not open metadata cache: {e}. Continuing without it.")
+            return None
+
+    def _create_schema(self):
+        with self.conn:
+            self.conn.execute("CREATE TABLE IF NOT EXISTS cache_info (key TEXT PRIMARY KEY, value TEXT)")
+            row = self.conn.execute("SELECT value FROM cache_info WHERE key = 'version'").fetchone()
+            if row is None or int(row[0]) != CACHE_VERSION:
+                self.conn.execute("DROP TABLE IF EXISTS metadata")
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO cache_info (key, value) VALUES ('version', ?)", (str(CACHE_VERSION),)
+                )
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS metadata (
+                    device INTEGER NOT NULL,
+                    inode INTEGER NOT NULL,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    settings TEXT NOT NULL,
+                    fingerprint TEXT NOT NULL,
+                    metadata TEXT NOT NULL,
+                    projection TEXT NOT NULL,
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (device, inode, size, mtime_ns, settings)
+                )
+                """
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_metadata_fingerprint ON metadata (fingerprint)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_metadata_last_used ON metadata (last_used)")
+
+    @staticmethod
+    def projection_signature(keys):
+        """Stored form of a key projection: `""` for a full parse, else the sorted keys behind a leading comma."""
+        return "" if keys is None else "," + ",".join(sorted(keys))
+
+    @staticmethod
+    def _covers(signature, keys):
+        if not signature:
+            return True  # ✅ Full parse
+        if keys is None:
+            return False
+        return set(keys) <= set(signature.split(","))
+
+    def get(self, image_path, st=None, keys=None):
+        """Return the cached metadata dict for an image, or None on a miss (or if the entry lacks some of `keys`)."""
+        try:
+            identity = file_identity(image_path, st)
+        except OSError:
+            return None
+
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT metadata, projection FROM metadata "
+                "WHERE device = ? AND inode = ? AND size = ? AND mtime_ns = ? AND settings = ?",
+                identity + (self.settings,),
+            ).fetchone()
+        if row is not None:
+            if not self._covers(row[1], keys):
+                return None
+            self.touched.add(identity)
+            return self._load(row[0], image_path)
+
+        # ✅ Identity changed (moved/copied file): fall back to the content fingerprint
+        try:
+            fingerprint = content_fingerprint(image_path, identity[2])
+        except OSError:
+            return None
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT metadata, projection FROM metadata WHERE fingerprint = ? AND settings = ? "
+                "ORDER BY last_used DESC LIMIT 1",
+                (fingerprint, self.settings),
+            ).fetchone()
+        if row is None or not self._covers(row[1], keys):
+            self._remember_fingerprint(identity, fingerprint)
+            return None
+
+        # Re-key the entry under the new identity so the next run is a plain stat() hit
+        self._queue(identity, fingerprint, row[0], row[1])
+        return self._load(row[0], image_path)
+
+    def put(self, image_path, metadata, st=None, keys=None):
+        """Store processed metadata for an image, parsed for `keys` (None: everything); committed in batches."""
+        try:
+            identity = file_identity(image_path, st)
+            with self.lock:
+                fingerprint = self.miss_fingerprints.pop(identity, None)
+            if fingerprint is None:
+                fingerprint = content_fingerprint(image_path, identity[2])
+        except OSError:
+            return
+        self._queue(identity, fingerprint, json.dumps(metadata, default=str), self.projection_signature(keys))
+
+    def _remember_fingerprint(self, identity, fingerprint):
+        with self.lock:
+            if len(self.miss_fingerprints) >= MISS_FINGERPRINTS:
+                del self.miss_fingerprints[next(iter(self.miss_fingerprints))]  # ✅ Oldest first, never put()
+            self.miss_fingerprints[identity] = fingerprint
+
+    def _queue(self, identity, fingerprint, payload, projection):
+        with self.lock:
+            self.pending.append(identity + (self.settings, fingerprint, payload, projection, time.time()))
+            if len(self.pending) >= self.batch_size:
+                self._flush_locked()
+
+    @staticmethod
+    def _load(payload, image_path):
+        metadata = json.loads(payload)
+        if "SourceFile" in metadata:
+            metadata["SourceFile"] = image_path
+        return metadata
+
+    def flush(self):
+        """Commit pending entries and refresh `last_used` for entries hit this run."""
+        with self.lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        now = time.time()
+        with self.conn:
+            if self.pending:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO metadata "
+                    "(device, inode, size, mtime_ns, settings, fingerprint, metadata, projection, last_used) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    self.pending,
+                )
+                self.pending.clear()
+            if self.touched:
+                self.conn.executemany(
+                    "UPDATE metadata SET last_used = ? "
+                    "WHERE device = ? AND inode = ? AND size = ? AND mtime_ns = ? AND settings = ?",
+                    [(now,) + identity + (self.settings,) for identity in self.touched],
+                )
+                self.touched.clear()
+
+    def evict(self):
+        """Drop entries older than `max_age_days`, then the least recently used ones above `max_size_mb`."""
+        with self.lock:
+            self._flush_locked()
+            with self.conn:
+                if self.max_age_days:
+                    cutoff = time.time() - float(self.max_age_days) * 86400
+                    self.conn.execute("DELETE FROM metadata WHERE last_used < ?", (cutoff,))
+
+                if self.max_size_mb:
+                    max_bytes = float(self.max_size_mb) * 1024 * 1024
+                    used = self.conn.execute("SELECT COALESCE(SUM(LENGTH(metadata)), 0) FROM metadata").fetchone()[0]
+                    if used > max_bytes:
+                        # Trim the oldest entries until roughly 90% of the budget is used
+                        count = self.conn.execute("SELECT COUNT(*) FROM metadata").fetchone()[0]
+                        keep = int(count * (max_bytes * 0.9) / used)
+                        self.conn.execute(
+                            "DELETE FROM metadata WHERE rowid NOT IN "
+                            "(SELECT rowid FROM metadata ORDER BY last_used DESC LIMIT ?)",
+                            (keep,),
+                        )
+
+    def close(self):
+        """Flush, evict and close the database."""
+        try:
+            self.evict()
+        finally:
+            with self.lock:
+                self.conn.close()
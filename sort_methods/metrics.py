@@ -0,0 +1,216 @@
+import os
+import re
+import json
+import time
+import threading
+from bisect import bisect_left
+from contextlib import nullcontext
+
+# Latency buckets from 1 µs to ~2 min, four per doubling: quantiles are within ~19%
+BUCKETS = tuple(1e-6 * 2 ** (i / 4) for i in range(109))
+QUANTILES = (0.5, 0.95, 0.99)
+_NULL_TIMER = nullcontext()
+_METRIC_NAME = re.compile(r"[^a-zA-Z0-9_]")
+
+
+class Histogram:
+    """Fixed log-bucket latency histogram; cheap to update and to merge across processes."""
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the `q` quantile (capped at the largest value seen)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank and bucket_count:
+                return min(BUCKETS[index], self.max) if index < len(BUCKETS) else self.max
+        return self.max
+
+    def state(self):
+        return (self.counts, self.count, self.total, self.max)
+
+    def merge(self, state):
+        counts, count, total, maximum = state
+        self.counts = [a + b for a, b in zip(self.counts, counts)]
+        self.count += count
+        self.total += total
+        self.max = max(self.max, maximum)
+
+
+class _Timer:
+    __slots__ = ("metrics", "stage", "start")
+
+    def __init__(self, metrics, stage):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+class Metrics:
+    """
+    Per-stage counters and latency histograms for one run.
+
+    Stages are free-form names such as `metadata.exiftool` or `move`. Worker processes
+    keep their own `Metrics` and ship them back with `drain()`; the parent `merge()`s them.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.started = time.time()
+
+    def count(self, name, amount=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def observe(self, stage, seconds):
+        with self.lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = Histogram()
+            histogram.observe(seconds)
+
+    def time(self, stage):
+        """Context manager recording how long its body took under `stage`."""
+        return _Timer(self, stage)
+
+    def drain(self):
+        """Return everything recorded so far as picklable data and start over."""
+        with self.lock:
+            state = (self.counters, {stage: h.state() for stage, h in self.histograms.items()})
+            self.counters, self.histograms = {}, {}
+        return state
+
+    def merge(self, state):
+        counters, histograms = state
+        with self.lock:
+            for name, amount in counters.items():
+                self.counters[name] = self.counters.get(name, 0) + amount
+            for stage, histogram_state in histograms.items():
+                histogram = self.histograms.get(stage)
+                if histogram is None:
+                    histogram = self.histograms[stage] = Histogram()
+                histogram.merge(histogram_state)
+
+    def snapshot(self):
+        """The run's metrics as a JSON-ready dict (times in seconds)."""
+        with self.lock:
+            stages = {}
+            for stage, h in sorted(self.histograms.items()):
+                stages[stage] = {
+                    "count": h.count,
+                    "total": round(h.total, 6),
+                    "mean": round(h.total / h.count, 9) if h.count else 0.0,
+                    "p50": round(h.quantile(0.5), 9),
+                    "p95": round(h.quantile(0.95), 9),
+                    "p99": round(h.quantile(0.99), 9),
+                    "max": round(h.max, 9),
+                }
+            return {
+                "started": self.started,
+                "elapsed": round(time.time() - self.started, 6),
+                "counters": dict(sorted(self.counters.items())),
+                "stages": stages,
+            }
+
+    def prometheus_text(self, prefix="custom_sorter"):
+        """The run's metrics in the Prometheus text exposition format (for the node_exporter textfile collector)."""
+        snapshot = self.snapshot()
+        lines = [
+            f"# HELP {prefix}_stage_seconds Time spent per stage during the last run.",
+            f"# TYPE {prefix}_stage_seconds summary",
+        ]
+        for stage, values in snapshot["stages"].items():
+            for q in QUANTILES:
+                lines.append(f'{prefix}_stage_seconds{{stage="{stage}",quantile="{q}"}} {values[f"p{int(q * 100)}"]}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {values["total"]}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {values["count"]}')
+        for name, value in snapshot["counters"].items():
+            metric = f"{prefix}_{_METRIC_NAME.sub('_', name)}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value}")
+        lines.append(f"# TYPE {prefix}_last_run_seconds gauge")
+        lines.append(f"{prefix}_last_run_seconds {snapshot['elapsed']}")
+        lines.append(f"# TYPE {prefix}_last_run_timestamp_seconds gauge")
+        lines.append(f"{prefix}_last_run_timestamp_seconds {snapshot['started']}")
+        return "\n".join(lines) + "\n"
+
+
+def _write_atomic(path, text):
+    """Write through a temporary file so collectors never read a half-written file."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+_metrics = None
+
+
+def configure_metrics(enabled):
+    """Start recording metrics for this process (or stop, with `enabled=False`)."""
+    global _metrics
+    _metrics = Metrics() if enabled else None
+    return _metrics
+
+
+def get_metrics():
+    """Return the process-wide `Metrics`, or None when instrumentation is off."""
+    return _metrics
+
+
+def timed(stage):
+    """`with timed("stage"):` records the block's duration; a shared no-op when metrics are off."""
+    metrics = _metrics
+    return metrics.time(stage) if metrics is not None else _NULL_TIMER
+
+
+def count(name, amount=1):
+    """Add `amount` to the counter `name` (no-op when metrics are off)."""
+    metrics = _metrics
+    if metrics is not None:
+        metrics.count(name, amount)
+
+
+def export_metrics(config):
+    """Write the run's metrics to `metrics_json_path` and `metrics_prometheus_path` (either may be empty)."""
+    metrics = _metrics
+    if metrics is None:
+        return
+    json_path = config.get("metrics_json_path", "run_metrics.json")
+    prometheus_path = config.get("metrics_prometheus_path", "")
+    try:
+        if json_path:
+            _write_atomic(json_path, json.dumps(metrics.snapshot(), indent=4) + "\n")
+            print(f"📊 Run metrics saved to {json_path}")
+        if prometheus_path:
+            _write_atomic(prometheus_path, metrics.prometheus_text())
+    except OSError as e:
+        print(f"⚠️ Could not write run metrics: {e}")
@@ -0,0 +1,294 @@
+import os
+import errno
+import atexit
+import shutil
+import threading
+from sort_methods.duplicates import resolve_group, get_digest_store
+from sort_methods.metrics import timed
+
+COPY_CHUNK = 8 * 1024 * 1024  # Bytes per copy_file_range/sendfile call
+MOVED = "moved"
+SKIPPED_IDENTICAL = "skipped_identical"  # An identical file is already at the destination; the source stays
+
+# Errors meaning "this kernel/filesystem can't do zero-copy here", not "the copy failed"
+_FALLBACK_ERRNOS = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSUP, errno.EBADF}
+
+
+def _copy_file_range(fsrc, fdst, size):
+    copied = 0
+    while copied < size:
+        sent = os.copy_file_range(fsrc, fdst, min(COPY_CHUNK, size - copied))
+        if sent == 0:
+            break
+        copied += sent
+    return copied
+
+
+def _sendfile(fsrc, fdst, size):
+    copied = 0
+    while copied < size:
+        sent = os.sendfile(fdst, fsrc, copied, min(COPY_CHUNK, size - copied))
+        if sent == 0:
+            break
+        copied += sent
+    return copied
+
+
+def copy_data(src, dst):
+    """
+    Copy file contents from `src` to `dst` inside the kernel where possible.
+
+    Tries `os.copy_file_range` (which also allows reflinks and server-side copies),
+    then `os.sendfile`, then a plain buffered copy.
+    """
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        size = os.fstat(fsrc.fileno()).st_size
+        for zero_copy in (getattr(os, "copy_file_range", None) and _copy_file_range,
+                          getattr(os, "sendfile", None) and os.name != "nt" and _sendfile):
+            if not zero_copy:
+                continue
+            try:
+                if zero_copy(fsrc.fileno(), fdst.fileno(), size) == size:
+                    return
+            except OSError as e:
+                if e.errno not in _FALLBACK_ERRNOS:
+                    raise
+            # Start over with the next method
+            fsrc.seek(0)
+            fdst.seek(0)
+            fdst.truncate()
+        shutil.copyfileobj(fsrc, fdst, COPY_CHUNK)
+
+
+class MoveEngine:
+    """
+    Moves files with as little work per file as possible.
+
+    - Destination folders are created once per run.
+    - Whether a source folder and destination folder share a filesystem is checked
+      once per folder pair; same-device moves are a single `os.replace`.
+    - An image and its sidecar files move as one group (`move_group`): they share one
+      collision suffix, are skipped together, and a failure puts back what already moved.
+    - Cross-device moves copy with `copy_file_range`/`sendfile` into a `.partial` file,
+      rename it into place and then unlink the source. With `fsync="batch"` the copies
+      are fsynced in batches and sources are only unlinked after their batch is durable;
+      `fsync="always"` syncs every file, `"off"` never does (like `shutil.move`).
+    - An existing destination is never overwritten: identical groups are skipped and
+      different ones get a `_new` name (see `resolve_group`). The names are claimed
+      atomically with `O_EXCL` placeholders before anything moves, so two threads
+      picking the same free name can't overwrite each other; the loser picks again.
+    """
+
+    def __init__(self, fsync="off", fsync_batch_size=64, journal=None):
+        self.fsync = str(fsync).lower() if fsync else "off"
+        self.journal = journal  # `MoveJournal` told about each group once its names are claimed
+        self.fsync_batch_size = max(1, int(fsync_batch_size))
+        self.created_dirs = set()
+        self.same_device = {}  # (source folder, destination folder) -> bool
+        self.pending_unlinks = []  # (src, dst) copied but not yet durable
+        self.lock = threading.Lock()
+
+    def ensure_dir(self, folder):
+        """Create `folder` unless this engine already did so during the run."""
+        if folder in self.created_dirs:
+            return
+        with timed("mkdir"):
+            os.makedirs(folder, exist_ok=True)
+        with self.lock:
+            self.created_dirs.add(folder)
+
+    def is_same_device(self, source_folder, target_folder):
+        key = (source_folder, target_folder)
+        result = self.same_device.get(key)
+        if result is None:
+            result = os.stat(source_folder).st_dev == os.stat(target_folder).st_dev
+            with self.lock:
+                self.same_device[key] = result
+        return result
+
+    def move_group(self, sources, target_folder):
+        """
+        Move an image and its sidecar files into `target_folder` under one shared name.
+
+        Returns `(MOVED, destinations)`, or `(SKIPPED_IDENTICAL, copies)` when every file
+        already has an identical copy there; the sources are then left where they are.
+        If one file fails, the files already moved are put back and the error is raised.
+        """
+        self.ensure_dir(target_folder)
+        wanted = [os.path.join(target_folder, os.path.basename(src)) for src in sources]
+        store = get_digest_store()
+
+        while True:
+            destinations, identical = resolve_group(sources, wanted, store)
+            if identical:
+                print(f"Files {', '.join(sources)} already exist in destination and are identical. Skipping.")
+                return SKIPPED_IDENTICAL, destinations
+            claimed = []
+            try:
+                for destination in destinations:
+                    self._claim(destination)
+                    claimed.append(destination)
+                break
+            except FileExistsError:
+                # ✅ Another move took one of the names after we checked; pick again
+                for destination in claimed:
+                    self._remove_quietly(destination)
+
+        done = 0
+        try:
+            if self.journal is not None:
+                # ✅ Write-ahead: the names actually chosen are durable before any file moves
+                self.journal.started(sources, target_folder, destinations)
+            for src, destination in zip(sources, destinations):
+                self._move_claimed(src, destination)
+                done += 1
+        except BaseException:
+            for destination in destinations[done:]:
+                self._remove_quietly(destination)  # Placeholders of the files not moved
+            for src, destination in reversed(list(zip(sources, destinations))[:done]):
+                self._undo(src, destination)
+            raise
+        return MOVED, destinations
+
+    @staticmethod
+    def _claim(destination):
+        """Create an empty placeholder at `destination`; FileExistsError if the name is taken."""
+        os.close(os.open(destination, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644))
+
+    def _move_claimed(self, src, destination):
+        """Move `src` over our own placeholder at `destination` (which the caller removes on failure)."""
+        source_folder = os.path.dirname(os.path.abspath(src))
+        target_folder = os.path.dirname(destination)
+        if self.is_same_device(source_folder, target_folder):
+            try:
+                os.replace(src, destination)  # ✅ Fast path: a single rename
+                return
+            except OSError as e:
+                if e.errno != errno.EXDEV:
+                    raise
+                # Bind mounts can share st_dev but still refuse renames
+                with self.lock:
+                    self.same_device[(source_folder, target_folder)] = False
+        self._copy_move(src, destination)
+
+    def _undo(self, src, destination):
+        """Put back a file of a group that failed part way."""
+        with self.lock:
+            if (src, destination) in self.pending_unlinks:
+                self.pending_unlinks.remove((src, destination))
+        try:
+            if os.path.lexists(src):
+                os.remove(destination)  # ✅ Copied, but the source was not unlinked yet
+            else:
+                self._claim(src)
+                try:
+                    self._move_claimed(destination, src)
+                except OSError:
+                    self._remove_quietly(src)
+                    raise
+        except OSError as e:
+            print(f"⚠️ Could not move {destination} back to {src}: {e}")
+
+    def _copy_move(self, src, destination):
+        partial = destination + ".partial"
+        try:
+            copy_data(src, partial)
+            shutil.copystat(src, partial)
+            if self.fsync == "always":
+                self._fsync_file(partial)
+            os.replace(partial, destination)  # ✅ Over our placeholder, which held the name during the copy
+        except BaseException:
+            self._remove_quietly(partial)
+            raise
+
+        if self.fsync == "batch":
+            with self.lock:
+                self.pending_unlinks.append((src, destination))
+                flush = len(self.pending_unlinks) >= self.fsync_batch_size
+            if flush:
+                self.flush()
+        else:
+            if self.fsync == "always":
+                self._fsync_dir(os.path.dirname(destination))
+            os.remove(src)
+
+    def flush(self):
+        """Make pending cross-device copies durable, then unlink their sources."""
+        with self.lock:
+            pending, self.pending_unlinks = self.pending_unlinks, []
+        if not pending:
+            return
+
+        for _, destination in pending:
+            self._fsync_file(destination)
+        for folder in {os.path.dirname(destination) for _, destination in pending}:
+            self._fsync_dir(folder)
+        for src, _ in pending:
+            try:
+                os.remove(src)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"⚠️ Copied but could not remove source {src}: {e}")
+
+    @staticmethod
+    def _remove_quietly(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    @staticmethod
+    def _fsync_file(path):
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    def _fsync_dir(folder):
+        if os.name == "nt":
+            return  # Directories can't be opened for fsync on Windows
+        try:
+            fd = os.open(folder, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+
+_engine = None
+_engine_options = {}
+_engine_lock = threading.Lock()
+
+
+def configure_move_engine(fsync="off", fsync_batch_size=64, journal=None):
+    """Set the options used when the run-wide engine is created; an engine made earlier is flushed and replaced."""
+    close_move_engine()
+    _engine_options.update(fsync=fsync, fsync_batch_size=fsync_batch_size, journal=journal)
+
+
+def get_move_engine():
+    """Return the run-wide move engine, creating it on first use."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = MoveEngine(**_engine_options)
+        return _engine
+
+
+def close_move_engine():
+    """Flush pending copies and forget the per-run directory/device caches (registered with atexit)."""
+    global _engine
+    with _engine_lock:
+        engine, _engine = _engine, None
+    if engine is not None:
+        engine.flush()
+
+
+atexit.register(close_move_engine)
@@ -0,0 +1,186 @@
+import os
+import time
+import threading
+
+PLANNED = "planned"
+STARTED = "started"
+DONE = "done"
+SKIPPED = "skipped"  # An identical file was already at the destination; the source was kept
+FAILED = "failed"
+
+
+class MoveJournal:
+    """
+    Write-ahead journal of file moves, so an interrupted run can pick up where it stopped.
+
+    Each move goes `planned` → `started` → `done` (or `skipped`/`failed`). Planned rows
+    are committed in batches of `batch_size`, and the pipeline commits a batch before
+    queueing its moves. `started` is committed by the `MoveEngine` once it has claimed
+    the destination names and before any file is touched, and it records the
+    destination actually chosen (`name_new.png` after a collision). Completed states
+    are batched. Because recovery checks the files on disk, losing the last
+    uncommitted `done` rows only means a few extra checks on restart, never a wrong answer:
+
+    - source gone, destination present → the move finished (replayed as done)
+    - a `.partial` copy is left behind → it is removed (rolled back) and the move redone
+    - started, source still present → the destination is the engine's empty placeholder
+      or a finished copy whose source was never unlinked; it is removed and the move redone
+    - planned, source still present → the move is redone
+    - neither present → marked failed
+    """
+
+    def __init__(self, db_path="move_journal.sqlite", batch_size=256):
+        self.db_path = db_path
+        self.batch_size = max(1, int(batch_size))
+        self.pending = []  # (state, src, dst) waiting to be committed
+        self.lock = threading.Lock()
+
+        import sqlite3
+
+        self.conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS moves (
+                    src TEXT PRIMARY KEY,
+                    dst TEXT NOT NULL,
+                    state TEXT NOT NULL,
+                    updated REAL NOT NULL
+                )
+                """
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_moves_state ON moves (state)")
+
+    @classmethod
+    def from_config(cls, config):
+        """Open the journal from the `move_journal*` options, or return None if disabled."""
+        if not config.get("move_journal", True):
+            return None
+        import sqlite3  # ✅ Imported when the journal is opened, not at startup
+
+        try:
+            return cls(
+                config.get("move_journal_path", "move_journal.sqlite"),
+                batch_size=config.get("move_journal_batch_size", 256),
+            )
+        except sqlite3.Error as e:
+            print(f"⚠️ Could not open move journal: {e}. Continuing without it.")
+            return None
+
+    def _record(self, state, files, target_folder, destinations=None, commit=False):
+        # Without `destinations` a known destination is kept: only `planned` guesses one from the name
+        replace_dst = destinations is not None or state == PLANNED
+        if destinations is None:
+            destinations = [os.path.join(target_folder, os.path.basename(src)) for src in files]
+        now = time.time()
+        with self.lock:
+            self.pending.extend((src, dst, state, now, replace_dst) for src, dst in zip(files, destinations))
+            if commit or len(self.pending) >= self.batch_size:
+                self._flush_locked()
+
+    def planned(self, files, target_folder):
+        """Record that `files` are going to be moved into `target_folder` (committed with the batch, see `flush`)."""
+        self._record(PLANNED, files, target_folder)
+
+    def started(self, files, target_folder, destinations=None):
+        """Record, durably, that `files` are being moved to `destinations` (the names claimed in `target_folder`)."""
+        self._record(STARTED, files, target_folder, destinations, commit=True)
+
+    def completed(self, files, target_folder, destinations=None):
+        """Record that `files` were moved into `target_folder` (to `destinations`, if given)."""
+        self._record(DONE, files, target_folder, destinations)
+
+    def skipped(self, files, target_folder, destinations=None):
+        """Record that `files` were left in place because identical copies (`destinations`) are in `target_folder`."""
+        self._record(SKIPPED, files, target_folder, destinations)
+
+    def failed(self, files, target_folder):
+        self._record(FAILED, files, target_folder)
+
+    def flush(self):
+        with self.lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if not self.pending:
+            return
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO moves (src, dst, state, updated) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (src) DO UPDATE SET state = excluded.state, updated = excluded.updated, "
+                "dst = CASE WHEN ? THEN excluded.dst ELSE dst END",
+                self.pending,
+            )
+        self.pending.clear()
+
+    def recover(self):
+        """
+        Reconcile unfinished moves from an earlier run against the files on disk.
+
+        Returns `{target_folder: [src, ...]}` for the moves that still need to happen.
+        """
+        self.flush()
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT src, dst, state FROM moves WHERE state IN (?, ?)", (PLANNED, STARTED)
+            ).fetchall()
+
+        remaining = {}
+        updates = []
+        now = time.time()
+        for src, dst, state in rows:
+            partial = dst + ".partial"
+            if os.path.exists(partial):
+                self._roll_back(partial, "partial copy")  # ✅ A half-finished cross-device copy
+
+            src_exists = os.path.exists(src)
+            if state == STARTED and src_exists and self._own_destination(src, dst):
+                self._roll_back(dst, "unfinished destination")  # ✅ The name is claimed again on retry
+            if not src_exists and os.path.exists(dst):
+                updates.append((DONE, now, src))  # ✅ Finished before the crash
+            elif src_exists:
+                remaining.setdefault(os.path.dirname(dst), []).append(src)
+            else:
+                updates.append((FAILED, now, src))
+
+        if updates:
+            with self.lock, self.conn:
+                self.conn.executemany("UPDATE moves SET state = ?, updated = ? WHERE src = ?", updates)
+        return remaining
+
+    @staticmethod
+    def _own_destination(src, dst):
+        """Whether `dst` of a started move is the engine's placeholder or a complete copy of `src`."""
+        from sort_methods.duplicates import files_identical
+
+        try:
+            return os.path.isfile(dst) and (os.path.getsize(dst) == 0 or files_identical(src, dst))
+        except OSError:
+            return False
+
+    @staticmethod
+    def _roll_back(path, what):
+        try:
+            os.remove(path)
+        except OSError as e:
+            print(f"⚠️ Could not remove {what} {path}: {e}")
+
+    def moves(self, state=DONE):
+        """Return `(src, dst)` for every journaled move in `state`."""
+        self.flush()
+        with self.lock:
+            return self.conn.execute("SELECT src, dst FROM moves WHERE state = ?", (state,)).fetchall()
+
+    def compact(self):
+        """Drop finished entries once a run has completed; only unfinished work is kept."""
+        with self.lock:
+            self._flush_locked()
+            with self.conn:
+                self.conn.execute("DELETE FROM moves WHERE state NOT IN (?, ?)", (PLANNED, STARTED))
+
+    def close(self):
+        with self.lock:
+            self._flush_locked()
+            self.conn.close()
@@ -1,17 +1,21 @@
 import os
 import json
 import glob
-import re
 import logging
+import threading
 from datetime import datetime
 from sort_methods.metadataextractor import MetadataExtractor
 from sort_methods.sort_by_metadata import sort_by_metadata
-from sort_methods.sort_by_orientation import get_orientation_folder
-from sort_methods.sort_by_resolution import get_resolution_folder
 from sort_methods.file_mover import move_file, move_files
+from sort_methods.move_engine import get_move_engine
+from sort_methods.image_header import get_image_size
+from sort_methods.planning import ImageRecord, compile_sort_config, plan_destination, sanitize_folder_name
+from sort_methods.metrics import timed
 from scripts.cs_queue import QueueManager 
 
 class ImageSorter:
+    DIMENSIONS_CACHE_SIZE = 4096  # Images whose size is remembered at once
+
     def __init__(self, input_folder, output_folder, config):       
         self.config = config
         self.queue_manager = QueueManager()        
@@ -40,20 +44,21 @@ class ImageSorter:
         
         self.file_move_threads = config.get("file_move_threads", "auto")
         self.debug = config.get("_debug", False)
-        self.processed_files = set()  # ✅ Track base filenames already sorted
+        self.processed_files = set()  # ✅ Track base filenames already sorted (guarded by `state_lock`)
+        self.state_lock = threading.Lock()
+        self.sort_configs = {}  # (id(config), output folder) -> (config, SortConfig)
+        self.moves = []  # ✅ (source file, destination folder) of every move this run, for post-processing
+        self.duplicates = []  # ✅ (source file, identical copy) of files left in place
+        self.moves_lock = threading.Lock()
+        self.dimensions = {}  # ✅ (width, height) per image until it is moved, bounded (guarded by `state_lock`)
 
 
     
         
     def process_single_image(self, file_path, config, metadata, pbar=None):
-        """Process one image using its own metadata."""
-        self.metadata_dict = {
-            file_path: {"metadata": metadata.get("metadata", {})}  # ⬅ ensures same structure as bulk call
-        }
-        self.multi_sort(file_path, config, self.output_folder, pbar=pbar)
-        
-        # ✅ Clear after use to avoid cross-contamination
-        self.metadata_dict.clear()
+        """Process one image using its own metadata. Safe to call from several threads."""
+        # ✅ Metadata is passed along, never parked on `self`, so concurrent calls can't mix it up
+        self.multi_sort(file_path, config, self.output_folder, pbar=pbar, metadata=metadata)
 
         
     def process_images(self, config, metadata_dict):
@@ -81,22 +86,52 @@ class ImageSorter:
         """Retrieve metadata for a specific image."""
         return self.metadata_dict.get(image_path, {})
 
-    def multi_sort(self, image_path, config, output_folder, pbar=None):
+    def multi_sort(self, image_path, config, output_folder, pbar=None, metadata=None):
+        """
+        Sort images using the given metadata, or the metadata stored by `process_images`.
+        """
+        if metadata is None:
+            metadata = self.get_metadata(image_path)
+        plan = self.plan_image(image_path, config, metadata, output_folder)
+        if plan:
+            sorted_folder, associated_files = plan
+            self.move_planned(sorted_folder, associated_files, pbar=pbar)
+
+    def get_sort_config(self, config, output_folder):
+        """Return `config` compiled into a `SortConfig`, compiling it once per config and output folder."""
+        key = (id(config), output_folder)
+        entry = self.sort_configs.get(key)
+        if entry is None or entry[0] is not config:
+            entry = (config, compile_sort_config(config, self.input_folder, output_folder))
+            with self.state_lock:
+                self.sort_configs[key] = entry
+        return entry[1]
+
+    def claim(self, base_name):
+        """Mark an image (by base name) as being sorted; False if another call already claimed it."""
+        with self.state_lock:
+            if base_name in self.processed_files:
+                return False
+            self.processed_files.add(base_name)
+            return True
+
+    def plan_image(self, image_path, config, metadata, output_folder, index=None):
         """
-        Sort images using stored metadata.
+        Work out where an image (and its sidecar files) should go.
+
+        Returns `(sorted_folder, associated_files)`, or None if the image should be skipped.
+        Nothing is created or moved here; see `move_planned`. Pass the folder's
+        `DirectoryIndex` to look up sidecar files without listing the folder again.
         """
         if not os.path.exists(image_path):
             if self.debug:
                 print(f"⚠️ File does not exist (path issue?): {image_path}")
-            return
-
-        # ✅ Retrieve metadata for this image
-        metadata = self.get_metadata(image_path)
+            return None
 
         if not metadata:
             if self.debug:
                 print(f"⚠️ No metadata available for {image_path}, skipping sorting.")
-            return
+            return None
 
         # ✅ Ensure we're accessing the correct metadata values
         metadata_values = metadata.get("metadata", {})  # Extract nested metadata dictionary
@@ -104,76 +139,63 @@ class ImageSorter:
         if self.debug:
             print(f"🔍 Sorting {image_path} using metadata: {metadata_values.keys()}")
 
-        # ✅ Retrieve sorting configuration
-        sort_methods = config.get("sort_methods", [])
-        metadata_keys = config.get("metadata_keys", [])
-        resolution_thresholds = config.get("resolution_folders", {})
-        use_output_folder = config.get("use_output_folder", False)
-
-        sorting_criteria = []  # ✅ Will hold folder names
-
-        # ✅ Apply sorting methods in the specified order
-        for method in sort_methods:
-            if method == "metadata":
-                for key in metadata_keys:
-                    if key in metadata_values:  # ✅ Ensure we're extracting from the correct dictionary
-                        sanitized_value = self.sanitize_folder_name(str(metadata_values[key]))
-                        sorting_criteria.append(sanitized_value)
-
-            elif method == "orientation":
-                width, height = self.get_image_dimensions(image_path)
-                sorting_criteria.append(get_orientation_folder(width, height))
-
-            elif method == "resolution":
-                width, height = self.get_image_dimensions(image_path)
-                resolution_folder = get_resolution_folder(width * height, resolution_thresholds)
-                sorting_criteria.append(resolution_folder)
-
-        # ✅ Determine the correct final folder path
-        if use_output_folder:
-            sorted_folder = os.path.join(output_folder, *sorting_criteria)
-        else:
-            sorted_folder = os.path.join(os.path.dirname(image_path), *sorting_criteria)  # ✅ Keep files in-place
-        
-        ##### codeblock for safety check does not stop it from sorting into the same named folder.
-        sorted_base = os.path.basename(sorted_folder).lower()
-        rel_path = os.path.relpath(os.path.dirname(image_path), self.input_folder).lower()
-        subfolders = rel_path.split(os.sep)
-
-        if self.config.get("only_process_unsorted", True):
-            if len(subfolders) == 1 and subfolders[0] == sorted_base:
-                if self.debug:
-                    print(f"⏭️ Skipping redundant re-sort from {rel_path} to {sorted_base}")
-                return
-
-        # ✅ Early exit if image is already inside its sorted target folder
-        if os.path.commonpath([image_path, sorted_folder]) == os.path.abspath(sorted_folder):
-            print(f"⚠️ Skipping {image_path} (already sorted to {sorted_folder})")
-            return
-        #####
-        os.makedirs(sorted_folder, exist_ok=True)
-        
-
+        # ✅ Destination planning is a pure function of an immutable record and the compiled config
+        sort_config = self.get_sort_config(config, output_folder)
+        width = height = None
+        if sort_config.needs_dimensions:
+            width, height = self.get_image_dimensions(image_path, metadata_values)
+        record = ImageRecord(image_path, metadata_values, width, height)
+        with timed("plan"):
+            sorted_folder = plan_destination(record, sort_config, debug=self.debug)
+        if sorted_folder is None:
+            return None
 
-        # ✅ Track last sorted folder for logging
-        self.last_sorted_folder = sorted_folder
-        
         # ✅ Move all associated files (image, JSON, text)
         base_name, _ = os.path.splitext(image_path)
         
         # ✅ Avoid processing the same base file multiple times
-        if base_name in self.processed_files:
+        if not self.claim(base_name):
             if self.debug:
                 print(f"⚠️ Skipping duplicate processing for: {base_name}")
-            return
-        self.processed_files.add(base_name)
+            return None
 
-        associated_files = glob.glob(f"{base_name}.*")  # ✅ Match all files with the same base name
+        if index is not None:
+            associated_files = index.siblings(image_path)  # ✅ Dict lookup in the folder's scandir index
+        else:
+            associated_files = glob.glob(f"{glob.escape(base_name)}.*")  # ✅ Match all files with the same base name
         #associated_files = [image_path]
 
-        # ✅ Move all files at once using the fast batch method
-        move_files(associated_files, sorted_folder, threads=self.file_move_threads, verbose=self.debug, pbar=pbar)
-        
+        return sorted_folder, associated_files
+
+    def move_planned(self, sorted_folder, associated_files, pbar=None):
+        """
+        Move the files of one planned image as one group, then write the folder flag and log the moves.
+
+        Returns `(moved, skipped, destinations)`: the files that were moved, the ones left in
+        place because identical copies of the whole group are already in `sorted_folder`
+        (one of the two is empty), and where each of them went or which copy it matched.
+        """
+        get_move_engine().ensure_dir(sorted_folder)
+
+        # ✅ Track last sorted folder for logging
+        self.last_sorted_folder = sorted_folder
+
+        # ✅ The image and its sidecars share one name and are moved or skipped together
+        skipped = []
+        destinations = {}
+        moved = move_files(associated_files, sorted_folder, threads=self.file_move_threads, verbose=self.debug, pbar=pbar,
+                           skipped=skipped, destinations=destinations)
+        self.finish_folder(sorted_folder, moved, skipped, destinations)
+        return moved, skipped, destinations
+
+    def finish_folder(self, sorted_folder, moved, skipped=(), destinations=None):
+        """
+        Mark `sorted_folder` as sorted and log the files moved into it (and the identical ones skipped).
+
+        `destinations` maps each skipped file to the identical copy it matched (which may be a
+        `_new` name); without it the plain name in `sorted_folder` is assumed.
+        """
+        destinations = destinations or {}
         # ✅ After successful move, mark folder as sorted
         flag_path = os.path.join(sorted_folder, ".sorted.flag")
         
@@ -181,7 +203,7 @@ class ImageSorter:
             # Only create the flag if it doesn't already exist
             if not os.path.exists(flag_path):
                 try:
-                    with open(flag_path, "w") as f:
+                    with timed("flag_write"), open(flag_path, "w") as f:
                         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
                         f.write(f"This folder was sorted successfully.\nTimestamp: {timestamp}\n")
                     if self.debug:
@@ -192,8 +214,21 @@ class ImageSorter:
                 if self.debug:
                     print(f"⚠️ Flag already exists, skipping creation: {flag_path}")
 
-            for file_path in associated_files:
+            for file_path in moved:
                 logging.info(f"Moved: {file_path} ➝ {sorted_folder}")
+            for file_path in skipped:
+                logging.info(f"Skipped identical: {file_path} ➝ {sorted_folder}")
+            with self.state_lock:
+                for file_path in moved:
+                    self.dimensions.pop(file_path, None)  # ✅ Sorted, it won't be asked for again
+                for file_path in skipped:
+                    self.dimensions.pop(file_path, None)
+            with self.moves_lock:
+                self.moves.extend((file_path, sorted_folder) for file_path in moved)
+                self.duplicates.extend(
+                    (file_path, destinations.get(file_path) or os.path.join(sorted_folder, os.path.basename(file_path)))
+                    for file_path in skipped
+                )
             
         except Exception as outer_e:
             print(f"❌ Error during post-sort flag or logging block: {outer_e}")
@@ -204,16 +239,31 @@ class ImageSorter:
         
     def sanitize_folder_name(self, folder_name):
         """Remove characters that are invalid in Windows folder names."""
-        invalid_chars = r'<>:"/\|?*'  # Windows disallowed characters
-        sanitized_name = re.sub(f"[{re.escape(invalid_chars)}]", "_", folder_name)
-        return sanitized_name.strip("_")  # Remove trailing underscores
+        return sanitize_folder_name(folder_name)
 
-    def get_image_dimensions(self, image_path):
-        """Retrieve width and height of the image."""
-        from PIL import Image
-        try:
-            with Image.open(image_path) as img:
-                return img.size  # (width, height)
-        except Exception as e:
-            print(f"Error getting image dimensions for {image_path}: {e}")
-            return (0, 0)
+    def get_image_dimensions(self, image_path, metadata_values=None):
+        """
+        Retrieve width and height of the image.
+
+        Uses `ImageWidth`/`ImageHeight` from the extracted metadata when present, otherwise
+        reads the image header (Pillow is only the last resort). Results are memoized until the
+        image is moved, for at most `DIMENSIONS_CACHE_SIZE` images.
+        """
+        with self.state_lock:
+            size = self.dimensions.get(image_path)
+        if size is not None:
+            return size
+
+        width = metadata_values.get("ImageWidth") if metadata_values else None
+        height = metadata_values.get("ImageHeight") if metadata_values else None
+        if isinstance(width, int) and isinstance(height, int):
+            size = (width, height)
+        else:
+            with timed("dimensions"):
+                size = get_image_size(image_path)
+
+        with self.state_lock:
+            if len(self.dimensions) >= self.DIMENSIONS_CACHE_SIZE:
+                self.dimensions.pop(next(iter(self.dimensions)))  # ✅ Oldest first
+            self.dimensions[image_path] = size
+        return size
@@ -0,0 +1,203 @@
+import re
+from bisect import bisect_right
+from sort_methods.sort_by_orientation import get_orientation_folder
+from sort_methods.sort_by_resolution import compile_resolution_thresholds, resolution_folder_for
+
+_FIELD = re.compile(r"\{([^{}]*)\}")
+_FILTER = re.compile(r"^\s*(\w+)\s*(?:\((.*)\))?\s*$")
+DIMENSION_FIELDS = ("orientation", "resolution", "width", "height")
+
+
+class TemplateError(ValueError):
+    """Raised for a `sort_template` that can't be parsed."""
+
+
+def _number(value):
+    if isinstance(value, (int, float)):
+        return value
+    return float(str(value).strip())
+
+
+def _format_number(value):
+    return str(int(value)) if float(value).is_integer() else f"{value:g}"
+
+
+def _bucket_filter(args):
+    """`bucket(10)` → equal-width buckets ("20-29"); `bucket(10, 20, 50)` → bisect on the given breakpoints."""
+    if not args:
+        raise TemplateError("bucket() needs a width or a list of breakpoints")
+    breakpoints = sorted(_number(arg) for arg in args)
+
+    if len(breakpoints) == 1:
+        width = breakpoints[0]
+        if width <= 0:
+            raise TemplateError("bucket() width must be positive")
+        whole = float(width).is_integer()
+        labels = {}  # bucket start -> label, filled as values come in
+
+        def bucket(value):
+            start = (_number(value) // width) * width
+            label = labels.get(start)
+            if label is None:
+                end = start + width - 1 if whole and float(start).is_integer() else start + width
+                label = labels[start] = f"{_format_number(start)}-{_format_number(end)}"
+            return label
+
+        return bucket
+
+    # ✅ Labels for every interval are built once, the lookup is a bisect
+    labels = [f"<{_format_number(breakpoints[0])}"]
+    labels += [f"{_format_number(lo)}-{_format_number(hi)}" for lo, hi in zip(breakpoints, breakpoints[1:])]
+    labels.append(f"{_format_number(breakpoints[-1])}+")
+
+    def bucket(value):
+        return labels[bisect_right(breakpoints, _number(value))]
+
+    return bucket
+
+
+def _round_filter(args):
+    digits = int(_number(args[0])) if args else 0
+
+    def round_value(value):
+        rounded = round(_number(value), digits)
+        return _format_number(rounded) if digits <= 0 else f"{rounded:.{digits}f}"
+
+    return round_value
+
+
+FILTERS = {
+    "bucket": _bucket_filter,
+    "round": _round_filter,
+    "lower": lambda args: lambda value: str(value).lower(),
+    "upper": lambda args: lambda value: str(value).upper(),
+}
+
+
+def _parse_args(text):
+    if not text or not text.strip():
+        return []
+    return [arg.strip().strip("\"'") for arg in text.split(",")]
+
+
+class CompiledTemplate:
+    """
+    A `sort_template` such as `"{model}/{orientation}/{steps:bucket(10)}/{cfg_scale:round(1)}"`,
+    parsed once and compiled into closures.
+
+    Every `/`-separated segment becomes one folder. A field is a metadata key (as
+    stored, e.g. `cfg_scale`) or one of `orientation`, `resolution`, `width`, `height`,
+    optionally followed by `:filter(args)` steps. A segment whose field is missing,
+    or whose filter can't handle the value, becomes the fallback folder.
+
+    Called as a routing step: `template(record, criteria)` appends the folder names.
+    Pickles as its source text and recompiles on load.
+    """
+
+    def __init__(self, template, fallback="unknown", resolution_folders=None, sanitize=None):
+        self.template = template
+        self.fallback = fallback
+        self.resolution_folders = dict(resolution_folders or {})
+        self.sanitize = sanitize or (lambda name: name)
+        self.needs_dimensions = False
+        self.metadata_fields = set()  # ✅ Metadata keys the template reads, for key projection
+        self.segments = [self._compile_segment(segment) for segment in template.strip("/").split("/") if segment]
+        if not self.segments:
+            raise TemplateError(f"Empty sort_template: '{template}'")
+
+    def __reduce__(self):
+        return (self.__class__, (self.template, self.fallback, self.resolution_folders, self.sanitize))
+
+    def _compile_field(self, spec):
+        name, *filters = spec.split(":")
+        name = name.strip().lower().replace(" ", "_")
+        if not name:
+            raise TemplateError(f"Empty field in sort_template: '{{{spec}}}'")
+
+        if name in DIMENSION_FIELDS:
+            self.needs_dimensions = True
+        if name == "orientation":
+            getter = lambda record: get_orientation_folder(record.width, record.height)
+        elif name == "resolution":
+            thresholds = compile_resolution_thresholds(self.resolution_folders)
+            getter = lambda record: resolution_folder_for(record.width * record.height, thresholds)
+        elif name in ("width", "height"):
+            getter = lambda record: getattr(record, name)
+        else:
+            self.metadata_fields.add(name)
+
+            def getter(record):
+                value = record.metadata.get(name)
+                if isinstance(value, list):
+                    value = ", ".join(str(v) for v in value)
+                return value
+
+        steps = []
+        for text in filters:
+            match = _FILTER.match(text)
+            if not match or match.group(1).lower() not in FILTERS:
+                raise TemplateError(f"Unknown filter '{text}' in sort_template field '{{{spec}}}'")
+            steps.append(FILTERS[match.group(1).lower()](_parse_args(match.group(2))))
+
+        if not steps:
+            return getter
+
+        def field(record):
+            value = getter(record)
+            if value is None or value == "":
+                return None
+            try:
+                for step in steps:
+                    value = step(value)
+            except (TypeError, ValueError):
+                return None  # e.g. bucket() on a non-numeric value
+            return value
+
+        return field
+
+    def _compile_segment(self, segment):
+        parts = []
+        position = 0
+        for match in _FIELD.finditer(segment):
+            if match.start() > position:
+                parts.append(segment[position:match.start()])
+            parts.append(self._compile_field(match.group(1)))
+            position = match.end()
+        if position < len(segment):
+            parts.append(segment[position:])
+        if any(isinstance(part, str) and ("{" in part or "}" in part) for part in parts):
+            raise TemplateError(f"Unbalanced braces in sort_template segment '{segment}'")
+
+        fallback, sanitize = self.fallback, self.sanitize
+        if len(parts) == 1 and isinstance(parts[0], str):
+            constant = sanitize(parts[0]) or fallback
+            return lambda record: constant
+
+        if len(parts) == 1:
+            field = parts[0]
+
+            def single(record):
+                value = field(record)
+                if value is None or value == "":
+                    return fallback
+                return sanitize(str(value)) or fallback
+
+            return single
+
+        def mixed(record):
+            pieces = []
+            for part in parts:
+                if isinstance(part, str):
+                    pieces.append(part)
+                    continue
+                value = part(record)
+                if value is None or value == "":
+                    return fallback
+                pieces.append(str(value))
+            return sanitize("".join(pieces)) or fallback
+
+        return mixed
+
+    def __call__(self, record, criteria):
+        for segment in self.segments:
+            criteria.append(segment(record))
@@ -0,0 +1,187 @@
+import os
+import re
+from functools import lru_cache, partial
+from typing import Callable, NamedTuple, Optional, Tuple
+from sort_methods.sort_by_orientation import get_orientation_folder
+from sort_methods.sort_by_resolution import compile_resolution_thresholds, resolution_folder_for
+from sort_methods.path_template import CompiledTemplate, TemplateError
+
+DIMENSION_METHODS = ("orientation", "resolution")
+_INVALID_CHARS = re.compile(r'[<>:"/\\|?*]')  # Windows disallowed characters
+
+
+class ImageRecord(NamedTuple):
+    """Everything destination planning needs to know about one image. Treat `metadata` as read-only."""
+
+    path: str
+    metadata: dict
+    width: Optional[int] = None
+    height: Optional[int] = None
+
+
+class SortConfig(NamedTuple):
+    """
+    The sorting options compiled once at startup.
+
+    `program` is the routing program: one step per sort method, in order, with its
+    parameters (metadata keys, parsed resolution thresholds) already bound, or a single
+    `CompiledTemplate` when `sort_template` is set. Steps are `functools.partial`s of
+    module functions or templates that pickle as their source, so a `SortConfig` can be pickled.
+    """
+
+    sort_methods: Tuple[str, ...]
+    program: Tuple[Callable, ...]
+    needs_dimensions: bool
+    use_output_folder: bool
+    output_folder: str
+    input_folder: str
+    only_process_unsorted: bool
+    output_abs: str
+    input_abs: str
+
+
+@lru_cache(maxsize=4096)
+def sanitize_folder_name(folder_name):
+    """Remove characters that are invalid in Windows folder names (memoized: values repeat a lot)."""
+    return _INVALID_CHARS.sub("_", folder_name).strip("_")  # Remove trailing underscores
+
+
+def _metadata_step(keys, record, criteria):
+    values = record.metadata
+    for key in keys:
+        if key in values:
+            criteria.append(sanitize_folder_name(str(values[key])))
+
+
+def _orientation_step(record, criteria):
+    criteria.append(get_orientation_folder(record.width, record.height))
+
+
+def _resolution_step(thresholds, record, criteria):
+    criteria.append(resolution_folder_for(record.width * record.height, thresholds))
+
+
+def compile_template(config):
+    """Compile `sort_template`, or return None if it is unset or invalid."""
+    template = config.get("sort_template")
+    if not template:
+        return None
+    try:
+        return CompiledTemplate(
+            template,
+            fallback=config.get("sort_template_fallback", "unknown"),
+            resolution_folders=config.get("resolution_folders") or {},
+            sanitize=sanitize_folder_name,
+        )
+    except TemplateError as e:
+        print(f"⚠️ Invalid sort_template: {e}. Falling back to sort_methods.")
+        return None
+
+
+def compile_program(config):
+    """Compile `sort_template` or `sort_methods` into a tuple of routing steps, each appending folder names for a record."""
+    template = compile_template(config)
+    if template is not None:
+        return (template,)
+
+    program = []
+    for method in config.get("sort_methods", []):
+        if method == "metadata":
+            program.append(partial(_metadata_step, tuple(config.get("metadata_keys", []))))
+        elif method == "orientation":
+            program.append(_orientation_step)
+        elif method == "resolution":
+            thresholds = compile_resolution_thresholds(config.get("resolution_folders") or {})
+            program.append(partial(_resolution_step, thresholds))
+        else:
+            print(f"⚠️ Unknown sort method '{method}' ignored.")
+    return tuple(program)
+
+
+def required_metadata_keys(config):
+    """
+    The metadata keys the configured sort reads, as a frozenset of normalized keys
+    (`"CFG scale"` → `"cfg_scale"`), or None when every field is needed.
+
+    Everything is needed when `save_metadata_json` is on (the JSON should be complete)
+    or when `metadata_projection` is turned off.
+    """
+    if config.get("save_metadata_json", False) or not config.get("metadata_projection", True):
+        return None
+
+    if config.get("sort_template"):
+        try:
+            return frozenset(CompiledTemplate(config["sort_template"]).metadata_fields)
+        except TemplateError:
+            pass  # ✅ compile_template reports it; sorting falls back to sort_methods
+    if "metadata" not in config.get("sort_methods", []):
+        return frozenset()
+    return frozenset(str(key).strip().lower().replace(" ", "_") for key in config.get("metadata_keys", []))
+
+
+def compile_sort_config(config, input_folder, output_folder):
+    """Freeze the sorting options of `config` into a `SortConfig`."""
+    sort_methods = tuple(config.get("sort_methods", []))
+    program = compile_program(config)
+    if program and isinstance(program[0], CompiledTemplate):
+        needs_dimensions = program[0].needs_dimensions
+    else:
+        needs_dimensions = any(method in DIMENSION_METHODS for method in sort_methods)
+    return SortConfig(
+        sort_methods=sort_methods,
+        program=program,
+        needs_dimensions=needs_dimensions,
+        use_output_folder=config.get("use_output_folder", False),
+        output_folder=output_folder,
+        input_folder=input_folder,
+        only_process_unsorted=config.get("only_process_unsorted", True),
+        output_abs=os.path.abspath(output_folder),
+        input_abs=os.path.abspath(input_folder),
+    )
+
+
+def plan_destination(record, sort_config, debug=False):
+    """
+    Return the folder `record` should be sorted into, or None if it should stay where it is.
+
+    A pure function of its arguments: it touches no shared state and no files, so it is
+    safe to call from any number of threads or processes.
+    """
+    sorting_criteria = []  # ✅ Will hold folder names
+
+    # ✅ Run the compiled routing program: the sort methods in their configured order
+    for step in sort_config.program:
+        step(record, sorting_criteria)
+
+    # ✅ Determine the correct final folder path
+    image_dir = os.path.dirname(os.path.abspath(record.path))
+    if sort_config.use_output_folder:
+        sorted_folder = os.path.join(sort_config.output_folder, *sorting_criteria)
+        sorted_abs = os.path.join(sort_config.output_abs, *sorting_criteria)
+    else:
+        sorted_folder = os.path.join(os.path.dirname(record.path), *sorting_criteria)  # ✅ Keep files in-place
+        sorted_abs = os.path.join(image_dir, *sorting_criteria)
+
+    ##### codeblock for safety check does not stop it from sorting into the same named folder.
+    # Plain string checks on absolute paths (compiled once for the folders) instead of relpath/commonpath
+    if sort_config.only_process_unsorted:
+        input_abs = sort_config.input_abs
+        if image_dir == input_abs:
+            rel_path = os.curdir
+        elif image_dir.startswith(input_abs + os.sep):
+            rel_path = image_dir[len(input_abs) + 1:]
+        else:
+            rel_path = os.path.relpath(image_dir, input_abs)
+        sorted_base = os.path.basename(sorted_folder).lower()
+        if os.sep not in rel_path and rel_path.lower() == sorted_base:
+            if debug:
+                print(f"⏭️ Skipping redundant re-sort from {rel_path.lower()} to {sorted_base}")
+            return None
+
+    # ✅ Early exit if image is already inside its sorted target folder
+    if os.path.normcase(image_dir + os.sep).startswith(os.path.normcase(sorted_abs.rstrip(os.sep) + os.sep)):
+        print(f"⚠️ Skipping {record.path} (already sorted to {sorted_folder})")
+        return None
+    #####
+
+    return sorted_folder
@@ -0,0 +1,251 @@
+import os
+import re
+import sys
+import time
+import functools
+import threading
+import collections
+
+PROFILE_MODES = ("cprofile", "sampling")
+# Before 3.12 a cProfile profiler only sees the thread that enabled it; from 3.12 on it uses
+# sys.monitoring, which covers every thread and allows only one active profiler per process
+PER_THREAD_PROFILERS = sys.version_info < (3, 12)
+_THREAD_SUFFIX = re.compile(r"(?:[-_]\d+)*(?: \(.*\))?$")  # `cs-move_3`, `Thread-2 (worker)`
+_UNSAFE = re.compile(r"[^\w.-]")
+
+
+def stage_of(thread_name):
+    """Group threads by role: `cs-plan-1` → `cs-plan`, `MainThread` → `main`."""
+    if thread_name == "MainThread":
+        return "main"
+    return _UNSAFE.sub("_", _THREAD_SUFFIX.sub("", thread_name)) or "thread"
+
+
+def _frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """
+    Samples the stack of every thread every `interval` seconds from a background thread.
+
+    Counts are kept per stage as root-first frame tuples, ready to be written as
+    collapsed stacks (`frame;frame;frame count`) for flamegraph.pl or speedscope.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = max(0.0005, float(interval))
+        self.samples = collections.defaultdict(collections.Counter)  # stage -> Counter(stack)
+        self.stopping = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="cs-profile-sampler", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def _run(self):
+        own_id = threading.get_ident()
+        labels = {}  # code object -> label, frames repeat constantly
+        while not self.stopping.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    label = labels.get(code)
+                    if label is None:
+                        label = labels[code] = _frame_label(code)
+                    stack.append(label)
+                    frame = frame.f_back
+                stack.reverse()
+                self.samples[stage_of(names.get(thread_id, "thread"))][tuple(stack)] += 1
+
+    def write(self, folder, prefix=""):
+        """Write `<prefix>all.collapsed` plus one `<prefix><stage>.collapsed` per stage."""
+        with open(os.path.join(folder, f"{prefix}all.collapsed"), "w", encoding="utf-8") as combined:
+            for stage, counter in sorted(self.samples.items()):
+                with open(os.path.join(folder, f"{prefix}{stage}.collapsed"), "w", encoding="utf-8") as f:
+                    for stack, samples in counter.most_common():
+                        f.write(f"{';'.join(stack)} {samples}\n")
+                        combined.write(f"{stage};{';'.join(stack)} {samples}\n")
+
+
+class RunProfiler:
+    """
+    Profiles one run: `cprofile` (deterministic, every thread) or `sampling` (low overhead).
+
+    Both modes write collapsed stacks per stage from a stack sampler; `cprofile` also
+    writes pstats files, per stage and combined before Python 3.12 and combined only from
+    3.12 on (one profiler covers the whole process there). With `tracemalloc=True` a
+    snapshot diff between start and stop shows where memory went.
+    """
+
+    def __init__(self, mode, folder, interval=0.005, tracemalloc=False, prefix=""):
+        self.mode = mode
+        self.folder = folder
+        self.prefix = prefix
+        self.sampler = StackSampler(interval)
+        self.profiles = []  # (stage, cProfile.Profile)
+        self.lock = threading.Lock()
+        self.tracemalloc = tracemalloc
+        self.snapshot = None
+
+    def _thread_hook(self, frame, event, arg):
+        # First profile event of a new thread: give it its own profiler, which replaces this hook
+        import cProfile
+
+        profile = cProfile.Profile()
+        with self.lock:
+            self.profiles.append((stage_of(threading.current_thread().name), profile))
+        profile.enable()
+
+    def start(self):
+        import cProfile  # ✅ Imported only when a run is profiled
+
+        os.makedirs(self.folder, exist_ok=True)
+        if self.tracemalloc:
+            import tracemalloc
+
+            tracemalloc.start(25)
+            self.snapshot = tracemalloc.take_snapshot()
+        self.sampler.start()  # ✅ Started first so the sampler thread itself is not profiled
+        if self.mode == "cprofile":
+            if PER_THREAD_PROFILERS:
+                threading.setprofile(self._thread_hook)
+                stage = stage_of(threading.current_thread().name)
+            else:
+                stage = "all"  # ✅ Already sees every thread; a second profiler would raise ValueError
+            profile = cProfile.Profile()
+            self.profiles.append((stage, profile))
+            profile.enable()
+
+    def stop(self):
+        """Stop profiling and write every output file; returns the folder they are in."""
+        self.sampler.stop()
+        if self.mode == "cprofile":
+            if PER_THREAD_PROFILERS:
+                threading.setprofile(None)
+            self.profiles[0][1].disable()
+        if self.snapshot is not None:
+            self._write_tracemalloc_diff()  # ✅ Before the stats are built, they allocate a lot
+        if self.mode == "cprofile":
+            self._write_pstats()
+        self.sampler.write(self.folder, self.prefix)
+        return self.folder
+
+    def _write_pstats(self):
+        import pstats
+
+        by_stage = collections.defaultdict(list)
+        with self.lock:
+            for stage, profile in self.profiles:
+                profile.create_stats()
+                by_stage[stage].append(profile)
+
+        combined = None
+        for stage, profiles in sorted(by_stage.items()):
+            if stage != "all":
+                pstats.Stats(*profiles).dump_stats(os.path.join(self.folder, f"{self.prefix}{stage}.pstats"))
+            if combined is None:
+                combined = pstats.Stats(*profiles)
+            else:
+                combined.add(*profiles)
+        if combined is not None:
+            combined.dump_stats(os.path.join(self.folder, f"{self.prefix}all.pstats"))
+
+    def _write_tracemalloc_diff(self, limit=50):
+        import cProfile
+        import tracemalloc
+
+        current = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        # ✅ Leave out the profilers' own bookkeeping
+        ignore = [tracemalloc.Filter(False, path) for path in (tracemalloc.__file__, cProfile.__file__, __file__)]
+        ignore.append(tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"))
+        current, previous = current.filter_traces(ignore), self.snapshot.filter_traces(ignore)
+        with open(os.path.join(self.folder, f"{self.prefix}tracemalloc-diff.txt"), "w", encoding="utf-8") as f:
+            f.write(f"Top {limit} allocation sites by growth since the start of the run\n\n")
+            for stat in current.compare_to(previous, "lineno")[:limit]:
+                f.write(f"{stat}\n")
+            f.write(f"\nTop {min(limit, 10)} growing tracebacks\n")
+            for stat in current.compare_to(previous, "traceback")[:min(limit, 10)]:
+                f.write(f"\n{stat}\n")
+                for line in stat.traceback.format(limit=10):
+                    f.write(f"{line}\n")
+
+
+def profile_mode(config):
+    """The configured `profile` mode, or None when profiling is off (or the mode is unknown)."""
+    mode = str(config.get("profile") or "").lower()
+    if not mode or mode in ("off", "false", "none"):
+        return None
+    if mode not in PROFILE_MODES:
+        print(f"⚠️ Invalid profile mode: '{mode}'. Expected one of {', '.join(PROFILE_MODES)}; not profiling.")
+        return None
+    return mode
+
+
+def profiled_run(label):
+    """
+    Decorate a `CustomSorter` method so the whole call is profiled when `profile` is set.
+
+    Output goes to `<profile_dir>/<timestamp>-<label>/`; the folder is passed to the
+    metadata worker processes through the config so their profiles land next to it.
+    """
+
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            mode = profile_mode(self.config)
+            if mode is None:
+                return method(self, *args, **kwargs)
+
+            folder = os.path.join(self.config.get("profile_dir", "profiles"), f"{time.strftime('%Y%m%d-%H%M%S')}-{label}")
+            profiler = RunProfiler(
+                mode, folder,
+                interval=self.config.get("profile_interval", 0.005),
+                tracemalloc=self.config.get("profile_tracemalloc", False),
+            )
+            self.config["_profile_run_dir"] = folder
+            profiler.start()
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                self.config.pop("_profile_run_dir", None)
+                print(f"🔬 Profile written to {profiler.stop()}")
+
+        return wrapper
+
+    return decorator
+
+
+def start_worker_profiler(config):
+    """Profile a metadata worker process until it exits, if the parent run is being profiled."""
+    mode = profile_mode(config)
+    folder = config.get("_profile_run_dir")
+    if mode is None or not folder:
+        return None
+    from multiprocessing.util import Finalize
+
+    # ✅ A worker forked from a profiled process inherits its hooks; start from a clean slate
+    sys.setprofile(None)
+    threading.setprofile(None)
+    if not PER_THREAD_PROFILERS:
+        monitoring = sys.monitoring
+        if monitoring.get_tool(monitoring.PROFILER_ID) is not None:
+            monitoring.set_events(monitoring.PROFILER_ID, 0)
+            monitoring.free_tool_id(monitoring.PROFILER_ID)
+    threading.current_thread().name = "metadata-worker"  # Not the parent thread name it was forked from
+    profiler = RunProfiler(mode, folder, interval=config.get("profile_interval", 0.005), prefix=f"worker-{os.getpid()}-")
+    profiler.start()
+    # ✅ Pool processes skip atexit handlers, but multiprocessing finalizers do run
+    Finalize(profiler, profiler.stop, exitpriority=10)
+    return profiler
@@ -1,6 +1,7 @@
 import os
 import json
 import re
+from sort_methods.a1111_parameters import parse_parameters
 
 
 class PromptFilter:
@@ -113,49 +114,12 @@ class PromptFilter:
     def parse_parameters(parameters_text):
         """
         Extracts structured metadata fields from JSON or text files.
-        - ✅ Extracts full positive prompt
-        - ✅ Removes everything after "Negative prompt:"
-        - ✅ Parses metadata fields dynamically (Steps, Sampler, etc.)
+        - ✅ Splits positive prompt, negative prompt and the settings line in one pass
+        - ✅ Converts numbers and JSON values such as `Hashes: {...}`
         - ✅ Supports ExifTool JSON format & A1111 text format
         """
-
-        metadata = {}  # Dictionary to store extracted data
-
         # **Ensure Input is a String**
         if isinstance(parameters_text, dict) and "Parameters" in parameters_text:
             parameters_text = parameters_text["Parameters"]  # ✅ Extract only "Parameters" field
 
-        # **Step 1: Split Positive Prompt from Metadata Fields**
-        neg_prompt_index = parameters_text.lower().find("negative prompt:")
-        if neg_prompt_index != -1:
-            positive_prompt = parameters_text[:neg_prompt_index].strip()  # ✅ Everything above is the Positive Prompt
-            metadata_section = parameters_text[neg_prompt_index:].strip()  # ✅ Everything below is Metadata Fields
-        else:
-            positive_prompt = parameters_text.strip()  # ✅ If no Negative Prompt, assume all is positive prompt
-            metadata_section = ""
-
-        # **Store Extracted Positive Prompt**
-        metadata["positive_prompts"] = positive_prompt  # ✅ Store in metadata dictionary
-
-        # **Step 2: Extract Metadata Fields (Below Negative Prompt)**
-        metadata_lines = re.findall(r"\n?([\w\s-]+):\s*([^\n]+)", metadata_section)
-        for key, value in metadata_lines:
-            key = key.strip().lower().replace(" ", "_")  # ✅ Normalize key format
-
-            # **Ensure Metadata Fields Are Stored Correctly**
-            if "," in value and not value.startswith("{"):  # ✅ Ignore JSON-like values
-                values = [v.strip() for v in value.split(",") if v.strip()]
-                metadata[key] = values  # ✅ Store as a list instead of a single string
-            else:
-                metadata[key] = value.strip()
-
-        # **Step 3: Extract Hashes Properly**
-        hashes_match = re.search(r'Hashes:\s*\{.*?"model":\s*"([\da-fA-F]+)".*?\}', metadata_section)
-        if hashes_match:
-            metadata["hashes"] = {"model": hashes_match.group(1)}
-
-        return metadata
-
-
-
-
+        return parse_parameters(parameters_text)
@@ -1,7 +1,7 @@
 import os
 import re
 import json
-from sort_methods.history import load_history
+from sort_methods.history import get_history_store
 
 def extract_metadata(text, key):
     """
@@ -11,15 +11,16 @@ def extract_metadata(text, key):
     Extract metadata but first check if the file was moved using the history file.
     
     """
-    history = load_history()
+    # ✅ Indexed lookup instead of loading the whole history on every call
+    entry = get_history_store().by_basename(text)
     # Get the correct file path if it's been moved
-    #if text in history:
-     #   new_path = history[text]["new_path"]
+    #if entry:
+     #   new_path = entry["new_path"]
       #  print(f"Using new path for metadata extraction: {new_path}")
        # text = new_path
     # If metadata exists in history, use it instead of opening the file
-    if text in history and "metadata" in history[text] and key in history[text]["metadata"]:
-        return history[text]["metadata"][key]
+    if entry and key in entry["metadata"]:
+        return entry["metadata"][key]
 
     # If the metadata is missing, return "Unknown"
     return "Unknown"
@@ -1,6 +1,6 @@
 import os
 import shutil
-from PIL import Image
+from sort_methods.image_header import get_image_size
 
 
 
@@ -22,8 +22,7 @@ def sort_by_orientation(folder_path, use_output_folder, output_folder):
             file_path = os.path.join(folder_path, file)
 
             try:
-                with Image.open(file_path) as img:
-                    width, height = img.size
+                width, height = get_image_size(file_path)
 
                 target_folder = get_orientation_folder(width, height)
                 destination_folder = os.path.join(output_folder, target_folder) if use_output_folder else os.path.join(folder_path, target_folder)
@@ -1,20 +1,43 @@
 import os
 import shutil
-from PIL import Image
+from bisect import bisect_left
+from sort_methods.image_header import get_image_size
 
-def get_resolution_folder(total_pixels, resolution_thresholds):
-    """Determine the appropriate resolution folder."""
+def compile_resolution_thresholds(resolution_thresholds):
+    """
+    Turn `{folder: "WxH"}` into `(max_pixels, folders)`, two sorted lists for `bisect`.
+
+    Thresholds are parsed once. Folders are checked in config order and the first one
+    an image fits wins, so a folder whose limit is not above an earlier one can never
+    win and is dropped; what is left is strictly increasing and can be binary searched.
+    """
+    limits, folders = [], []
     for folder, dimensions in resolution_thresholds.items():
-        try:
-            width, height = map(int, dimensions.split('x'))  # Convert 'widthxheight' to total pixels
-            max_pixels = width * height
-        except ValueError:
-            print(f"Warning: Invalid resolution threshold '{dimensions}' in config.")
-            continue
+        if isinstance(dimensions, (int, float)):
+            max_pixels = dimensions  # Already a pixel count (e.g. float("inf"))
+        else:
+            try:
+                width, height = map(int, dimensions.split('x'))  # Convert 'widthxheight' to total pixels
+                max_pixels = width * height
+            except (ValueError, AttributeError):
+                print(f"Warning: Invalid resolution threshold '{dimensions}' in config.")
+                continue
+        if not limits or max_pixels > limits[-1]:
+            limits.append(max_pixels)
+            folders.append(folder)
+    return limits, folders
+
 
-        if total_pixels <= max_pixels:
-            return folder
-    return "other"
+def resolution_folder_for(total_pixels, compiled_thresholds):
+    """Look up the resolution folder in thresholds compiled by `compile_resolution_thresholds`."""
+    limits, folders = compiled_thresholds
+    i = bisect_left(limits, total_pixels)
+    return folders[i] if i < len(folders) else "other"
+
+
+def get_resolution_folder(total_pixels, resolution_thresholds):
+    """Determine the appropriate resolution folder."""
+    return resolution_folder_for(total_pixels, compile_resolution_thresholds(resolution_thresholds))
 
 def sort_by_resolution(folder_path, resolution_thresholds, use_output_folder, output_folder):
     if not os.path.exists(folder_path):
@@ -26,9 +49,8 @@ def sort_by_resolution(folder_path, resolution_thresholds, use_output_folder, ou
             file_path = os.path.join(folder_path, file)
 
             try:
-                with Image.open(file_path) as img:
-                    width, height = img.size
-                    total_pixels = width * height
+                width, height = get_image_size(file_path)
+                total_pixels = width * height
 
                 for folder, max_pixels in resolution_thresholds.items():
                     if total_pixels <= max_pixels:
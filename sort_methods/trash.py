@@ -0,0 +1,294 @@
+import os
+import sys
+import time
+import errno
+import heapq
+import shutil
+import threading
+from datetime import datetime
+from urllib.parse import quote
+
+DELETE_MODES = ("trash", "delete")
+
+
+def _mount_point(path):
+    path = os.path.abspath(path)
+    while not os.path.ismount(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+    return path
+
+
+def _home_trash():
+    data_home = os.environ.get("XDG_DATA_HOME") or os.path.expanduser("~/.local/share")
+    return os.path.join(data_home, "Trash")
+
+
+class FreeDesktopTrash:
+    """
+    Trash files the FreeDesktop.org way, in batches per trash folder.
+
+    Files are grouped by mount, each trash folder is listed once to pick free names,
+    all `.trashinfo` entries of the group are written first and the files are then
+    renamed into `files/`. That replaces one lookup/write/rename round per file.
+
+    When a mount's `.Trash-$uid` cannot be created (read-only or foreign top folder)
+    its files go to the home trash instead, copied across devices as the spec allows.
+    """
+
+    def __init__(self):
+        self.uid = os.getuid()
+        self.home_trash = _home_trash()
+        self.home_device = self._device(os.path.dirname(self.home_trash))
+        self.trash_dirs = {}  # st_dev -> (trash folder, mount point or None for the home trash)
+
+    @staticmethod
+    def _device(path):
+        while not os.path.exists(path):
+            path = os.path.dirname(path)
+        return os.stat(path).st_dev
+
+    def _trash_dir_for(self, device, path):
+        if device in self.trash_dirs:
+            return self.trash_dirs[device]
+        if device == self.home_device:
+            result = (self.home_trash, None)
+        else:
+            top = _mount_point(path)
+            shared = os.path.join(top, ".Trash")
+            if os.path.isdir(shared) and not os.path.islink(shared) and os.stat(shared).st_mode & 0o1000:
+                result = (os.path.join(shared, str(self.uid)), top)  # Sticky admin-created .Trash
+            else:
+                result = (os.path.join(top, f".Trash-{self.uid}"), top)
+        self.trash_dirs[device] = result
+        return result
+
+    def trash(self, paths):
+        """Trash `paths`; returns `[(path, error), ...]` for the files that could not be trashed."""
+        groups = {}
+        failed = []
+        for path in paths:
+            path = os.path.abspath(path)
+            try:
+                device = os.lstat(path).st_dev
+                groups.setdefault(self._trash_dir_for(device, path), []).append(path)
+            except OSError as e:
+                failed.append((path, e))
+        for (trash_dir, top), files in groups.items():
+            failed.extend(self._trash_group(trash_dir, top, files))
+        return failed
+
+    def _trash_group(self, trash_dir, top, paths):
+        files_dir = os.path.join(trash_dir, "files")
+        info_dir = os.path.join(trash_dir, "info")
+        try:
+            os.makedirs(files_dir, mode=0o700, exist_ok=True)
+            os.makedirs(info_dir, mode=0o700, exist_ok=True)
+            # ✅ One listing per trash folder instead of an exists() check per candidate name
+            taken = set(os.listdir(files_dir))
+            taken.update(name[:-len(".trashinfo")] for name in os.listdir(info_dir))
+        except OSError as e:
+            if top is None:
+                return [(path, e) for path in paths]
+            # ✅ No usable trash on that mount: use the home trash rather than retrying the same failure
+            print(f"⚠️ Could not use trash folder {trash_dir}: {e}. Using the home trash instead.")
+            for device, entry in list(self.trash_dirs.items()):
+                if entry == (trash_dir, top):
+                    self.trash_dirs[device] = (self.home_trash, None)
+            return self._trash_group(self.home_trash, None, paths)
+
+        deletion_date = datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
+        staged = []
+        failed = []
+        for path in paths:
+            original = os.path.relpath(path, top) if top else path
+            try:
+                name, info_path = self._write_info(info_dir, taken, path, quote(original), deletion_date)
+            except OSError as e:
+                failed.append((path, e))
+                continue
+            staged.append((path, name, info_path))
+
+        for path, name, info_path in staged:
+            try:
+                self._move_into(path, os.path.join(files_dir, name))
+            except OSError as e:
+                try:
+                    os.remove(info_path)
+                except OSError:
+                    pass
+                failed.append((path, e))
+        return failed
+
+    @staticmethod
+    def _move_into(path, target):
+        try:
+            os.rename(path, target)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            # Home trash on another device: copy, then remove the original
+            try:
+                shutil.copy2(path, target, follow_symlinks=False)
+                os.remove(path)
+            except OSError:
+                try:
+                    os.remove(target)
+                except OSError:
+                    pass
+                raise
+
+    @staticmethod
+    def _write_info(info_dir, taken, path, encoded_path, deletion_date):
+        base = os.path.basename(path)
+        stem, ext = os.path.splitext(base)
+        name = base
+        n = 1
+        while True:
+            if name not in taken:
+                info_path = os.path.join(info_dir, name + ".trashinfo")
+                try:
+                    fd = os.open(info_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+                except FileExistsError:
+                    pass
+                else:
+                    with os.fdopen(fd, "w") as f:
+                        f.write(f"[Trash Info]\nPath={encoded_path}\nDeletionDate={deletion_date}\n")
+                    taken.add(name)
+                    return name, info_path
+            n += 1
+            name = f"{stem} {n}{ext}"
+
+
+class DeletionService:
+    """
+    Bulk file removal for post-processing.
+
+    `mode="trash"` sends files to the trash (batched FreeDesktop trash on Linux,
+    one `send2trash` call per batch elsewhere); `mode="delete"` removes them outright,
+    for scratch input folders. Files that are locked or otherwise fail are retried on
+    a background scheduler with a growing delay instead of blocking sleeps, and
+    `wait()` returns once every retry has finished.
+    """
+
+    def __init__(self, mode="trash", retries=3, retry_delay=2):
+        mode = str(mode).lower()
+        if mode not in DELETE_MODES:
+            print(f"⚠️ Invalid cleanup_mode: '{mode}'. Falling back to 'trash'.")
+            mode = "trash"
+        self.mode = mode
+        self.retries = max(0, int(retries))
+        self.retry_delay = max(0.0, float(retry_delay))
+        self.freedesktop = FreeDesktopTrash() if mode == "trash" and sys.platform.startswith("linux") else None
+
+        self.pending = []  # heap of (due time, attempt, path)
+        self.in_flight = 0
+        self.failures = []
+        self.condition = threading.Condition()
+        self.worker = None
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            mode=config.get("cleanup_mode", "trash"),
+            retries=config.get("cleanup_retries", 3),
+            retry_delay=config.get("cleanup_retry_delay", 2),
+        )
+
+    def _remove_batch(self, paths):
+        """Remove `paths` in one go; returns `[(path, error), ...]` for the files that failed."""
+        if self.mode == "delete":
+            failed = []
+            for path in paths:
+                try:
+                    os.remove(path)
+                except OSError as e:
+                    failed.append((path, e))
+            return failed
+
+        if self.freedesktop is not None:
+            failed = self.freedesktop.trash(paths)
+        else:
+            from send2trash import send2trash
+
+            try:
+                send2trash(list(paths))
+                failed = []
+            except Exception:
+                # The batch stopped at the first failure: find out which files are left
+                failed = []
+                for path in paths:
+                    try:
+                        send2trash(path)
+                    except Exception as e:
+                        failed.append((path, e))
+        return failed
+
+    def remove(self, paths):
+        """Remove `paths` now in one batch and queue the failures for retrying."""
+        paths = [os.path.abspath(path) for path in paths]
+        if not paths:
+            return
+        failed = dict(self._remove_batch(paths))
+        for path in paths:
+            self._settle(path, 1, failed.get(path))
+
+    def _settle(self, path, attempt, error):
+        """Report one file's outcome and queue it for another attempt if it failed."""
+        if error is None:
+            print(f"Deleted: {path}" if self.mode == "delete" else f"Sent to trash: {path}")
+        elif isinstance(error, FileNotFoundError) or not os.path.lexists(path):
+            print(f"File not found: {path}. Skipping deletion.")
+        else:
+            self._schedule(path, attempt, error)
+
+    def _schedule(self, path, attempt, error):
+        if attempt > self.retries:
+            print(f"Failed to delete {path} after {self.retries} retries: {error}")
+            with self.condition:
+                self.failures.append((path, error))
+            return
+        delay = self.retry_delay * attempt
+        print(f"⚠️ Could not delete {path}: {error}. Retrying in {delay:g} seconds (Attempt {attempt}/{self.retries})...")
+        with self.condition:
+            heapq.heappush(self.pending, (time.monotonic() + delay, attempt, path))
+            if self.worker is None:
+                self.worker = threading.Thread(target=self._run_retries, name="cs-cleanup-retry", daemon=True)
+                self.worker.start()
+            self.condition.notify_all()
+
+    def _run_retries(self):
+        while True:
+            with self.condition:
+                while True:
+                    if not self.pending:
+                        self.worker = None
+                        self.condition.notify_all()
+                        return
+                    wait = self.pending[0][0] - time.monotonic()
+                    if wait <= 0:
+                        break
+                    self.condition.wait(wait)
+                # ✅ Everything that is due goes out as one batch
+                due = []
+                now = time.monotonic()
+                while self.pending and self.pending[0][0] <= now:
+                    due.append(heapq.heappop(self.pending))
+                self.in_flight += len(due)
+
+            attempts = {path: attempt for _, attempt, path in due}
+            failed = dict(self._remove_batch(list(attempts)))
+            for path, attempt in attempts.items():
+                self._settle(path, attempt + 1, failed.get(path))
+            with self.condition:
+                self.in_flight -= len(due)
+                self.condition.notify_all()
+
+    def wait(self):
+        """Block until every queued retry has succeeded or given up; returns the files that could not be removed."""
+        with self.condition:
+            while self.pending or self.in_flight or self.worker is not None:
+                self.condition.wait()
+            return list(self.failures)
@@ -0,0 +1,21 @@
+import os
+import sys
+import stat
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+FAKE_EXIFTOOL = os.path.join(ROOT, "tests", "fake_exiftool.py")
+
+
+@pytest.fixture
+def fake_exiftool(tmp_path):
+    """Path of an executable that runs `fake_exiftool.py` with this interpreter."""
+    if os.name == "nt":
+        pytest.skip("The fake ExifTool launcher is a POSIX shell script")
+    launcher = tmp_path / "exiftool"
+    launcher.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{FAKE_EXIFTOOL}" "$@"\n')
+    launcher.chmod(launcher.stat().st_mode | stat.S_IXUSR)
+    return str(launcher)
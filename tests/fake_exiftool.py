@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Stand-in for `exiftool -stay_open True -@ -`, for testing `ExifToolWorker`/`ExifToolPool`.
+
+Reads arguments one per line and answers each `-execute{n}` with a JSON record for the
+last argument (the file path), followed by `{ready{n}}`. The path selects the behaviour:
+
+- contains `crash-once`: exits mid-request the first time (leaves `<path>.crashed`), then answers
+- contains `crash`: always exits mid-request
+- contains `hang`: never answers
+"""
+import os
+import sys
+import json
+import time
+
+
+def main():
+    args = []
+    for line in sys.stdin:
+        line = line.rstrip("\r\n")
+        if line.startswith("-execute"):
+            request_id = line[len("-execute"):]
+            path = args[-1] if args else ""
+            if "crash-once" in path:
+                marker = path + ".crashed"
+                if not os.path.exists(marker):
+                    open(marker, "w").close()
+                    sys.exit(1)
+            elif "crash" in path:
+                sys.exit(1)
+            elif "hang" in path:
+                time.sleep(3600)
+            record = {"SourceFile": path, "Args": args[:-1], "Pid": os.getpid()}
+            print(json.dumps([record]))
+            print(f"{{ready{request_id}}}", flush=True)
+            args = []
+        elif line == "False" and args and args[-1] == "-stay_open":
+            return 0
+        else:
+            args.append(line)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
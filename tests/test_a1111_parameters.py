@@ -0,0 +1,39 @@
+import json
+
+import pytest
+
+from benchmarks.check_parameters_golden import GOLDEN_FILE, load_inputs
+from sort_methods.a1111_parameters import parse_parameters, project_parameters
+
+with open(GOLDEN_FILE, "r", encoding="utf-8") as f:
+    GOLDEN = json.load(f)
+INPUTS = load_inputs()
+
+# Projections the sorter asks for: settings only, hashes, prompts, and a key no file has
+KEY_SETS = [
+    {"model"},
+    {"model", "seed", "steps"},
+    {"sampler", "cfg_scale", "size"},
+    {"hashes"},
+    {"model", "hashes"},
+    {"positive_prompts", "model"},
+    {"negative_prompt"},
+    {"no_such_key"},
+]
+
+
+def test_every_golden_case_has_an_input():
+    assert sorted(INPUTS) == sorted(GOLDEN)
+
+
+@pytest.mark.parametrize("name", sorted(GOLDEN))
+def test_parse_reproduces_the_golden_output(name):
+    assert parse_parameters(INPUTS[name]) == GOLDEN[name]
+
+
+@pytest.mark.parametrize("keys", KEY_SETS, ids=lambda keys: "+".join(sorted(keys)))
+@pytest.mark.parametrize("name", sorted(GOLDEN))
+def test_projection_matches_the_golden_output(name, keys):
+    expected = {key: value for key, value in GOLDEN[name].items() if key in keys}
+    assert project_parameters(INPUTS[name], keys) == expected
+    assert parse_parameters(INPUTS[name], keys) == expected
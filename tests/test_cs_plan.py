@@ -0,0 +1,103 @@
+import os
+import json
+
+import pytest
+
+from scripts.cs_plan import MovePlan, apply_plan
+from sort_methods.move_engine import configure_move_engine, close_move_engine
+from sort_methods.move_journal import DONE, MoveJournal
+
+
+def write(path, data=b"data"):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+
+class Sorter:
+    """Records `finish_folder` calls like `ImageSorter` does."""
+
+    def __init__(self):
+        self.finished = {}
+
+    def finish_folder(self, folder, moved, skipped=(), destinations=None):
+        self.finished[folder] = (sorted(moved), sorted(skipped))
+
+
+@pytest.fixture
+def images(tmp_path):
+    source = str(tmp_path / "in")
+    return [
+        [write(os.path.join(source, "a.png")), write(os.path.join(source, "a.txt"))],
+        [write(os.path.join(source, "b.png")), write(os.path.join(source, "b.json"))],
+    ]
+
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = MoveJournal(str(tmp_path / "journal.sqlite"))
+    configure_move_engine(journal=journal)
+    yield journal
+    close_move_engine()
+    configure_move_engine()
+    journal.close()
+
+
+def test_groups_survive_save_and_load(tmp_path, images):
+    out = str(tmp_path / "out")
+    plan = MovePlan()
+    for group in images:
+        plan.add(out, group)
+    plan.save(str(tmp_path / "plan.json"))
+
+    loaded = MovePlan.load(str(tmp_path / "plan.json"))
+    assert loaded.destinations == {out: [sorted(group) for group in images]}
+    assert loaded.file_count() == 4
+
+
+def test_version_1_plans_are_regrouped_by_stem(tmp_path, images):
+    out = str(tmp_path / "out")
+    path = tmp_path / "plan.json"
+    path.write_text(json.dumps({"version": 1, "destinations": {out: sorted(sum(images, []))}}))
+    assert sorted(map(sorted, MovePlan.load(str(path)).destinations[out])) == sorted(map(sorted, images))
+
+
+def test_loaded_plan_detects_collisions_per_group(tmp_path, images):
+    out = str(tmp_path / "out")
+    plan = MovePlan({out: images})
+    write(os.path.join(out, "a.txt"))
+    collisions = plan.detect_collisions()
+    assert sorted(c["source"] for c in collisions) == sorted(images[0])
+    assert plan.destinations == {out: [images[1]]}
+
+
+def test_apply_skips_a_changed_group_as_a_whole(tmp_path, images):
+    out = str(tmp_path / "out")
+    os.remove(images[0][1])  # The sidecar is gone since planning
+    sorter = Sorter()
+    counts = apply_plan(MovePlan({out: images}), sorter, threads=2)
+
+    assert counts == {"moved": 2, "skipped": 2, "errors": 0}
+    assert os.path.exists(images[0][0])
+    assert sorted(os.listdir(out)) == ["b.json", "b.png"]
+    assert sorter.finished == {out: (sorted(images[1]), [])}
+
+
+def test_apply_journals_each_group_with_its_claimed_names(tmp_path, images, journal):
+    out = str(tmp_path / "out")
+    started = []
+    real_started = journal.started
+
+    def record_started(files, target_folder, destinations=None):
+        started.append((list(files), list(destinations)))
+        real_started(files, target_folder, destinations)
+
+    journal.started = record_started
+    counts = apply_plan(MovePlan({out: images}), Sorter(), threads=2, journal=journal)
+
+    assert counts == {"moved": 4, "skipped": 0, "errors": 0}
+    assert sorted(started) == sorted(
+        (group, [os.path.join(out, os.path.basename(src)) for src in group]) for group in images
+    )
+    assert sorted(src for src, _ in journal.moves(DONE)) == sorted(sum(images, []))
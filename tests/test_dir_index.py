@@ -0,0 +1,49 @@
+import os
+
+from scripts.metadata_stage import extract_paths
+from sort_methods.dir_index import DirectoryIndex, group_by_stem
+from sort_methods.file_identity import file_identity
+
+
+def write(path, data=b"data"):
+    with open(path, "wb") as f:
+        f.write(data)
+    return str(path)
+
+
+class Extractor:
+    """Records the stat results `extract_paths` hands over."""
+
+    def __init__(self):
+        self.seen = {}
+
+    def extract_metadata(self, image_path, st=None):
+        self.seen[image_path] = st
+        return {"metadata": {"model": "m"}}
+
+
+def test_siblings_are_grouped_by_stem(tmp_path):
+    image = write(tmp_path / "a[1].png")
+    write(tmp_path / "a[1].txt")
+    write(tmp_path / "b.png")
+    index = DirectoryIndex(str(tmp_path))
+    assert sorted(index.siblings(image)) == [str(tmp_path / "a[1].png"), str(tmp_path / "a[1].txt")]
+    assert sorted(map(sorted, group_by_stem(entry.path for entry in index.entries.values()))) == [
+        [str(tmp_path / "a[1].png"), str(tmp_path / "a[1].txt")], [str(tmp_path / "b.png")]
+    ]
+
+
+def test_listing_stats_reach_the_extractor(tmp_path):
+    image = write(tmp_path / "a.png")
+    write(tmp_path / "a.txt")
+    items = DirectoryIndex(str(tmp_path)).images_with_stats()
+    assert [path for path, _ in items] == [image]
+
+    extractor = Extractor()
+    assert extract_paths(extractor, items) == [(image, {"model": "m"}, None)]
+    st = extractor.seen[image]
+    if os.name != "nt":  # The Windows listing has no inode, so no stat is passed there
+        assert file_identity(image, st) == file_identity(image)
+
+    extract_paths(extractor, [image])  # Plain paths still work
+    assert extractor.seen[image] is None
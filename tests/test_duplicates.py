@@ -0,0 +1,100 @@
+import os
+
+import pytest
+
+import sort_methods.duplicates as duplicates
+from sort_methods.duplicates import DigestStore, collision_name, files_identical, resolve_collision, resolve_group
+from sort_methods.file_identity import FINGERPRINT_BLOCK, file_identity
+
+
+def write(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+    return str(path)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = DigestStore(str(tmp_path / "digests.sqlite"))
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def full_hashes(monkeypatch):
+    """Count the files that get a full SHA-256."""
+    hashed = []
+    real = duplicates.full_digest
+
+    def full_digest(file_path, st=None, store=None):
+        hashed.append(file_path)
+        return real(file_path, st, store)
+
+    monkeypatch.setattr(duplicates, "full_digest", full_digest)
+    return hashed
+
+
+def test_different_sizes_are_told_apart_without_reading(tmp_path, full_hashes, monkeypatch):
+    monkeypatch.setattr(duplicates, "content_fingerprint", None)  # Would fail if called
+    assert not files_identical(write(tmp_path / "a", b"x" * 10), write(tmp_path / "b", b"x" * 11))
+    assert full_hashes == []
+
+
+def test_small_files_are_settled_by_the_fingerprint(tmp_path, full_hashes):
+    a = write(tmp_path / "a", b"same content")
+    assert files_identical(a, write(tmp_path / "b", b"same content"))
+    assert not files_identical(a, write(tmp_path / "c", b"other conten"))
+    assert full_hashes == []
+
+
+def test_large_files_differing_in_the_middle_need_a_full_hash(tmp_path, full_hashes):
+    size = FINGERPRINT_BLOCK * 3
+    a = write(tmp_path / "a", b"\0" * size)
+    b = write(tmp_path / "b", b"\0" * (size // 2) + b"\1" + b"\0" * (size // 2 - 1))
+    assert not files_identical(a, b)
+    assert full_hashes == [a, b]
+
+
+def test_cached_digests_are_reused_across_runs(tmp_path, store, full_hashes):
+    size = FINGERPRINT_BLOCK * 3
+    a = write(tmp_path / "a", b"\2" * size)
+    b = write(tmp_path / "b", b"\2" * size)
+    assert files_identical(a, b, store)
+    assert store.get(file_identity(a)) == store.get(file_identity(b))
+    full_hashes.clear()
+    assert files_identical(a, b, store)
+    assert full_hashes == []
+
+
+def test_collision_names():
+    assert collision_name("out/a.png", 0) == "out/a.png"
+    assert collision_name("out/a.png", 1) == "out/a_new.png"
+    assert collision_name("out/a.png", 3) == "out/a_new3.png"
+
+
+def test_resolve_collision(tmp_path):
+    src = write(tmp_path / "src.png", b"image")
+    out = tmp_path / "out"
+    out.mkdir()
+    destination = str(out / "src.png")
+    assert resolve_collision(src, destination) == destination
+    write(destination, b"other")
+    assert resolve_collision(src, destination) == str(out / "src_new.png")
+    write(out / "src_new.png", b"image")
+    assert resolve_collision(src, destination) is None
+
+
+def test_resolve_group_uses_one_suffix_for_every_file(tmp_path):
+    sources = [write(tmp_path / "a.png", b"image"), write(tmp_path / "a.txt", b"prompt")]
+    out = tmp_path / "out"
+    out.mkdir()
+    wanted = [str(out / "a.png"), str(out / "a.txt")]
+    write(out / "a.png", b"image")  # Identical, but its sidecar is missing
+    paths, identical = resolve_group(sources, wanted)
+    assert not identical
+    assert paths == [str(out / "a_new.png"), str(out / "a_new.txt")]
+
+    write(out / "a.txt", b"prompt")
+    paths, identical = resolve_group(sources, wanted)
+    assert identical
+    assert paths == wanted
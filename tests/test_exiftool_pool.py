@@ -0,0 +1,96 @@
+import time
+import threading
+
+import pytest
+
+from sort_methods.exiftool_pool import ExifToolError, ExifToolPool, ExifToolWorker
+
+
+def test_worker_frames_requests_with_execute_and_ready(fake_exiftool):
+    worker = ExifToolWorker(fake_exiftool, timeout=10)
+    try:
+        first = worker.execute("-json", "a.png")
+        second = worker.execute("-json", "b.png")
+        assert worker.request_id == 2
+        assert "{ready" not in first + second
+        assert '"SourceFile": "a.png"' in first
+        assert '"Args": ["-json"]' in first
+        assert '"SourceFile": "b.png"' in second
+    finally:
+        worker.close()
+    assert worker.process is None
+
+
+def test_pool_extract_returns_the_record_from_one_long_lived_process(fake_exiftool):
+    pool = ExifToolPool(fake_exiftool, size=1, timeout=10)
+    try:
+        records = [pool.extract(f"image{i}.png") for i in range(5)]
+    finally:
+        pool.close()
+    assert [r["SourceFile"] for r in records] == [f"image{i}.png" for i in range(5)]
+    assert len({r["Pid"] for r in records}) == 1
+    assert records[0]["Args"] == ["-json", "-charset", "filename=utf8"]
+
+
+def test_worker_killed_mid_request_raises_and_restarts(fake_exiftool):
+    worker = ExifToolWorker(fake_exiftool, timeout=10)
+    try:
+        with pytest.raises(ExifToolError):
+            worker.execute("-json", "crash.png")
+        assert not worker.is_alive()
+        assert '"SourceFile": "ok.png"' in worker.execute("-json", "ok.png")
+    finally:
+        worker.close()
+
+
+def test_pool_retries_once_on_a_restarted_worker(fake_exiftool, tmp_path):
+    pool = ExifToolPool(fake_exiftool, size=1, timeout=10)
+    path = str(tmp_path / "crash-once.png")
+    try:
+        assert pool.extract(path)["SourceFile"] == path
+        with pytest.raises(ExifToolError):
+            pool.extract("crash-always.png")
+        assert pool.extract("after.png")["SourceFile"] == "after.png"
+    finally:
+        pool.close()
+
+
+def test_watchdog_kills_a_hung_worker(fake_exiftool):
+    worker = ExifToolWorker(fake_exiftool, timeout=0.5)
+    try:
+        start = time.monotonic()
+        with pytest.raises(ExifToolError):
+            worker.execute("-json", "hang.png")
+        assert time.monotonic() - start < 5
+        assert not worker.is_alive()
+        assert '"SourceFile": "next.png"' in worker.execute("-json", "next.png")
+    finally:
+        worker.close()
+
+
+def test_concurrent_callers_share_a_bounded_pool(fake_exiftool):
+    pool = ExifToolPool(fake_exiftool, size=2, timeout=10)
+    results, errors = {}, []
+
+    def caller(n):
+        try:
+            for i in range(10):
+                path = f"t{n}-{i}.png"
+                results[path] = pool.extract(path)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=caller, args=(n,)) for n in range(8)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(pool.workers) <= 2
+    finally:
+        pool.close()
+
+    assert not errors
+    assert len(results) == 80
+    assert all(record["SourceFile"] == path for path, record in results.items())
+    assert len({record["Pid"] for record in results.values()}) <= 2
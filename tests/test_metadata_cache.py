@@ -0,0 +1,65 @@
+import os
+import shutil
+
+import pytest
+
+from sort_methods.metadata_cache import MetadataCache
+from sort_methods.metadataextractor import MetadataExtractor
+
+
+def write(path, data=b"data"):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "cache.sqlite")
+
+
+def test_entries_are_only_served_for_the_settings_they_were_read_with(tmp_path, db_path):
+    image = write(str(tmp_path / "image.png"))
+    cache = MetadataCache(db_path, settings="native=1,txt=1")
+    cache.put(image, {"model": "from the header"})
+    cache.close()
+
+    other = MetadataCache(db_path, settings="native=0,txt=1")
+    assert other.get(image) is None
+    other.put(image, {"model": "from exiftool"})
+    other.close()
+
+    # ✅ Both entries are kept; switching back is a hit again
+    for settings, model in (("native=1,txt=1", "from the header"), ("native=0,txt=1", "from exiftool")):
+        cache = MetadataCache(db_path, settings=settings)
+        assert cache.get(image) == {"model": model}
+        cache.close()
+
+
+def test_moved_file_only_hits_entries_with_the_same_settings(tmp_path, db_path):
+    image = write(str(tmp_path / "image.png"), b"x" * 1000)
+    cache = MetadataCache(db_path, settings="native=1,txt=1")
+    cache.put(image, {"model": "m"})
+    cache.close()
+
+    moved = str(tmp_path / "moved.png")
+    shutil.copyfile(image, moved)  # A new identity, the same fingerprint
+    cache = MetadataCache(db_path, settings="native=1,txt=0")
+    assert cache.get(moved) is None
+    cache.close()
+    cache = MetadataCache(db_path, settings="native=1,txt=1")
+    assert cache.get(moved) == {"model": "m"}
+    cache.close()
+
+
+def test_extractor_keys_its_cache_by_the_extraction_settings(db_path):
+    config = {"metadata_cache_path": db_path, "native_metadata_reader": False, "metadata_txt_fallback": True}
+    extractor = MetadataExtractor(config)
+    assert extractor.get_cache().settings == "native=0,txt=1"
+    extractor.close()
+
+    config["metadata_txt_fallback"] = False
+    extractor = MetadataExtractor(config)
+    assert extractor.get_cache().settings == "native=0,txt=0"
+    extractor.close()
@@ -0,0 +1,157 @@
+import os
+import threading
+
+import pytest
+
+import sort_methods.move_engine as move_engine
+from sort_methods.move_engine import MOVED, SKIPPED_IDENTICAL, MoveEngine
+
+
+def write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def make_group(folder, stem="image", png=b"png", txt=b"prompt"):
+    write(os.path.join(folder, f"{stem}.png"), png)
+    write(os.path.join(folder, f"{stem}.txt"), txt)
+    return [os.path.join(folder, f"{stem}.png"), os.path.join(folder, f"{stem}.txt")]
+
+
+@pytest.fixture
+def cross_device(monkeypatch):
+    """Make every move take the copy path, as between two filesystems."""
+    monkeypatch.setattr(MoveEngine, "is_same_device", lambda self, source, target: False)
+
+
+def test_group_moves_under_its_own_names(tmp_path):
+    sources = make_group(str(tmp_path / "in"))
+    out = str(tmp_path / "out")
+    status, destinations = MoveEngine().move_group(sources, out)
+    assert status == MOVED
+    assert destinations == [os.path.join(out, "image.png"), os.path.join(out, "image.txt")]
+    assert read(destinations[0]) == b"png" and read(destinations[1]) == b"prompt"
+    assert not any(os.path.exists(src) for src in sources)
+
+
+def test_identical_group_is_skipped_and_kept(tmp_path):
+    sources = make_group(str(tmp_path / "in"))
+    out = str(tmp_path / "out")
+    existing = make_group(out)
+    status, copies = MoveEngine().move_group(sources, out)
+    assert status == SKIPPED_IDENTICAL
+    assert copies == existing
+    assert all(os.path.exists(src) for src in sources)
+    assert sorted(os.listdir(out)) == ["image.png", "image.txt"]
+
+
+def test_identical_image_with_a_different_sidecar_moves_together_under_one_suffix(tmp_path):
+    sources = make_group(str(tmp_path / "in"), txt=b"other prompt")
+    out = str(tmp_path / "out")
+    make_group(out)
+    status, destinations = MoveEngine().move_group(sources, out)
+    assert status == MOVED
+    assert [os.path.basename(d) for d in destinations] == ["image_new.png", "image_new.txt"]
+    assert read(os.path.join(out, "image.txt")) == b"prompt"
+    assert read(os.path.join(out, "image_new.txt")) == b"other prompt"
+
+
+def test_a_name_taken_by_one_file_moves_the_whole_group(tmp_path):
+    sources = make_group(str(tmp_path / "in"))
+    out = str(tmp_path / "out")
+    write(os.path.join(out, "image.txt"), b"unrelated")
+    write(os.path.join(out, "image_new.png"), b"unrelated")
+    status, destinations = MoveEngine().move_group(sources, out)
+    assert status == MOVED
+    assert [os.path.basename(d) for d in destinations] == ["image_new2.png", "image_new2.txt"]
+    assert not os.path.exists(os.path.join(out, "image.png"))
+
+
+def test_cross_device_copy_leaves_no_partial_files(tmp_path, cross_device):
+    sources = make_group(str(tmp_path / "in"), png=b"x" * 300_000)
+    out = str(tmp_path / "out")
+    status, destinations = MoveEngine().move_group(sources, out)
+    assert status == MOVED
+    assert read(destinations[0]) == b"x" * 300_000
+    assert sorted(os.listdir(out)) == ["image.png", "image.txt"]
+    assert not any(os.path.exists(src) for src in sources)
+
+
+def test_batched_fsync_unlinks_sources_only_on_flush(tmp_path, cross_device):
+    sources = make_group(str(tmp_path / "in"))
+    engine = MoveEngine(fsync="batch", fsync_batch_size=100)
+    status, destinations = engine.move_group(sources, str(tmp_path / "out"))
+    assert status == MOVED
+    assert all(os.path.exists(src) for src in sources)
+    engine.flush()
+    assert not any(os.path.exists(src) for src in sources)
+    assert all(os.path.exists(d) for d in destinations)
+
+
+def test_failed_copy_removes_the_placeholder_and_partial_and_puts_the_group_back(tmp_path, cross_device, monkeypatch):
+    sources = make_group(str(tmp_path / "in"))
+    out = str(tmp_path / "out")
+    real_copy = move_engine.copy_data
+
+    def copy_data(src, dst):
+        if src.endswith(".txt"):
+            with open(dst, "wb") as f:
+                f.write(b"half")
+            raise OSError("disk full")
+        real_copy(src, dst)
+
+    monkeypatch.setattr(move_engine, "copy_data", copy_data)
+    with pytest.raises(OSError, match="disk full"):
+        MoveEngine().move_group(sources, out)
+    assert os.listdir(out) == []
+    assert read(sources[0]) == b"png" and read(sources[1]) == b"prompt"
+
+
+def test_failed_rename_puts_the_moved_files_back(tmp_path, monkeypatch):
+    sources = make_group(str(tmp_path / "in"))
+    out = str(tmp_path / "out")
+    real_replace = os.replace
+
+    def replace(src, dst):
+        if src.endswith(".txt") and dst.startswith(out):
+            raise PermissionError("locked")
+        real_replace(src, dst)
+
+    monkeypatch.setattr(move_engine.os, "replace", replace)
+    with pytest.raises(PermissionError):
+        MoveEngine().move_group(sources, out)
+    assert os.listdir(out) == []
+    assert read(sources[0]) == b"png" and read(sources[1]) == b"prompt"
+
+
+def test_concurrent_groups_never_overwrite_each_other(tmp_path):
+    out = str(tmp_path / "out")
+    engine = MoveEngine()
+    groups = [make_group(str(tmp_path / f"in{i}"), txt=f"prompt {i}".encode()) for i in range(8)]
+    results = []
+    barrier = threading.Barrier(len(groups))
+
+    def run(sources):
+        barrier.wait()
+        results.append(engine.move_group(sources, out))
+
+    threads = [threading.Thread(target=run, args=(sources,)) for sources in groups]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert all(status == MOVED for status, _ in results)
+    assert len(os.listdir(out)) == 16
+    stems = set()
+    for _, (png, txt) in results:
+        assert os.path.splitext(png)[0] == os.path.splitext(txt)[0]
+        stems.add(os.path.splitext(png)[0])
+    assert len(stems) == 8
+    assert sorted(read(txt) for _, (_, txt) in results) == sorted(f"prompt {i}".encode() for i in range(8))
@@ -0,0 +1,117 @@
+import os
+
+import pytest
+
+from sort_methods.move_engine import MoveEngine
+from sort_methods.move_journal import DONE, FAILED, MoveJournal
+
+
+def write(path, data=b"data"):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = MoveJournal(str(tmp_path / "journal.sqlite"))
+    yield journal
+    journal.close()
+
+
+@pytest.fixture
+def folders(tmp_path):
+    return str(tmp_path / "in"), str(tmp_path / "out")
+
+
+def rows(journal):
+    journal.flush()
+    return {src: (dst, state) for src, dst, state in journal.conn.execute("SELECT src, dst, state FROM moves")}
+
+
+def test_started_move_with_placeholder_and_partial_is_rolled_back_and_redone(journal, folders):
+    source, out = folders
+    src = write(os.path.join(source, "image.png"))
+    dst = write(os.path.join(out, "image.png"), b"")  # The engine's O_EXCL placeholder
+    write(dst + ".partial", b"da")
+    journal.started([src], out)
+
+    assert journal.recover() == {out: [src]}
+    assert os.listdir(out) == []
+    assert os.path.exists(src)
+
+
+def test_started_move_whose_source_was_never_unlinked_is_redone(journal, folders):
+    source, out = folders
+    src = write(os.path.join(source, "image.png"))
+    write(os.path.join(out, "image.png"))  # Copied, crashed before the source was removed
+    journal.started([src], out)
+
+    assert journal.recover() == {out: [src]}
+    assert os.listdir(out) == []
+
+
+def test_planned_move_never_touches_an_existing_destination(journal, folders):
+    source, out = folders
+    src = write(os.path.join(source, "image.png"))
+    unrelated = write(os.path.join(out, "image.png"), b"")
+    journal.planned([src], out)
+
+    assert journal.recover() == {out: [src]}
+    assert os.path.exists(unrelated)
+
+
+def test_started_move_keeps_a_different_file_at_the_destination(journal, folders):
+    source, out = folders
+    src = write(os.path.join(source, "image.png"))
+    other = write(os.path.join(out, "image.png"), b"something else")
+    journal.started([src], out)
+
+    assert journal.recover() == {out: [src]}
+    assert os.path.exists(other)
+
+
+def test_finished_move_is_replayed_as_done(journal, folders):
+    source, out = folders
+    src = os.path.join(source, "image.png")
+    dst = write(os.path.join(out, "image_new.png"))
+    journal.started([src], out, [dst])
+
+    assert journal.recover() == {}
+    assert rows(journal)[src] == (dst, DONE)
+
+
+def test_move_with_neither_file_left_is_marked_failed(journal, folders):
+    source, out = folders
+    src = os.path.join(source, "image.png")
+    journal.planned([src], out)
+
+    assert journal.recover() == {}
+    assert rows(journal)[src][1] == FAILED
+
+
+def test_engine_records_the_destination_it_claimed(journal, folders):
+    source, out = folders
+    sources = [write(os.path.join(source, "image.png")), write(os.path.join(source, "image.txt"), b"prompt")]
+    write(os.path.join(out, "image.txt"), b"other prompt")
+    journal.planned(sources, out)
+
+    MoveEngine(journal=journal).move_group(sources, out)
+    expected = [os.path.join(out, "image_new.png"), os.path.join(out, "image_new.txt")]
+    assert [rows(journal)[src][0] for src in sources] == expected
+
+    journal.completed(sources, out)  # Without destinations the claimed ones are kept
+    assert [rows(journal)[src] for src in sources] == [(dst, DONE) for dst in expected]
+
+
+def test_recovery_cleans_the_claimed_name_not_the_plain_one(journal, folders):
+    source, out = folders
+    src = write(os.path.join(source, "image.png"))
+    taken = write(os.path.join(out, "image.png"), b"")  # Someone else's empty file
+    placeholder = write(os.path.join(out, "image_new.png"), b"")
+    journal.started([src], out, [placeholder])
+
+    assert journal.recover() == {out: [src]}
+    assert os.path.exists(taken)
+    assert not os.path.exists(placeholder)
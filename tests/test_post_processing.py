@@ -0,0 +1,62 @@
+import os
+
+from scripts.post_processing_manager import PostProcessingManager
+from sort_methods.trash import DeletionService
+
+
+def write(path, data=b"data"):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+
+def manager(tmp_path, moves=(), duplicates=()):
+    return PostProcessingManager(
+        [str(tmp_path / "in")], str(tmp_path / "out"), moves=list(moves),
+        deleter=DeletionService(mode="delete", retries=0), duplicates=list(duplicates),
+    )
+
+
+def test_remove_empty_folders_climbs_to_the_input_folder_and_stops(tmp_path):
+    deep = tmp_path / "in" / "a" / "b" / "c"
+    deep.mkdir(parents=True)
+    busy = write(str(tmp_path / "in" / "x" / "keep.txt"))
+    outside = tmp_path / "elsewhere"
+    outside.mkdir()
+
+    removed = manager(tmp_path).remove_empty_folders({str(deep), os.path.dirname(busy), str(outside)})
+    assert removed == {str(tmp_path / "in" / "a"), str(tmp_path / "in" / "a" / "b"), str(deep)}
+    assert (tmp_path / "in").is_dir()
+    assert os.path.exists(busy)
+    assert outside.is_dir()
+
+
+def test_duplicate_matched_at_a_new_name_is_deleted(tmp_path):
+    src = write(str(tmp_path / "in" / "sub" / "image.png"), b"image")
+    write(str(tmp_path / "out" / "image.png"), b"a different image")
+    copy = write(str(tmp_path / "out" / "image_new.png"), b"image")
+
+    manager(tmp_path, duplicates=[(src, copy)]).compare_and_clean()
+    assert not os.path.exists(src)
+    assert not (tmp_path / "in" / "sub").exists()
+    assert os.path.exists(copy)
+
+
+def test_duplicate_that_no_longer_matches_its_copy_is_kept(tmp_path):
+    src = write(str(tmp_path / "in" / "image.png"), b"image")
+    copy = write(str(tmp_path / "out" / "image.png"), b"edited since")
+
+    manager(tmp_path, duplicates=[(src, copy)]).compare_and_clean()
+    assert os.path.exists(src)
+
+
+def test_only_the_source_folders_of_recorded_moves_are_cleaned(tmp_path):
+    moved_from = tmp_path / "in" / "moved"
+    moved_from.mkdir(parents=True)
+    untouched = tmp_path / "in" / "untouched"
+    untouched.mkdir()
+
+    manager(tmp_path, moves=[(str(moved_from / "image.png"), str(tmp_path / "out"))]).compare_and_clean()
+    assert not moved_from.exists()
+    assert untouched.is_dir()
@@ -0,0 +1,19 @@
+import sys
+import subprocess
+
+from benchmarks.bench_import import LAZY_MODULES, is_lazy
+from conftest import ROOT
+
+# The config is read, and memory tracked, only once a run starts
+STARTUP_LAZY = LAZY_MODULES + ("yaml", "tracemalloc")
+
+
+def test_entry_point_does_not_import_heavy_modules():
+    # ✅ A fresh interpreter: this test process has imported most of these already
+    process = subprocess.run(
+        [sys.executable, "-c", "import sys, run; print('\\n'.join(sys.modules))"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    loaded = set(process.stdout.split())
+    assert "scripts.cs" in loaded
+    assert sorted(name for name in loaded if is_lazy(name, STARTUP_LAZY)) == []
@@ -0,0 +1,119 @@
+import os
+import sys
+import errno
+
+import pytest
+
+import sort_methods.trash as trash
+from sort_methods.trash import DeletionService, FreeDesktopTrash
+
+linux_only = pytest.mark.skipif(not sys.platform.startswith("linux"), reason="FreeDesktop trash is Linux only")
+
+
+def write(path, data=b"data"):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+
+@pytest.fixture
+def home_trash(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_DATA_HOME", str(tmp_path / "xdg"))
+    return str(tmp_path / "xdg" / "Trash")
+
+
+@pytest.fixture
+def flaky_remove(monkeypatch):
+    """`os.remove` fails with EBUSY for a path as many times as `fails[path]` says."""
+    fails = {}
+    real_remove = os.remove
+
+    def remove(path, *args, **kwargs):
+        if fails.get(path, 0) > 0:
+            fails[path] -= 1
+            raise OSError(errno.EBUSY, "busy", path)
+        real_remove(path, *args, **kwargs)
+
+    monkeypatch.setattr(trash.os, "remove", remove)
+    return fails
+
+
+@linux_only
+def test_trash_mode_writes_trashinfo_and_keeps_names_unique(tmp_path, home_trash):
+    first = write(str(tmp_path / "in" / "a" / "image.png"))
+    second = write(str(tmp_path / "in" / "b" / "image.png"))
+    deleter = DeletionService(mode="trash", retries=0)
+    deleter.remove([first, second])
+
+    assert deleter.wait() == []
+    assert not os.path.exists(first) and not os.path.exists(second)
+    assert sorted(os.listdir(os.path.join(home_trash, "files"))) == ["image 2.png", "image.png"]
+    with open(os.path.join(home_trash, "info", "image.png.trashinfo")) as f:
+        info = f.read()
+    assert info.startswith("[Trash Info]\nPath=") and "DeletionDate=" in info
+
+
+def test_delete_mode_removes_files_outright(tmp_path, home_trash):
+    path = write(str(tmp_path / "in" / "image.png"))
+    deleter = DeletionService(mode="delete", retries=0)
+    deleter.remove([path])
+    assert deleter.wait() == []
+    assert not os.path.exists(path)
+    assert not os.path.exists(home_trash)
+
+
+def test_locked_file_is_retried_until_it_goes(tmp_path, flaky_remove):
+    path = write(str(tmp_path / "in" / "image.png"))
+    flaky_remove[os.path.abspath(path)] = 2
+    deleter = DeletionService(mode="delete", retries=3, retry_delay=0.01)
+    deleter.remove([path])
+    assert deleter.wait() == []
+    assert not os.path.exists(path)
+
+
+def test_retries_give_up_and_report_the_file(tmp_path, flaky_remove):
+    path = write(str(tmp_path / "in" / "image.png"))
+    flaky_remove[os.path.abspath(path)] = 10
+    deleter = DeletionService(mode="delete", retries=2, retry_delay=0.01)
+    deleter.remove([path])
+    failures = deleter.wait()
+    assert [failed for failed, _ in failures] == [os.path.abspath(path)]
+    assert os.path.exists(path)
+
+
+def test_missing_file_is_not_retried(tmp_path):
+    deleter = DeletionService(mode="delete", retries=3, retry_delay=0.01)
+    deleter.remove([str(tmp_path / "gone.png")])
+    assert deleter.wait() == []
+
+
+@linux_only
+def test_unusable_mount_trash_falls_back_to_the_home_trash(tmp_path, home_trash, monkeypatch):
+    mount = str(tmp_path / "mnt")
+    files = [write(os.path.join(mount, f"image{i}.png")) for i in range(3)]
+    bin_ = FreeDesktopTrash()
+    bin_.home_device = -1  # Pretend the files are on another drive than the home trash
+    monkeypatch.setattr(trash, "_mount_point", lambda path: mount)
+
+    real_makedirs, real_rename = os.makedirs, os.rename
+
+    def makedirs(path, *args, **kwargs):
+        if ".Trash-" in path:
+            raise PermissionError(errno.EROFS, "read-only file system", path)
+        return real_makedirs(path, *args, **kwargs)
+
+    def rename(src, dst):
+        if dst.startswith(home_trash):
+            raise OSError(errno.EXDEV, "cross-device link")
+        return real_rename(src, dst)
+
+    monkeypatch.setattr(trash.os, "makedirs", makedirs)
+    monkeypatch.setattr(trash.os, "rename", rename)
+
+    assert bin_.trash(files[:2]) == []
+    assert bin_.trash(files[2:]) == []  # Straight to the home trash this time
+    assert not any(os.path.exists(path) for path in files)
+    assert sorted(os.listdir(os.path.join(home_trash, "files"))) == ["image0.png", "image1.png", "image2.png"]
+    with open(os.path.join(home_trash, "info", "image0.png.trashinfo")) as f:
+        assert f"Path={files[0]}\n" in f.read()  # Absolute, as the home trash requires